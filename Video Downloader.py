@@ -1,435 +1,561 @@
-import requests
-from bs4 import BeautifulSoup
+import time
+_STARTED = time.perf_counter()  # For --startup-report, taken before any other import
+
 import json
-import re
-import subprocess
+import sys
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, filedialog
-import time
+from tkinter import ttk, scrolledtext, messagebox
 import os
-from typing import List, Tuple
+import sqlite3
 import threading
-from queue import Queue
+from queue import Queue, Empty
+from collections import deque
 
-def get_downloads_folder():
-    """Get the default downloads folder path"""
-    return os.path.join(os.path.expanduser("~"), "Downloads")
+from video_downloader import (
+    BatchPipeline, CircuitBreaker, ContentStore, DownloadJob, DownloadScheduler, FormatPolicy, TransferOptions,
+    discover_tools, get_available_formats, JobJournal, PostProcessor, Prefetcher, RetryPolicy, get_backend,
+    get_download_index, get_downloads_folder, get_metrics_registry, load_settings, parse_sections, read_url_list,
+    restore_jobs, save_settings, SchedulePolicy, warm_extractor_index
+)
+from video_downloader.metrics import PHASES
 
-class LoadingIndicator:
-    def __init__(self, parent, text="Loading..."):
-        # Create a transparent overlay window instead of a frame
-        self.overlay = tk.Toplevel(parent)
-        self.overlay.withdraw()  # Hide initially to prevent flicker
-        
-        # Remove window decorations
-        self.overlay.overrideredirect(True)
-        self.overlay.attributes('-topmost', True)
-        self.overlay.attributes('-alpha', 0.3)  # 30% opacity
-        
-        # Configure background
-        self.overlay.configure(bg='gray')
-        
-        # Function to update overlay position and size
-        def update_overlay():
-            x = parent.winfo_rootx()
-            y = parent.winfo_rooty()
-            w = parent.winfo_width()
-            h = parent.winfo_height()
-            self.overlay.geometry(f"{w}x{h}+{x}+{y}")
-        
-        # Update position initially
-        parent.update_idletasks()  # Ensure parent geometry is up to date
-        update_overlay()
-        
-        # Bind to parent movement to keep overlay aligned
-        parent.bind('<Configure>', lambda e: update_overlay())
-        
-        # Show the overlay
-        self.overlay.deiconify()
-        self.overlay.lift()
-        
-        self.parent = parent
-        self.window = tk.Toplevel(parent)
-        self.window.overrideredirect(True)
-        self.window.attributes('-topmost', True)
-        
-        # Configure border and background
-        self.window.configure(bg='black')  # Border color
-        
-        # Create inner frame for content with margin (acting as border)
-        self.border_frame = tk.Frame(self.window, bg='#f0f0f0', padx=1, pady=1)
-        self.border_frame.pack(expand=True, fill='both', padx=1, pady=1)
-        
-        # Make window size fixed
-        self.window.grid_propagate(False)
-        self.window.geometry("400x80")
-        
-        # Store original position
-        self.parent_x = parent.winfo_x()
-        self.parent_y = parent.winfo_y()
-        
-        # Disable parent window movement
-        self.parent.bind('<Configure>', lambda e: self.prevent_move(e))
-        
-        # Center the window
-        self.center_window()
-        
-        # Create main frame
-        self.frame = ttk.Frame(self.border_frame)
-        self.frame.place(relx=0.5, rely=0.5, anchor="center")
-        
-        # Add loading text
-        self.label = ttk.Label(
-            self.frame,
-            text="Fetching available resolution. Please wait.",
-            font=('Segoe UI', 10)
-        )
-        self.label.pack(pady=(0, 10))
-        
-        # Create canvas for spinner
-        self.canvas = tk.Canvas(
-            self.frame,
-            width=30,
-            height=30,
-            bg='#f0f0f0',
-            highlightthickness=0
-        )
-        self.canvas.pack()
-        
-        # Create spinner circle
-        self.spinner = self.canvas.create_arc(
-            5, 5, 25, 25,
-            start=0,
-            extent=300,
-            width=2,
-            style=tk.ARC,
-            outline='black'
-        )
-        
-        # Add rounded corners (Windows only)
+_IMPORTS_DONE = time.perf_counter()
+
+class UiTick:
+    """The one timer that polls and animates the window.
+
+    Each callback is called with a frame counter and returns True while it
+    has work in flight; the tick runs every active_ms while any does and
+    backs off to idle_ms once none does, so an idle window wakes once a
+    second. wake() brings it back to the fast rate right away.
+    """
+
+    SPINNER = "◐◓◑◒"
+
+    def __init__(self, root, active_ms=100, idle_ms=1000):
+        self.root = root
+        self.active_ms = active_ms
+        self.idle_ms = idle_ms
+        self.callbacks = []
+        self.frame = 0
+        self._after_id = None
+        self._idle = False
+
+    def add(self, callback):
+        self.callbacks.append(callback)
+        self.wake()
+
+    def discard(self, callback):
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+
+    def spinner(self, frame=None):
+        """Spinner character for a frame (the current one by default)"""
+        return self.SPINNER[(self.frame if frame is None else frame) // 2 % len(self.SPINNER)]
+
+    def wake(self):
+        """Run the next tick soon instead of at the idle rate"""
+        if self._after_id is None or self._idle:
+            self._schedule(self.active_ms)
+
+    def _schedule(self, delay_ms):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self._after_id = self.root.after(delay_ms, self._run)
+        self._idle = delay_ms >= self.idle_ms
+
+    def _run(self):
+        self.frame += 1
+        # Scheduled first, so a callback that opens a dialog (a nested event loop) does not stop the tick
+        self._after_id = self.root.after(self.active_ms, self._run)
+        self._idle = False
+        busy = False
         try:
-            from ctypes import windll, byref, sizeof, c_int
-            HWND = windll.user32.GetParent(self.window.winfo_id())
-            windll.dwmapi.DwmSetWindowAttribute(
-                HWND,
-                33,  # DWMWA_WINDOW_CORNER_PREFERENCE
-                byref(c_int(2)),  # DWMWCP_ROUND
-                sizeof(c_int)
-            )
-        except:
-            pass
-        
-        self.window.lift()
-        self.angle = 0
-        self.animate_spinner()
-    
-    def center_window(self):
-        """Center the loading window relative to parent"""
-        parent_x = self.parent.winfo_x()
-        parent_y = self.parent.winfo_y()
-        parent_width = self.parent.winfo_width()
-        parent_height = self.parent.winfo_height()
-        
-        x = parent_x + (parent_width - 400) // 2
-        y = parent_y + (parent_height - 80) // 2
-        
-        self.window.geometry(f"+{x}+{y}")
-    
-    def prevent_move(self, event):
-        """Prevent parent window from moving"""
-        if event.widget == self.parent:
-            self.parent.geometry(f'+{self.parent_x}+{self.parent_y}')
-    
-    def animate_spinner(self):
-        """Animate the spinning loader"""
-        self.angle = (self.angle + 10) % 360
-        self.canvas.itemconfig(
-            self.spinner,
-            start=self.angle
+            for callback in list(self.callbacks):
+                busy = callback(self.frame) or busy
+        except tk.TclError:
+            return  # Window was closed
+        if not busy:
+            self._schedule(self.idle_ms)
+
+def open_batch_window(root, scheduler, download_type, download_path_var, settings):
+    """Show the batch window for pasting or loading a list of URLs"""
+    window = tk.Toplevel(root)
+    window.title("Batch Download")
+    window.transient(root)
+
+    ttk.Label(window, text="One URL per line (videos, playlists or channels), optionally followed by time ranges:"
+              ).pack(anchor="w", padx=5, pady=(5, 0))
+    urls_text = scrolledtext.ScrolledText(window, width=70, height=12)
+    urls_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+    def load_file():
+        from tkinter import filedialog
+        file_path = filedialog.askopenfilename(
+            parent=window, filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
         )
-        self.animation_id = self.window.after(20, self.animate_spinner)
-        
-    def destroy(self):
-        """Clean up and destroy the window"""
-        if hasattr(self, 'animation_id'):
-            self.window.after_cancel(self.animation_id)
-        # Unbind parent events
-        self.parent.unbind('<Configure>')
-        self.parent.unbind('<Unmap>')
-        self.parent.unbind('<Map>')
-        # Just remove the overlay
-        self.overlay.destroy()
-        self.window.destroy()
-
-def get_available_formats(video_url, result_queue: Queue, format_type='v') -> List[Tuple[str, str]]:
-    """Gets available formats and returns list of (quality, format_id) tuples"""
-    try:
-        # Basic YouTube URL validation
-        if 'youtube.com' in video_url or 'youtu.be' in video_url:
-            if not re.match(r'(https?://)?(www\.)?(youtube\.com/watch\?v=|youtu\.be/)[a-zA-Z0-9_-]+', video_url):
-                result_queue.put(('error', "Invalid YouTube URL format"))
-                return
-        
-        startupinfo = None
-        if os.name == 'nt':
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            startupinfo.wShowWindow = subprocess.SW_HIDE
-
-        command = [
-            "yt-dlp",
-            "-j",
-            "--no-playlist",
-            video_url
-        ]
-        
-        result = subprocess.run(command, capture_output=True, text=True, startupinfo=startupinfo)
-        
-        # Check for errors in stderr
-        if result.stderr:
-            error_msg = result.stderr
-            if "Video unavailable" in error_msg:
-                error_msg = "This video is unavailable or private"
-            elif "Unsupported URL" in error_msg:
-                error_msg = "Invalid URL or unsupported platform"
-            elif "Sign in to confirm your age" in error_msg:
-                error_msg = "Age-restricted video"
-            elif "Requested format is not available" in error_msg:
-                error_msg = "The requested video format is not available"
-            elif "Unable to extract video data" in error_msg:
-                error_msg = "Unable to find video. Please check the URL"
-            result_queue.put(('error', error_msg))
+        if file_path:
+            with open(file_path, encoding="utf-8", errors="replace") as f:
+                urls_text.insert(tk.END, f.read().rstrip("\n") + "\n")
+
+    def start():
+        urls = read_url_list(urls_text.get("1.0", tk.END))
+        if not urls:
+            messagebox.showerror("Error", "Please enter at least one URL", parent=window)
             return
+        download_type_str = 'v' if download_type.get() == 1 else 'a'
+        pipeline = BatchPipeline(scheduler, download_type_str, download_path_var.get(),
+                                 settings['batch_probe_workers'], TransferOptions.from_settings(settings),
+                                 policy=auto_format_policy(settings), precision=settings['clip_precision'])
+        pipeline.start(urls)
+        window.destroy()
+
+    button_frame = ttk.Frame(window)
+    button_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
+    ttk.Button(button_frame, text="Load File...", command=load_file).pack(side=tk.LEFT)
+    ttk.Button(button_frame, text="Start", command=start).pack(side=tk.RIGHT)
+
+def format_bytes(count):
+    """Human-readable size, e.g. '12.3 MB'"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if count < 1024 or unit == "GB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
 
-        # If no output, URL is invalid
-        if not result.stdout.strip():
-            result_queue.put(('error', "Invalid URL or no video found"))
+def format_eta(seconds):
+    """Remaining time as 'm:ss' or 'h:mm:ss'"""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+def open_stats_window(root, scheduler):
+    """Show where download time goes: per-phase totals and the most recent jobs, refreshed every second"""
+    registry = scheduler.metrics
+    window = tk.Toplevel(root)
+    window.title("Download Stats")
+    window.transient(root)
+
+    totals_var = tk.StringVar()
+    ttk.Label(window, textvariable=totals_var, justify=tk.LEFT).pack(anchor="w", padx=5, pady=5)
+
+    phase_columns = ("jobs", "mean", "p50", "p95", "total", "share")
+    phase_table = ttk.Treeview(window, columns=phase_columns, height=len(PHASES))
+    phase_table.heading("#0", text="Phase")
+    phase_table.column("#0", width=100)
+    for column, title in zip(phase_columns, ("Jobs", "Mean", "~p50", "~p95", "Total", "Share")):
+        phase_table.heading(column, text=title)
+        phase_table.column(column, width=70, anchor="e")
+    phase_table.pack(fill=tk.X, padx=5)
+    for name in PHASES:
+        phase_table.insert("", tk.END, iid=name, text=name.replace("_", " ").capitalize())
+
+    ttk.Label(window, text="Recent jobs:").pack(anchor="w", padx=5, pady=(5, 0))
+    job_columns = ("status", "size", "avg", "peak", "retries") + PHASES
+    job_table = ttk.Treeview(window, columns=job_columns, show="headings", height=10)
+    for column, title in zip(job_columns, ("Status", "Size", "Avg speed", "Peak speed", "Retries", "Queue",
+                                           "Probe", "Download", "Post", "Move")):
+        job_table.heading(column, text=title)
+        job_table.column(column, width=75, anchor="e")
+    job_table.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+
+    def seconds(value):
+        return "-" if value is None else f"{value:.1f}s"
+
+    def refresh():
+        if not window.winfo_exists():
             return
-            
-        video_info = json.loads(result.stdout)
-        
-        # Extract video metadata
-        metadata = {
-            'title': video_info.get('title', 'Unknown'),
-            'duration': video_info.get('duration', 0),
-            'uploader': video_info.get('uploader', 'Unknown'),
-            'view_count': video_info.get('view_count', 0),
-            'upload_date': video_info.get('upload_date', 'Unknown'),
-            'description': video_info.get('description', '').split('\n')[0]  # First line only
-        }
-        
-        formats = []
-        seen_qualities = set()
-        
-        for fmt in video_info.get('formats', []):
-            if format_type == 'v':
-                if fmt.get('ext') == 'mp4' and fmt.get('vcodec') != 'none':
-                    height = fmt.get('height')
-                    if height and height not in seen_qualities:
-                        seen_qualities.add(height)
-                        formats.append((f"{height}p", fmt['format_id']))
-            else:  # audio formats
-                # Check for audio-only formats or formats with audio
-                if fmt.get('acodec') != 'none':
-                    # Get audio quality indicators
-                    abr = fmt.get('abr', 0)  # audio bitrate
-                    asr = fmt.get('asr', 0)  # audio sample rate
-                    
-                    # Create quality string
-                    quality = ""
-                    if abr:
-                        quality = f"{int(abr)}kbps"
-                    elif asr:
-                        quality = f"{int(asr/1000)}kHz"
-                    else:
-                        continue  # Skip if no quality info
-                        
-                    if quality and quality not in seen_qualities:
-                        seen_qualities.add(quality)
-                        formats.append((quality, fmt['format_id']))
-        
-        if format_type == 'v':
-            formats.sort(key=lambda x: int(x[0][:-1]), reverse=True)  # Sort video by height
-        else:
-            # Sort audio by bitrate/frequency (removing 'kbps' or 'kHz' and converting to int)
-            formats.sort(key=lambda x: int(x[0][:-4]), reverse=True)
-            
-        result_queue.put(('success', (formats, metadata)))  # Now sending both formats and metadata
-    
-    except json.JSONDecodeError:
-        result_queue.put(('error', "Failed to parse video information"))
-    except subprocess.CalledProcessError as e:
-        error_msg = e.stderr if e.stderr else "Failed to fetch video information"
-        result_queue.put(('error', error_msg))
-    except Exception as e:
-        result_queue.put(('error', f"An unexpected error occurred: {str(e)}"))
-
-def download_video(video_url, download_type, output_callback, download_path, update_progress_callback, resolution_id=None):
-    """Downloads the video, updates progress, and sends output to callback."""
-    if download_type == 'v':
-        if resolution_id:
-            format_arg = f'{resolution_id}+ba/b[ext=mp4]'
+        stats = registry.snapshot()
+        jobs = ", ".join(f"{count} {status}" for status, count in sorted(stats['jobs'].items())) or "none"
+        totals_var.set(f"Jobs: {jobs}\nDownloaded: {format_bytes(stats['bytes'])}    "
+                       f"Average speed: {format_bytes(registry.speed.mean)}/s    Retries: {stats['retries']}")
+
+        grand_total = sum(registry.phases[name].sum for name in PHASES) or 1
+        for name in PHASES:
+            histogram = registry.phases[name]
+            phase_table.item(name, values=(
+                histogram.count, seconds(histogram.mean), seconds(histogram.quantile(0.5)),
+                seconds(histogram.quantile(0.95)), seconds(histogram.sum),
+                f"{histogram.sum / grand_total * 100:.0f}%"
+            ))
+
+        job_table.delete(*job_table.get_children())
+        for record in reversed(stats['recent']):
+            phases = record['phases']
+            job_table.insert("", tk.END, values=(
+                record['status'], format_bytes(record['bytes']), f"{format_bytes(record['avg_speed'])}/s",
+                f"{format_bytes(record['peak_speed'])}/s", record['retries'],
+                *(seconds(phases.get(name, 0)) for name in PHASES)
+            ))
+        window.after(1000, refresh)
+
+    refresh()
+
+class LogView:
+    """Appends to a read-only ScrolledText, keeping only the last max_lines lines"""
+
+    def __init__(self, text_widget, max_lines=500):
+        self.text = text_widget
+        self.max_lines = max_lines
+
+    def append(self, text):
+        """Add text and drop the oldest lines beyond the cap"""
+        self.text.configure(state="normal")
+        self.text.insert(tk.END, text)
+        line_count = int(self.text.index("end-1c").split(".")[0])
+        if line_count > self.max_lines:
+            self.text.delete("1.0", f"{line_count - self.max_lines + 1}.0")
+        self.text.see(tk.END)
+        self.text.configure(state="disabled")
+
+    def clear(self):
+        self.text.configure(state="normal")
+        self.text.delete("1.0", tk.END)
+        self.text.configure(state="disabled")
+
+class JobTable:
+    """Job list (status, progress, speed, ETA, size) that stays fast with thousands of jobs.
+
+    The Treeview only ever holds one item per visible row; scrolling, sorting
+    and filtering refill those items from the model instead of inserting or
+    deleting thousands of them. Job events only mark a job dirty, and
+    tick() (a UiTick callback) applies the dirty jobs in one batch at most
+    every interval_ms, touching only rows whose text changed. Running and
+    processing rows show a spinner next to their status.
+
+    actions are the entries of the right-click menu: (label, callback,
+    statuses) tuples, or None for a separator. The callback receives the
+    selected jobs whose status is in statuses; the entry is disabled when
+    there are none.
+    """
+
+    COLUMNS = (  # (name, heading, width, anchor)
+        ("id", "#", 45, "e"), ("name", "Name", 260, "w"), ("status", "Status", 80, "w"),
+        ("progress", "Progress", 65, "e"), ("speed", "Speed", 85, "e"), ("eta", "ETA", 60, "e"),
+        ("size", "Size", 80, "e"), ("priority", "Priority", 55, "e"),
+    )
+    FILTERS = {  # Status filter choice -> statuses shown (None = all)
+        "All": None,
+        "Active": ('queued', 'running', 'processing', 'paused'),
+        "Done": ('done',),
+        "Failed": ('failed', 'cancelled'),
+    }
+    FINISHED = ('done', 'failed', 'cancelled')
+    BUSY = ('running', 'processing')
+
+    def __init__(self, parent, height=8, interval_ms=250, actions=()):
+        self.frame = ttk.Frame(parent)
+        self.height = height
+        self.interval_ms = interval_ms
+        self._jobs = {}  # Job ID -> DownloadJob
+        self._rows = {}  # Job ID -> (display values, sort keys) as of the last flush
+        self._dirty = set()
+        self._view = []  # Job IDs that pass the filter, in sort order
+        self._view_stale = False
+        self._offset = 0  # Index in _view of the top row
+        self._shown = []  # Values currently in each Treeview item
+        self._sort_index, self._descending = 0, False
+        self._flushed = 0.0  # time.monotonic() of the last flush
+        self._spin = 0  # Spinner frame of the busy rows
+        self._busy_shown = False
+        # Job IDs, not Treeview items: the items are reused for other jobs as the list scrolls
+        self._selected = set()
+
+        filter_frame = ttk.Frame(self.frame)
+        filter_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 2))
+        ttk.Label(filter_frame, text="Show:").pack(side=tk.LEFT)
+        self.status_var = tk.StringVar(value="All")
+        status_box = ttk.Combobox(filter_frame, width=8, state="readonly", textvariable=self.status_var,
+                                  values=list(self.FILTERS))
+        status_box.pack(side=tk.LEFT, padx=(5, 0))
+        status_box.bind("<<ComboboxSelected>>", lambda e: self._refilter())
+        ttk.Label(filter_frame, text="Filter:").pack(side=tk.LEFT, padx=(15, 5))
+        self.text_var = tk.StringVar()
+        self.text_var.trace_add("write", lambda *args: self._refilter())
+        ttk.Entry(filter_frame, width=25, textvariable=self.text_var).pack(side=tk.LEFT)
+        ttk.Button(filter_frame, text="Clear Finished", command=self.clear_finished).pack(side=tk.RIGHT)
+        self.count_var = tk.StringVar()
+        ttk.Label(filter_frame, textvariable=self.count_var).pack(side=tk.RIGHT, padx=(0, 10))
+
+        self.tree = ttk.Treeview(self.frame, columns=[c[0] for c in self.COLUMNS], show="headings",
+                                 height=height, selectmode="extended")
+        for index, (name, title, width, anchor) in enumerate(self.COLUMNS):
+            self.tree.heading(name, text=title, command=lambda i=index: self.sort_by(i))
+            self.tree.column(name, width=width, anchor=anchor, stretch=name == "name")
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        # Scrolls the model, not the Treeview, which never has more items than fit
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+        self.frame.columnconfigure(0, weight=1)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel)
+        self.tree.bind("<ButtonPress-1>", self._on_click)  # Runs before the Treeview's own selection handling
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+
+        self._actions = [action for action in actions if action is not None]
+        self.menu = tk.Menu(self.tree, tearoff=0)
+        for action in actions:
+            if action is None:
+                self.menu.add_separator()
+            else:
+                self.menu.add_command(label=action[0], command=lambda a=action: self.run_action(a))
+        right_click = "<Button-2>" if self.tree.tk.call("tk", "windowingsystem") == "aqua" else "<Button-3>"
+        self.tree.bind(right_click, self._on_menu)
+        self._update_heading()
+
+    def update(self, job):
+        """Note that a job changed; it is redrawn on the next tick"""
+        self._jobs[job.id] = job
+        self._dirty.add(job.id)
+
+    def clear_finished(self):
+        """Drop done, failed and cancelled jobs from the list"""
+        for job_id in [i for i, job in self._jobs.items() if job.status in self.FINISHED]:
+            del self._jobs[job_id]
+            self._rows.pop(job_id, None)
+            self._dirty.discard(job_id)
+            self._selected.discard(job_id)
+        self._refilter()
+
+    def selected_jobs(self):
+        """Selected jobs that pass the current filter, in list order"""
+        return [self._jobs[job_id] for job_id in self._view if job_id in self._selected]
+
+    def run_action(self, action):
+        """Call an action's callback with the selected jobs it applies to"""
+        label, callback, statuses = action
+        jobs = [job for job in self.selected_jobs() if job.status in statuses]
+        if jobs:
+            callback(jobs)
+
+    def sort_by(self, index):
+        """Sort by column index; sorting by the same column again reverses the order"""
+        self._descending = not self._descending if index == self._sort_index else False
+        self._sort_index = index
+        self._update_heading()
+        self._refilter()
+
+    def scroll_to(self, offset):
+        self._offset = max(0, min(int(offset), len(self._view) - self.height))
+        self._render()
+
+    def tick(self, frame):
+        """UiTick callback; True while rows are pending or spinning"""
+        if time.monotonic() - self._flushed >= self.interval_ms / 1000:
+            self._spin += 1
+            self.flush()
+        return bool(self._dirty) or self._busy_shown
+
+    def flush(self):
+        """Apply the jobs changed since the last flush and redraw the visible rows"""
+        self._flushed = time.monotonic()
+        statuses = self.FILTERS[self.status_var.get()]
+        text = self.text_var.get().strip()
+        for job_id in self._dirty:
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            old = self._rows.get(job_id)
+            row = self._row(job)
+            self._rows[job_id] = row
+            # Only a change in what the view is filtered or sorted by reorders it (the name arrives with the probe)
+            if old is None or old[1][self._sort_index] != row[1][self._sort_index] or \
+                    (statuses and old[0][2] != row[0][2]) or (text and old[0][1] != row[0][1]):
+                self._view_stale = True
+        self._dirty.clear()
+        if self._view_stale:
+            self._rebuild_view()
+        self._render()
+
+    def _refilter(self):
+        self._view_stale = True
+        self.flush()
+
+    def _rebuild_view(self):
+        statuses = self.FILTERS[self.status_var.get()]
+        text = self.text_var.get().strip().lower()
+        view = [job_id for job_id, (values, _) in self._rows.items()
+                if (statuses is None or values[2] in statuses)
+                and (not text or text in values[1].lower() or text in self._jobs[job_id].url.lower())]
+        index = self._sort_index
+        view.sort()
+        # Stable, so jobs that tie stay in ID order either way
+        view.sort(key=lambda job_id: self._rows[job_id][1][index], reverse=self._descending)
+        self._view = view
+        self._view_stale = False
+        self._offset = max(0, min(self._offset, len(view) - self.height))
+        self.count_var.set(f"{len(view)} of {len(self._rows)} jobs" if len(view) != len(self._rows)
+                           else f"{len(view)} jobs")
+
+    def _render(self):
+        rows = [self._rows[job_id][0] for job_id in self._view[self._offset:self._offset + self.height]]
+        self._busy_shown = any(values[2] in self.BUSY for values in rows)
+        spinner = UiTick.SPINNER[self._spin % len(UiTick.SPINNER)]
+        visible = [values[:2] + (f"{values[2]} {spinner}",) + values[3:] if values[2] in self.BUSY else values
+                   for values in rows]
+        items = self.tree.get_children()
+        # The item count only changes while the list is shorter than the table
+        for _ in range(len(items), len(visible)):
+            self.tree.insert("", tk.END, values=())
+            self._shown.append(None)
+        if len(items) > len(visible):
+            self.tree.delete(*items[len(visible):])
+            del self._shown[len(visible):]
+        items = self.tree.get_children()
+        for slot, (item, values) in enumerate(zip(items, visible)):
+            if self._shown[slot] != values:
+                self.tree.item(item, values=values)
+                self._shown[slot] = values
+        selected = [item for item, job_id in zip(items, self._view[self._offset:]) if job_id in self._selected]
+        if set(selected) != set(self.tree.selection()):
+            self.tree.selection_set(selected)
+        total = len(self._view)
+        if total > self.height:
+            self.scrollbar.set(self._offset / total, (self._offset + self.height) / total)
         else:
-            format_arg = 'bv*[ext=mp4][height<=1080]+ba/b[ext=mp4]'
-        format_sort_arg = '-S ext:webm:none'
-    elif download_type == 'a':
-        format_arg = 'ba[ext=m4a]/ba[ext=mp3]'
-        format_sort_arg = '-S ares'
-    else:
-        output_callback("Invalid download type.\n")
-        return
+            self.scrollbar.set(0, 1)
 
-    # Create output template with automatic numbering for conflicts
-    output_template = os.path.join(download_path, "%(title)s.%(ext)s")
-    
-    command = [
-        "yt-dlp",
-        "-f", format_arg,
-        format_sort_arg,
-        "--no-playlist",
-        "-o", output_template,
-        # Add these options to handle duplicates
-        "--force-overwrites",  # Required for the next option to work
-        "--output-na-placeholder", "",  # Handles special characters in filenames
-        "--paths", "home:" + download_path,  # Set download path
-        "--restrict-filenames",  # Restrict filenames to ASCII characters
-        video_url
-    ]
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == tk.MOVETO:
+            self.scroll_to(float(amount) * len(self._view))
+        elif action == tk.SCROLL:
+            step = self.height - 1 if unit == tk.PAGES else 1
+            self.scroll_to(self._offset + int(amount) * step)
 
-    try:
-        # Add startupinfo to hide console window
-        startupinfo = None
-        if os.name == 'nt':
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            startupinfo.wShowWindow = subprocess.SW_HIDE
-
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            startupinfo=startupinfo
-        )
+    def _on_click(self, event):
+        # A plain click selects only the clicked row, so forget selected rows scrolled out of view too
+        if self.tree.identify_region(event.x, event.y) == "cell" and not event.state & 0x0005:  # Shift, Control
+            self._selected.clear()
 
-        while True:
-            output = process.stdout.readline()
-            if output == '' and process.poll() is not None:
-                break
-            if output:
-                # Extract percentage using regex
-                match = re.search(r'\[download\]\s+([\d.]+)%', output)
-                if match:
-                    try:
-                        percentage = float(match.group(1))
-                        update_progress_callback(percentage)  # Update progress bar
-                    except ValueError:
-                        pass  # Ignore if parsing fails
-                output_callback(output) # Still output to scrolled text
-
-        _, stderr = process.communicate()
-        if stderr:
-            output_callback(stderr)
-
-
-    except subprocess.CalledProcessError as e:
-        output_callback(f"Error downloading video:\n{e.stderr}\n")
-    except Exception as e:
-        output_callback(f"An unexpected error occurred: {e}\n")
+    def _on_select(self, event):
+        selection = set(self.tree.selection())
+        for item, job_id in zip(self.tree.get_children(), self._view[self._offset:]):
+            if item in selection:
+                self._selected.add(job_id)
+            else:
+                self._selected.discard(job_id)
+
+    def _on_menu(self, event):
+        item = self.tree.identify_row(event.y)
+        if not item or not self._actions:
+            return
+        slot = self._view_index(item)
+        if slot is None:
+            return
+        if self._view[slot] not in self._selected:
+            self._selected = {self._view[slot]}  # Right-clicking outside the selection acts on that row alone
+            self._render()
+        jobs = self.selected_jobs()
+        index = 0
+        for entry in range(self.menu.index(tk.END) + 1):
+            if self.menu.type(entry) == "separator":
+                continue
+            statuses = self._actions[index][2]
+            enabled = any(job.status in statuses for job in jobs)
+            self.menu.entryconfigure(entry, state=tk.NORMAL if enabled else tk.DISABLED)
+            index += 1
+        try:
+            self.menu.tk_popup(event.x_root, event.y_root)
+        finally:
+            self.menu.grab_release()
+
+    def _view_index(self, item):
+        # Index in _view of the job an item shows, or None below the last row
+        slot = self._offset + self.tree.index(item)
+        return slot if slot < len(self._view) else None
+
+    def _on_wheel(self, event):
+        up = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.scroll_to(self._offset + (-3 if up else 3))
+        return "break"
+
+    def _update_heading(self):
+        for index, (name, title, _, _) in enumerate(self.COLUMNS):
+            arrow = (" ▼" if self._descending else " ▲") if index == self._sort_index else ""
+            self.tree.heading(name, text=title + arrow)
+
+    @staticmethod
+    def _row(job):
+        # (display values, sort keys) in COLUMNS order
+        event = job.last_progress
+        running = job.status == 'running' and event is not None
+        speed = event.speed if running and event.speed else 0
+        eta = event.eta if running and event.eta is not None else None
+        size = (event.total_bytes if event is not None else None) or job.estimated_size or \
+            job.metrics.total_bytes or 0
+        name = os.path.basename(job.filepath) if job.filepath else job.url
+        values = (job.id, name, job.status, f"{job.progress:.0f}%", f"{format_bytes(speed)}/s" if speed else "",
+                  format_eta(eta) if eta is not None else "", format_bytes(size) if size else "", job.priority)
+        keys = (job.id, name.lower(), job.status, job.progress, speed, float('inf') if eta is None else eta, size,
+                job.priority)
+        return values, keys
+
+def change_priority(scheduler, job_table, jobs, step):
+    """Move jobs that have not started up (step > 0) or down the queue"""
+    for job in jobs:
+        scheduler.reprioritize(job.id, job.priority + step)
+        job_table.update(job)
 
 def select_directory(current_path_var):
     """Open directory selection dialog"""
+    from tkinter import filedialog
     dir_path = filedialog.askdirectory(initialdir=current_path_var.get())
     if dir_path:  # If a directory was selected
         current_path_var.set(dir_path)
 
-def url_changed(event, url_entry, res_dropdown, download_type, root):
-    """Handle URL entry changes"""
-    url = url_entry.get()
-    
-    # Clear existing options
-    res_dropdown['values'] = []
-    res_dropdown.set('')
-    
-    if url.strip() and download_type.get() == 1:  # Only for video downloads with non-empty URL
-        loading = LoadingIndicator(root, "Fetching available formats")
-        result_queue = Queue()
-        
-        def fetch_formats():
-            get_available_formats(url, result_queue)
-            
-        def check_queue():
-            try:
-                if not result_queue.empty():
-                    status, data = result_queue.get()
-                    loading.destroy()
-                    
-                    if status == 'success':
-                        formats, metadata = data
-                        if formats:
-                            # Add "Auto (up to 1080p)" option at the beginning
-                            formats = [("Auto (up to 1080p)", "")] + formats
-                            # Update dropdown values
-                            res_dropdown['values'] = [f[0] for f in formats]
-                            res_dropdown.format_ids = {f[0]: f[1] for f in formats}
-                            res_dropdown.set("Auto (up to 1080p)")
-                        else:
-                            res_dropdown['values'] = ["Auto (up to 1080p)"]
-                            res_dropdown.set("Auto (up to 1080p)")
-                    else:
-                        messagebox.showerror("Error", f"Failed to fetch formats: {data}")
-                        res_dropdown['values'] = ["Auto (up to 1080p)"]
-                        res_dropdown.set("Auto (up to 1080p)")
-                else:
-                    root.after(100, check_queue)
-            except tk.TkError:
-                # Handle case where window was closed during loading
-                pass
-                
-        # Start the background thread
-        thread = threading.Thread(target=fetch_formats, daemon=True)
-        thread.start()
-        
-        # Start checking for results
-        root.after(100, check_queue)
+def url_changed(event, url_entry, prefetcher, root, delay_ms):
+    """Probe the URL in the background once typing pauses, so Check and Download find it cached"""
+    pending = getattr(url_entry, 'prefetch_after', None)
+    if pending:
+        root.after_cancel(pending)
+    # <<Paste>> fires before the text is inserted, so always read the entry after the delay
+    url_entry.prefetch_after = root.after(delay_ms, lambda: prefetch_url(url_entry, prefetcher))
 
-def download_button_clicked(root, url_entry, download_type, output_text, download_path_var, progress_var, res_dropdown):
-    """Handles download button, updates progress, and manages output."""
+def prefetch_url(url_entry, prefetcher):
+    url_entry.prefetch_after = None
+    try:
+        url = url_entry.get()
+    except tk.TclError:
+        return  # Window was closed
+    if url.strip():
+        prefetcher.request(url)
+    else:
+        prefetcher.cancel()
+
+def auto_format_policy(settings):
+    """The FormatPolicy behind the "Auto" choice (None falls back to yt-dlp's own selection)"""
+    try:
+        return FormatPolicy.from_settings(settings)
+    except ValueError:
+        return None  # Typo in settings.json, keep downloading with the defaults
+
+def download_button_clicked(root, url_entry, download_type, output_text, download_path_var, progress_var, res_dropdown,
+                            scheduler, clip_var):
+    """Queues the download on the scheduler and resets the form for the next URL."""
     video_url = url_entry.get()
     download_type_str = 'v' if download_type.get() == 1 else 'a'
+    try:
+        sections = parse_sections(clip_var.get())
+    except ValueError as e:
+        messagebox.showerror("Error", str(e))
+        return
     
-    # Get selected resolution format_id
+    # Get selected format spec ("" for Auto)
     resolution_id = None
-    if download_type_str == 'v' and hasattr(res_dropdown, 'format_ids'):
+    if hasattr(res_dropdown, 'format_ids'):
         selected_res = res_dropdown.get()
-        resolution_id = res_dropdown.format_ids.get(selected_res, None)
+        resolution_id = res_dropdown.format_ids.get(selected_res) or None
     
-    output_text.configure(state="normal")
-    output_text.insert(tk.END, f"Downloading to: {download_path_var.get()}\n")
-    output_text.insert(tk.END, f"Downloading: {video_url}\n")
-    output_text.see(tk.END)
-    output_text.configure(state="disabled")
-    root.update()
-
-    def update_output(text):
-        output_text.configure(state="normal")
-        output_text.insert(tk.END, text)
-        output_text.see(tk.END)
-        output_text.configure(state="disabled")
-        root.update()
-
-    def update_progress(percentage):
-        progress_var.set(percentage)
-        root.update_idletasks()
+    settings = load_settings()
+    job = scheduler.submit(DownloadJob(video_url, download_type_str, download_path_var.get(), resolution_id,
+                                       transfer=TransferOptions.from_settings(settings),
+                                       policy=auto_format_policy(settings), sections=sections,
+                                       precision=settings['clip_precision']))
 
-    download_video(video_url, download_type_str, update_output, download_path_var.get(), 
-                  update_progress, resolution_id)
-    progress_var.set(0)
     output_text.configure(state="normal")
-    output_text.insert(tk.END, "Download Success!\n")
+    output_text.insert(tk.END, f"[{job.id}] Downloading to: {download_path_var.get()}\n")
+    output_text.insert(tk.END, f"[{job.id}] Queued: {video_url}\n")
     output_text.see(tk.END)
     output_text.configure(state="disabled")
-    root.update()
     
     # Get reference to download button
     download_button = None
@@ -437,29 +563,109 @@ def download_button_clicked(root, url_entry, download_type, output_text, downloa
         if isinstance(widget, ttk.Button) and widget['text'] == 'Download':
             download_button = widget
             break
-            
-    # Clear everything after 2 seconds
-    def clear_all():
-        output_text.configure(state="normal")
-        output_text.delete("1.0", tk.END)
-        output_text.configure(state="disabled")
-        url_entry.delete(0, tk.END)
-        res_dropdown['values'] = ["Auto (up to 1080p only)"]
-        res_dropdown.set("Auto (up to 1080p only)")
-        if download_button:
-            download_button.configure(state='disabled')
-            
-    root.after(2000, clear_all)
 
-def check_ffmpeg():
-    """Check if FFmpeg is available in the system PATH"""
+    # Reset the form right away so the next URL can be queued
+    url_entry.delete(0, tk.END)
+    clip_var.set("")
+    default_text = "Auto (up to 1080p only)" if download_type_str == 'v' else "Auto (best quality)"
+    res_dropdown['values'] = [default_text]
+    res_dropdown.set(default_text)
+    if hasattr(res_dropdown, 'format_ids'):
+        delattr(res_dropdown, 'format_ids')
+    if download_button:
+        download_button.configure(state='disabled')
+
+def poll_scheduler_events(root, scheduler, log_view, progress_var, job_table):
+    """UiTick callback: drain scheduler events on the Tk thread; True while jobs are in flight"""
+    lines = deque(maxlen=log_view.max_lines)  # Older lines would be trimmed anyway
+    changed = False
     try:
-        subprocess.run(['ffmpeg', '-version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return True
-    except FileNotFoundError:
-        return False
+        while True:
+            kind, job, payload = scheduler.events.get_nowait()
+            changed = True
+            if kind == 'log':
+                lines.append(payload)
+            elif kind == 'output':
+                lines.append(f"[{job.id}] {payload}" if payload.endswith('\n') else f"[{job.id}] {payload}\n")
+            elif kind == 'progress':
+                job_table.update(job)
+            elif kind == 'status':
+                job_table.update(job)
+                if payload == 'done' and job.metrics.total_bytes:
+                    lines.append(f"[{job.id}] Download Success! ({job.metrics.summary()})\n")
+                elif payload == 'done':
+                    lines.append(f"[{job.id}] Download Success!\n")
+                elif payload in ('failed', 'cancelled', 'paused'):
+                    lines.append(f"[{job.id}] Download {payload}.\n")
+    except Empty:
+        pass
+
+    if lines:
+        log_view.append("".join(lines))
+
+    if not changed:
+        return scheduler.has_running_jobs()
+
+    # Progress bar shows the average over running jobs
+    active = scheduler.active_jobs()
+    running = [j for j in active if j.status == 'running']
+    progress_var.set(sum(j.progress for j in running) / len(running) if running else 0)
+
+    # Clear the log 2 seconds after the queue drains
+    if not active:
+        def clear_log():
+            if not scheduler.active_jobs():
+                log_view.clear()
+        root.after(2000, clear_log)
+    return True
+
+def start_background_probe(root):
+    """Find ffmpeg and warm up the yt-dlp backend and extractor index without delaying the first paint"""
+    results = Queue()
+
+    def probe():
+        tools = discover_tools()
+        try:
+            get_backend()  # Imports yt_dlp here instead of on the first Check
+            warm_extractor_index()  # Otherwise built on the Tk thread by the first prefetch of a non-YouTube link
+        except Exception:
+            pass  # Reported when the backend is actually used
+        results.put(tools)
 
-def create_gui():
+    def check_results():
+        try:
+            tools = results.get_nowait()
+        except Empty:
+            root.after(100, check_results)
+            return
+        if not tools['ffmpeg']:
+            messagebox.showerror(
+                "FFmpeg Not Found", 
+                "FFmpeg is required but not found in system PATH.\n"
+                "Please install FFmpeg from https://ffmpeg.org/download.html"
+            )
+
+    threading.Thread(target=probe, daemon=True).start()
+    root.after(100, check_results)
+
+def report_startup(root, report_path):
+    """Write import and first-window timings to report_path once the window is shown, then exit"""
+    def on_map(event):
+        if event.widget is not root:
+            return
+        root.update_idletasks()
+        report = {
+            'import_seconds': round(_IMPORTS_DONE - _STARTED, 4),
+            'first_window_seconds': round(time.perf_counter() - _STARTED, 4),
+            'frozen': bool(getattr(sys, 'frozen', False)),
+        }
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f)
+        root.destroy()
+
+    root.bind('<Map>', on_map, add='+')
+
+def create_gui(startup_report=None):
     """Creates the Tkinter GUI."""
     root = tk.Tk()
     root.title("Video Downloader")
@@ -468,7 +674,6 @@ def create_gui():
     
     # Set window icon using sys._MEIPASS for PyInstaller
     try:
-        import sys
         if getattr(sys, 'frozen', False):
             # Running as compiled executable
             base_path = sys._MEIPASS
@@ -495,13 +700,39 @@ def create_gui():
     except:
         pass  # Fail silently if not on Windows 11 or if it doesn't work
 
-    # Check FFmpeg availability
-    if not check_ffmpeg():
-        tk.messagebox.showerror(
-            "FFmpeg Not Found", 
-            "FFmpeg is required but not found in system PATH.\n"
-            "Please install FFmpeg from https://ffmpeg.org/download.html"
-        )
+    settings = load_settings()
+    try:
+        store = ContentStore.from_settings(settings)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        store = None  # Unreachable share or bad setting, download into the folders directly
+        messagebox.showwarning("Content store", f"The content store is not available, saving files directly:\n{e}")
+    try:
+        schedule = SchedulePolicy.from_settings(settings)
+    except ValueError as e:
+        schedule = None  # Typo in settings.json, start downloads right away in priority order
+        messagebox.showwarning("Schedule", f"Ignoring the scheduling settings:\n{e}")
+    scheduler = DownloadScheduler(settings['max_concurrent_downloads'],
+                                  progress_rate=settings['progress_updates_per_second'],
+                                  global_rate_limit=int(settings['global_rate_limit_kbps'] * 1024),
+                                  index=get_download_index() if settings['skip_downloaded'] else None,
+                                  journal=JobJournal(),
+                                  metrics=get_metrics_registry(),
+                                  postprocessor=PostProcessor.from_settings(settings),
+                                  retry=RetryPolicy.from_settings(settings),
+                                  breaker=CircuitBreaker.from_settings(settings),
+                                  store=store,
+                                  schedule=schedule)
+
+    prefetcher = Prefetcher()
+
+    def on_close():
+        prefetcher.cancel()
+        scheduler.shutdown()
+        root.destroy()
+    root.protocol("WM_DELETE_WINDOW", on_close)
+
+    # Check FFmpeg availability and load yt-dlp after the window is up
+    start_background_probe(root)
 
     # Download Path
     download_path_var = tk.StringVar(value=get_downloads_folder())
@@ -527,12 +758,18 @@ def create_gui():
     url_label.pack(side=tk.LEFT, padx=(0, 5))
     url_entry = ttk.Entry(url_button_frame, width=50)
     url_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+    if settings['prefetch_delay_ms'] > 0:
+        # Typing or pasting starts a probe, so Check is usually instant
+        for sequence in ('<KeyRelease>', '<<Paste>>'):
+            url_entry.bind(sequence, lambda event: url_changed(event, url_entry, prefetcher, root,
+                                                               settings['prefetch_delay_ms']))
     
     # Check Button (new)
     check_button = ttk.Button(
         url_button_frame,
         text="Check",
-        command=lambda: check_url(url_entry, res_dropdown, download_type, root, output_text)
+        width=10,  # Room for the busy spinner
+        command=lambda: check_url(url_entry, res_dropdown, download_type, output_text, check_button, ui_tick)
     )
     check_button.pack(side=tk.LEFT, padx=(5,0))
 
@@ -541,12 +778,37 @@ def create_gui():
         url_button_frame,
         text="Download",
         command=lambda: download_button_clicked(
-            root, url_entry, download_type, output_text, download_path_var, progress_var, res_dropdown
+            root, url_entry, download_type, output_text, download_path_var, progress_var, res_dropdown, scheduler,
+            clip_var
         ),
         state="disabled"  # Disable button by default
     )
     download_button.pack(side=tk.LEFT, padx=(5,0))
 
+    # Cancel Button (stops the jobs selected in the job list)
+    cancel_button = ttk.Button(
+        url_button_frame,
+        text="Cancel",
+        command=lambda: job_table.run_action(cancel_action)
+    )
+    cancel_button.pack(side=tk.LEFT, padx=(5,0))
+
+    # Batch Button (playlists, channels and URL lists)
+    batch_button = ttk.Button(
+        url_button_frame,
+        text="Batch...",
+        command=lambda: open_batch_window(root, scheduler, download_type, download_path_var, settings)
+    )
+    batch_button.pack(side=tk.LEFT, padx=(5,0))
+
+    # Stats Button (phase timings and throughput)
+    stats_button = ttk.Button(
+        url_button_frame,
+        text="Stats",
+        command=lambda: open_stats_window(root, scheduler)
+    )
+    stats_button.pack(side=tk.LEFT, padx=(5,0))
+
     # Progress Bar (added here)
     progress_var = tk.DoubleVar()
     progress_bar = ttk.Progressbar(root, variable=progress_var, maximum=100)
@@ -585,6 +847,39 @@ def create_gui():
                                  command=on_radio_change)
     audio_radio.pack(side=tk.LEFT, padx=(10, 0))  # 10 pixels space between radio buttons
 
+    # Number of downloads allowed to run at once
+    def on_parallel_change():
+        try:
+            count = int(parallel_var.get())
+        except (tk.TclError, ValueError):
+            return
+        scheduler.set_max_workers(count)
+        settings['max_concurrent_downloads'] = scheduler.max_workers
+        save_settings(settings)
+
+    parallel_var = tk.IntVar(value=scheduler.max_workers)
+    parallel_label = ttk.Label(radio_frame, text="Parallel:")
+    parallel_label.pack(side=tk.LEFT, padx=(20, 5))
+    parallel_spinbox = ttk.Spinbox(radio_frame, from_=1, to=8, width=3, textvariable=parallel_var,
+                                   command=on_parallel_change)
+    parallel_spinbox.pack(side=tk.LEFT)
+
+    # Turbo mode (parallel fragments / external downloader) for throttled links
+    def on_turbo_change():
+        settings['turbo_mode'] = turbo_var.get()
+        save_settings(settings)
+
+    turbo_var = tk.BooleanVar(value=settings['turbo_mode'])
+    turbo_check = ttk.Checkbutton(radio_frame, text="Turbo", variable=turbo_var, command=on_turbo_change)
+    turbo_check.pack(side=tk.LEFT, padx=(20, 0))
+
+    # Optional time ranges ("1:00-1:30,2:00-2:10"); only those parts are downloaded
+    clip_var = tk.StringVar()
+    clip_label = ttk.Label(radio_frame, text="Clip:")
+    clip_label.pack(side=tk.LEFT, padx=(20, 5))
+    clip_entry = ttk.Entry(radio_frame, width=16, textvariable=clip_var)
+    clip_entry.pack(side=tk.LEFT)
+
     # Add Resolution Dropdown after radio buttons
     res_frame = ttk.Frame(root)
     res_frame.grid(row=2, column=1, padx=5, pady=5, sticky="e")
@@ -592,19 +887,53 @@ def create_gui():
     res_label = ttk.Label(res_frame, text="Resolution:")
     res_label.pack(side=tk.LEFT, padx=(0, 5))
     
-    res_dropdown = ttk.Combobox(res_frame, width=20, state="readonly")
+    res_dropdown = ttk.Combobox(res_frame, width=30, state="readonly")
     res_dropdown['values'] = ["Auto (up to 1080p only)"]  # Default for video
     res_dropdown.set("Auto (up to 1080p only)")
     res_dropdown.pack(side=tk.LEFT)
 
+    # Job list: every queued, running and finished download, with per-job actions on right-click
+    cancel_action = ("Cancel", lambda jobs: [scheduler.cancel(job.id) for job in jobs],
+                     ('queued', 'running', 'processing', 'paused'))
+    job_table = JobTable(root, height=settings['job_table_rows'], actions=(
+        ("Pause", lambda jobs: [scheduler.pause(job.id) for job in jobs], ('queued', 'running')),
+        ("Resume", lambda jobs: [scheduler.resume(job.id) for job in jobs], ('paused',)),
+        cancel_action,
+        None,
+        ("Raise Priority", lambda jobs: change_priority(scheduler, job_table, jobs, 1), ('queued', 'paused')),
+        ("Lower Priority", lambda jobs: change_priority(scheduler, job_table, jobs, -1), ('queued', 'paused')),
+    ))
+    job_table.frame.grid(row=4, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
+    job_table.tree.bind("<Delete>", lambda event: job_table.run_action(cancel_action))
+
     # Output Text Area
     output_text = scrolledtext.ScrolledText(root, height=10, state="disabled")
-    output_text.grid(row=4, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
+    output_text.grid(row=5, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
+
+    # Feed scheduler progress back into the widgets
+    log_view = LogView(output_text, settings['log_max_lines'])
+    # One adaptive timer polls the scheduler, redraws the job list and watches Check
+    ui_tick = UiTick(root)
+    ui_tick.add(lambda frame: poll_scheduler_events(root, scheduler, log_view, progress_var, job_table))
+    ui_tick.add(job_table.tick)
+    # Download, Batch and Cancel change the queue, so switch to the fast rate before their events arrive
+    root.bind_all('<ButtonRelease-1>', lambda event: ui_tick.wake(), add='+')
+
+    # Pick up downloads that were still queued or running when the app last closed
+    restored = restore_jobs(scheduler.journal)
+    for job in restored:
+        scheduler.submit(job)
+    if restored:
+        log_view.append(f"Restored {len(restored)} unfinished download(s)\n")
+    scheduler.journal.prune()
+
+    if startup_report:
+        report_startup(root, startup_report)
 
     root.mainloop()
 
-def check_url(url_entry, res_dropdown, download_type, root, output_text):
-    """Handle Check button click"""
+def check_url(url_entry, res_dropdown, download_type, output_text, check_button, ui_tick):
+    """Handle Check button click; the button spins until the formats are in"""
     url = url_entry.get()
     format_type = 'v' if download_type.get() == 1 else 'a'
     
@@ -629,17 +958,18 @@ def check_url(url_entry, res_dropdown, download_type, root, output_text):
         download_button.configure(state='disabled')
     
     if url.strip():  # Check URL for both video and audio
-        loading = LoadingIndicator(root, "Fetching available formats")
+        check_button.configure(state='disabled')
         result_queue = Queue()
         
         def fetch_formats():
             get_available_formats(url, result_queue, format_type)
             
-        def check_queue():
+        def check_queue(frame):
             try:
                 if not result_queue.empty():
                     status, data = result_queue.get()
-                    loading.destroy()
+                    ui_tick.discard(check_queue)
+                    check_button.configure(text="Check", state='normal')
                     
                     if status == 'success':
                         formats, metadata = data
@@ -681,11 +1011,16 @@ def check_url(url_entry, res_dropdown, download_type, root, output_text):
                                     f"Description: {metadata['description']}\n"
                                     f"\nAvailable {'video' if format_type == 'v' else 'audio'} formats: {len(formats)-1}\n"
                                 )
+
+                                # Mention copies we already have (Download will skip or relink them)
+                                if metadata['id'] and metadata['extractor']:
+                                    for row in get_download_index().lookup(metadata['extractor'], metadata['id']):
+                                        if os.path.exists(row['path']):
+                                            info_text += f"Already downloaded: {row['path']}\n"
                                 
                                 output_text.insert(tk.END, info_text)
                                 output_text.see(tk.END)
                                 output_text.configure(state="disabled")
-                                root.update()
                         else:
                             default_text = "Auto (up to 1080p only)" if format_type == 'v' else "Auto (best quality)"
                             res_dropdown['values'] = [default_text]
@@ -697,7 +1032,6 @@ def check_url(url_entry, res_dropdown, download_type, root, output_text):
                                 output_text.insert(tk.END, f"No {'video' if format_type == 'v' else 'audio'} formats found for this URL.\n")
                                 output_text.see(tk.END)  # Make sure text is visible
                                 output_text.configure(state="disabled")
-                                root.update()  # Force update of display
                     else:
                         messagebox.showerror("Error", f"Failed to fetch formats: {data}")
                         default_text = "Auto (up to 1080p only)" if format_type == 'v' else "Auto (best quality)"
@@ -710,10 +1044,10 @@ def check_url(url_entry, res_dropdown, download_type, root, output_text):
                             output_text.insert(tk.END, f"Error: {data}\n")
                             output_text.see(tk.END)  # Make sure text is visible
                             output_text.configure(state="disabled")
-                            root.update()  # Force update of display
                 else:
-                    root.after(100, check_queue)
-            except tk.TkError:
+                    check_button.configure(text=f"Check {ui_tick.spinner(frame)}")
+                    return True
+            except tk.TclError:
                 # Handle case where window was closed during loading
                 pass
                 
@@ -721,8 +1055,15 @@ def check_url(url_entry, res_dropdown, download_type, root, output_text):
         thread = threading.Thread(target=fetch_formats, daemon=True)
         thread.start()
         
-        # Start checking for results
-        root.after(100, check_queue)
+        # Check for results on the UI tick
+        ui_tick.add(check_queue)
 
 if __name__ == "__main__":
-    create_gui()
\ No newline at end of file
+    # Post-processing runs on a process pool; the frozen executable must not start another GUI in each worker
+    import multiprocessing
+    multiprocessing.freeze_support()
+    # --startup-report PATH writes startup timings and exits (used by build.py --measure-startup)
+    report_path = None
+    if "--startup-report" in sys.argv[1:-1]:
+        report_path = sys.argv[sys.argv.index("--startup-report") + 1]
+    create_gui(report_path)
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""Stand-in for the yt-dlp executable that only talks to the benchmark media server.
+
+It understands the options SubprocessBackend passes (-j, --flat-playlist -J or -j,
+-f, -o, --paths, --continue, --progress-template, --print-to-file, -r) and
+prints progress records in the same "[progress] {json}" form as the real
+template, one per received chunk. Set FAKE_YTDLP_CHUNK_KB to change how
+often progress is printed.
+"""
+import json
+import os
+import re
+import sys
+import time
+import urllib.error
+import urllib.request
+
+PROGRESS_PREFIX = "[progress] "
+CHUNK_SIZE = int(float(os.environ.get('FAKE_YTDLP_CHUNK_KB', '16')) * 1024)
+
+def fetch_json(url):
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return json.load(response)
+
+def parse(argv):
+    """Split the command line into flags, options with values and the URL"""
+    with_value = {'-f', '-S', '-o', '--output-na-placeholder', '--paths', '--progress-template', '-r',
+                  '--limit-rate', '-N', '--downloader', '--downloader-args', '--http-chunk-size'}
+    flags, options, urls = set(), {}, []
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == '--print-to-file':
+            options[arg] = (argv[i + 1], argv[i + 2])
+            i += 3
+            continue
+        if arg in with_value:
+            options[arg] = argv[i + 1]
+            i += 2
+            continue
+        if arg.startswith('-'):
+            flags.add(arg)
+        else:
+            urls.append(arg)
+        i += 1
+    return flags, options, urls
+
+def parse_rate(text):
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([KMG]?)', text.upper())
+    if not match:
+        return None
+    return float(match.group(1)) * {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}[match.group(2)]
+
+def progress(status, downloaded, total, speed=None, eta=None):
+    record = {'status': status, 'downloaded_bytes': downloaded, 'total_bytes': total, 'speed': speed, 'eta': eta}
+    print(PROGRESS_PREFIX + json.dumps(record), flush=True)
+
+def requested_formats(info, spec):
+    """Formats named by a '137,140' spec (downloaded separately), else the muxed fallback"""
+    by_id = {fmt['format_id']: fmt for fmt in info['formats']}
+    ids = spec.split(',') if spec else []
+    if ids and all(format_id in by_id for format_id in ids):
+        return [by_id[format_id] for format_id in ids]
+    return [info['formats'][-1]]
+
+def output_path(info, fmt, options):
+    folder = options.get('--paths', 'home:.').split(':', 1)[1]
+    template = options.get('-o', '%(title)s.%(ext)s')
+    fields = {'title': re.sub(r'[^\w.-]', '_', info['title']), 'id': info['id'], 'ext': fmt['ext'],
+              'format_id': fmt['format_id']}
+    return os.path.join(folder, re.sub(r'%\((\w+)\)s', lambda m: str(fields.get(m.group(1), '')), template))
+
+def download(info, options, flags):
+    formats = requested_formats(info, options.get('-f'))
+    print(f"[info] {info['id']}: Downloading {len(formats)} format(s): {options.get('-f', '')}", flush=True)
+    for fmt in formats:
+        path = download_format(info, fmt, output_path(info, fmt, options), options, flags)
+        if '--print-to-file' in options:
+            _, result_path = options['--print-to-file']
+            with open(result_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'id': info['id'], 'extractor_key': info['extractor_key'], 'filepath': path}) + '\n')
+
+def download_format(info, fmt, path, options, flags):
+    total = fmt['filesize']
+    part = path + '.part'
+    rate = parse_rate(options.get('-r', options.get('--limit-rate', '')))
+
+    print(f"[download] Destination: {path}", flush=True)
+    start = os.path.getsize(part) if '--continue' in flags and os.path.exists(part) else 0
+    request = urllib.request.Request(fmt['url'], headers={'Range': f"bytes={start}-"} if start else {})
+    downloaded = start
+    began = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=30) as response, open(part, 'ab' if start else 'wb') as f:
+        while True:
+            chunk = response.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+            downloaded += len(chunk)
+            elapsed = time.perf_counter() - began
+            speed = (downloaded - start) / elapsed if elapsed else None
+            if rate:
+                ahead = (downloaded - start) / rate - elapsed
+                if ahead > 0:
+                    time.sleep(ahead)
+            eta = int((total - downloaded) / speed) if speed else None
+            progress('downloading', downloaded, total, speed, eta)
+    os.replace(part, path)
+    progress('finished', downloaded, total)
+    return path
+
+def main(argv):
+    flags, options, urls = parse(argv)
+    if not urls:
+        print("ERROR: no URL given", file=sys.stderr)
+        return 2
+    try:
+        info = fetch_json(urls[-1])
+        if '-j' in flags and '--flat-playlist' in flags and info.get('_type') == 'playlist':
+            for entry in info['entries']:  # One line per entry, like yt-dlp with --lazy-playlist
+                print(json.dumps(entry), flush=True)
+            return 0
+        if '-j' in flags or '-J' in flags:
+            print(json.dumps(info))
+            return 0
+        download(info, options, flags)
+        return 0
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,195 @@
+"""Local HTTP server with canned video pages and synthetic media at a chosen bandwidth and latency"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHUNK_SIZE = 64 * 1024
+
+def canned_info(base_url, video_id, media_size, duration=120):
+    """A yt-dlp style info dict for a fake video whose formats are served by this server"""
+    media_url = f"{base_url}/media/{video_id}.mp4"
+    formats = []
+    # Same shape as a YouTube response: audio-only, video-only variants and one muxed format
+    for format_id, ext, vcodec, acodec, height, tbr in (
+        ('139', 'm4a', 'none', 'mp4a.40.5', None, 48),
+        ('140', 'm4a', 'none', 'mp4a.40.2', None, 129),
+        ('251', 'webm', 'none', 'opus', None, 135),
+        ('160', 'mp4', 'avc1.4d400c', 'none', 144, 100),
+        ('134', 'mp4', 'avc1.4d401e', 'none', 360, 600),
+        ('136', 'mp4', 'avc1.4d401f', 'none', 720, 2500),
+        ('247', 'webm', 'vp9', 'none', 720, 1500),
+        ('137', 'mp4', 'avc1.640028', 'none', 1080, 4500),
+        ('399', 'mp4', 'av01.0.08M.08', 'none', 1080, 2500),
+        ('18', 'mp4', 'avc1.42001E', 'mp4a.40.2', 360, 700),
+    ):
+        formats.append({
+            'format_id': format_id, 'ext': ext, 'vcodec': vcodec, 'acodec': acodec, 'height': height,
+            'width': height * 16 // 9 if height else None, 'fps': 30 if height else None, 'tbr': tbr,
+            'abr': tbr if vcodec == 'none' else None, 'asr': 44100 if acodec != 'none' else None,
+            'filesize': media_size, 'protocol': 'http', 'url': media_url,
+        })
+    return {
+        'id': video_id, 'title': f"Benchmark video {video_id}", 'extractor': 'generic', 'extractor_key': 'Generic',
+        'webpage_url': f"{base_url}/watch/{video_id}", 'duration': duration, 'uploader': 'benchmarks',
+        'view_count': 0, 'upload_date': '20240101', 'formats': formats,
+    }
+
+def media_bytes(video_id, start, end):
+    """Deterministic synthetic bytes for the range [start, end)"""
+    seed = (video_id.encode() * 8)[:64] or b'\0'
+    block = (seed * (CHUNK_SIZE // len(seed) + 1))[:CHUNK_SIZE]
+    offset = start % CHUNK_SIZE
+    data = (block[offset:] + block * ((end - start) // CHUNK_SIZE + 1))[:end - start]
+    return data
+
+class MediaServer:
+    """Serves /watch/<id> (info JSON), /media/<id>.mp4 and /playlist/<count> on 127.0.0.1.
+
+    bandwidth (bytes per second, per connection) and latency (seconds before
+    the first byte of every response) shape the transfers; media_size is the
+    length of every media file. Range requests are honoured so yt-dlp can
+    resume and split downloads.
+    """
+
+    def __init__(self, media_size=1024 * 1024, bandwidth=None, latency=0.0, port=0):
+        self.media_size = media_size
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def video_url(self, video_id):
+        return f"{self.base_url}/watch/{video_id}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, sent):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += sent
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+            def do_HEAD(self):
+                self._respond(head=True)
+
+            def do_GET(self):
+                self._respond(head=False)
+
+            def _respond(self, head):
+                if server.latency:
+                    time.sleep(server.latency)
+                path = self.path.split('?')[0]
+                match = re.fullmatch(r'/watch/([\w-]+)', path)
+                if match:
+                    info = canned_info(server.base_url, match.group(1), server.media_size)
+                    return self._send_json(info, head)
+                match = re.fullmatch(r'/playlist/(\d+)', path)
+                if match:
+                    entries = [{'_type': 'url', 'id': f"v{i:07d}", 'url': server.video_url(f"v{i:07d}")}
+                               for i in range(int(match.group(1)))]
+                    return self._send_json({'_type': 'playlist', 'id': 'bench', 'title': 'Benchmark playlist',
+                                            'entries': entries}, head)
+                match = re.fullmatch(r'/media/([\w-]+)\.mp4', path)
+                if match:
+                    return self._send_media(match.group(1), head)
+                self.send_error(404)
+
+            def _send_json(self, data, head):
+                body = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if not head:
+                    self.wfile.write(body)
+                server._count(0 if head else len(body))
+
+            def _send_media(self, video_id, head):
+                size = server.media_size
+                start, end = 0, size
+                match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+                if match:
+                    start = int(match.group(1))
+                    end = min(int(match.group(2)) + 1, size) if match.group(2) else size
+                    if start >= size:
+                        self.send_response(416)
+                        self.send_header('Content-Range', f"bytes */{size}")
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header('Content-Range', f"bytes {start}-{end - 1}/{size}")
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Type', 'video/mp4')
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('Content-Length', str(end - start))
+                self.end_headers()
+                if head:
+                    return server._count(0)
+
+                sent = 0
+                began = time.perf_counter()
+                try:
+                    for offset in range(start, end, CHUNK_SIZE):
+                        chunk = media_bytes(video_id, offset, min(offset + CHUNK_SIZE, end))
+                        self.wfile.write(chunk)
+                        sent += len(chunk)
+                        if server.bandwidth:
+                            # Sleep until the transfer is back on the target rate
+                            ahead = sent / server.bandwidth - (time.perf_counter() - began)
+                            if ahead > 0:
+                                time.sleep(ahead)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client cancelled
+                server._count(sent)
+
+        return Handler
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve synthetic videos for the benchmarks")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--size-mb", type=float, default=1.0, help="Size of every media file")
+    parser.add_argument("--bandwidth-kbps", type=int, default=0, help="Per-connection rate in KiB/s, 0 = unlimited")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before every response")
+    args = parser.parse_args()
+    with MediaServer(int(args.size_mb * 1024 * 1024), args.bandwidth_kbps * 1024 or None,
+                     args.latency_ms / 1000, args.port) as media_server:
+        print(f"Serving on {media_server.base_url} (try {media_server.video_url('demo')})")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
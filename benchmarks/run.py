@@ -0,0 +1,450 @@
+"""Offline benchmarks for probing, downloading, batches, progress events and queue scheduling.
+
+Everything runs against benchmarks/media_server.py on 127.0.0.1, with
+benchmarks/fake_yt_dlp.py standing in for the yt-dlp executable (or the real
+yt_dlp package with --backend library), and an app data folder in a
+temporary directory so the user's caches and index are never touched.
+
+    python benchmarks/run.py --output results/baseline.json
+    python benchmarks/run.py --scenario probe --scenario downloads --compare results/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from queue import Empty, Queue
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from media_server import MediaServer  # noqa: E402
+
+SCENARIOS = ('probe', 'downloads', 'batch', 'progress', 'infojson', 'schedule')
+
+def summarize(samples):
+    """Timing summary in milliseconds"""
+    samples = sorted(samples)
+    if not samples:
+        return {}
+    return {
+        'runs': len(samples),
+        'mean_ms': round(statistics.mean(samples) * 1000, 3),
+        'p50_ms': round(samples[len(samples) // 2] * 1000, 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+        'min_ms': round(samples[0] * 1000, 3),
+        'max_ms': round(samples[-1] * 1000, 3),
+    }
+
+def make_stub_command(folder):
+    """A yt-dlp command that runs fake_yt_dlp.py with this interpreter, as one executable path"""
+    stub = os.path.join(HERE, "fake_yt_dlp.py")
+    if os.name == 'nt':
+        path = os.path.join(folder, "yt-dlp.cmd")
+        with open(path, "w") as f:
+            f.write(f'@"{sys.executable}" "{stub}" %*\n')
+    else:
+        path = os.path.join(folder, "yt-dlp")
+        with open(path, "w") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{stub}" "$@"\n')
+        os.chmod(path, 0o755)
+    return path
+
+class Bench:
+    """Shared state for one benchmark run: media servers, URLs and output folder"""
+
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        self.library = args.backend == 'library'
+
+    def url(self, server, video_id):
+        # The library backend goes through yt-dlp's generic extractor, which needs a direct media link
+        return f"{server.base_url}/media/{video_id}.mp4" if self.library else server.video_url(video_id)
+
+    def output_dir(self, name):
+        path = os.path.join(self.workdir, "out", name)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        return path
+
+    def wait_for(self, scheduler, count, on_event=None, timeout=None):
+        """Drain scheduler events until count jobs are finished. Returns {job id: status}."""
+        finished = {}
+        deadline = time.monotonic() + (timeout or self.args.timeout)
+        while len(finished) < count:
+            try:
+                event = scheduler.events.get(timeout=0.1)
+            except Empty:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{len(finished)} of {count} jobs finished before the timeout")
+                continue
+            kind, job, payload = event
+            if on_event:
+                on_event(event)
+            if kind == 'status' and payload in ('done', 'failed', 'cancelled'):
+                finished[job.id] = payload
+        return finished
+
+def bench_probe(bench):
+    """Latency of get_available_formats: cold (backend probe) and warm (metadata cache hit)"""
+    from video_downloader import get_available_formats
+
+    args = bench.args
+    with MediaServer(latency=args.latency_ms / 1000) as server:
+        urls = [bench.url(server, f"probe{i:05d}") for i in range(args.probe_runs)]
+        results = {}
+        for phase in ('cold', 'warm'):
+            samples = []
+            errors = 0
+            for url in urls:
+                result_queue = Queue()
+                began = time.perf_counter()
+                get_available_formats(url, result_queue, 'v')
+                samples.append(time.perf_counter() - began)
+                status, _ = result_queue.get()
+                errors += status != 'success'
+            results[phase] = dict(summarize(samples), errors=errors)
+        results['server_requests'] = server.requests
+    return results
+
+def bench_downloads(bench):
+    """N-way concurrent downloads through the scheduler: wall time and aggregate throughput"""
+    from video_downloader import DownloadJob, DownloadScheduler
+
+    args = bench.args
+    size = int(args.size_mb * 1024 * 1024)
+    results = {}
+    with MediaServer(size, args.bandwidth_kbps * 1024 or None, args.latency_ms / 1000) as server:
+        for workers in args.concurrency:
+            scheduler = DownloadScheduler(workers, progress_rate=args.progress_rate)
+            folder = bench.output_dir(f"downloads-{workers}")
+            started = {}
+            durations = []
+
+            def on_event(event, started=started, durations=durations):
+                kind, job, payload = event
+                if kind == 'status' and payload == 'running':
+                    started[job.id] = time.perf_counter()
+                elif kind == 'status' and payload in ('done', 'failed'):
+                    durations.append(time.perf_counter() - started[job.id])
+
+            began = time.perf_counter()
+            for i in range(workers):
+                scheduler.submit(DownloadJob(bench.url(server, f"dl{workers}x{i}"), 'v', folder))
+            finished = bench.wait_for(scheduler, workers, on_event)
+            wall = time.perf_counter() - began
+            scheduler.shutdown()
+            done = sum(1 for status in finished.values() if status == 'done')
+            results[str(workers)] = {
+                'wall_s': round(wall, 3),
+                'aggregate_mib_s': round(done * size / wall / 1024 / 1024, 3),
+                'per_job': summarize(durations),
+                'failed': workers - done,
+            }
+    return results
+
+def bench_batch(bench):
+    """A large URL list through BatchPipeline: probe/queue rate and end-to-end time"""
+    from video_downloader import BatchPipeline, DownloadScheduler
+
+    args = bench.args
+    with MediaServer(args.batch_media_kb * 1024, latency=args.latency_ms / 1000) as server:
+        urls = [bench.url(server, f"batch{i:06d}") for i in range(args.batch_size)]
+        if args.batch_download:
+            scheduler = DownloadScheduler(args.jobs, progress_rate=args.progress_rate)
+        else:
+            scheduler = QueueOnlyScheduler()
+        pipeline = BatchPipeline(scheduler, 'v', bench.output_dir("batch"), args.probe_jobs)
+        first_queued = []
+        resolved_at = []
+
+        def on_event(event):
+            kind, _, payload = event
+            if kind == 'status' and payload == 'queued' and not first_queued:
+                first_queued.append(time.perf_counter())
+            elif kind == 'log' and payload.startswith("Batch finished resolving"):
+                resolved_at.append(time.perf_counter())
+
+        began = time.perf_counter()
+        resolver = pipeline.start(urls)
+        finished = {}
+        if args.batch_download:
+            finished = bench.wait_for(scheduler, len(urls), on_event)
+            done = time.perf_counter()
+        resolver.join(args.timeout)
+        resolved = resolved_at[0] if resolved_at else time.perf_counter()
+        scheduler.shutdown()
+        if not args.batch_download and scheduler.first_submit:
+            first_queued.append(scheduler.first_submit)
+
+        result = {
+            'urls': len(urls),
+            'queued': pipeline.queued,
+            'probe_failures': pipeline.failed,
+            'resolve_s': round(resolved - began, 3),
+            'probes_per_s': round(len(urls) / (resolved - began), 1),
+        }
+        if first_queued:
+            result['first_queued_ms'] = round((first_queued[0] - began) * 1000, 1)
+        if args.batch_download:
+            result.update(
+                total_s=round(done - began, 3),
+                videos_per_s=round(len(urls) / (done - began), 1),
+                failed=sum(1 for status in finished.values() if status != 'done'),
+            )
+    return result
+
+class QueueOnlyScheduler:
+    """Takes jobs from BatchPipeline without running them, to time probing on its own"""
+    index = None
+
+    def __init__(self):
+        self.events = Queue()
+        self.jobs = {}
+        self.first_submit = None
+
+    def submit(self, job):
+        self.first_submit = self.first_submit or time.perf_counter()
+        self.jobs[job.id] = job
+        self.events.put(('status', job, 'queued'))
+        return job
+
+    def shutdown(self):
+        pass
+
+class TimedQueue(Queue):
+    """Event queue that remembers when each item was put, to measure delivery latency"""
+
+    def _put(self, item):
+        super()._put((time.perf_counter(), item))
+
+    def _get(self):
+        self.last_put, item = super()._get()
+        return item
+
+def bench_progress(bench):
+    """Progress parsing/throttling throughput and how long events wait for a 100 ms UI poll"""
+    from video_downloader import DownloadJob, DownloadScheduler
+    from video_downloader.progress import PROGRESS_PREFIX, ProgressThrottle, progress_event_from_dict
+
+    args = bench.args
+    results = {}
+
+    # Hot path of the subprocess backend for every progress line, without any I/O
+    line = PROGRESS_PREFIX + json.dumps({'status': 'downloading', 'downloaded_bytes': 1048576,
+                                         'total_bytes': 10485760, 'speed': 2097152.0, 'eta': 4})
+    throttle = ProgressThrottle(args.progress_rate)
+    events = Queue()
+    count = 200000
+    began = time.perf_counter()
+    for _ in range(count):
+        event = progress_event_from_dict(json.loads(line[len(PROGRESS_PREFIX):]))
+        if throttle.ready(event):
+            events.put(('progress', None, event))
+    elapsed = time.perf_counter() - began
+    results['parse_throttle'] = {'lines': count, 'lines_per_s': round(count / elapsed), 'delivered': events.qsize()}
+
+    # End to end: a download printing a progress record every chunk, drained like
+    # poll_scheduler_events does from root.after(100, ...)
+    size = int(args.size_mb * 1024 * 1024)
+    with MediaServer(size, args.bandwidth_kbps * 1024 or None) as server:
+        scheduler = DownloadScheduler(1, events=TimedQueue(), progress_rate=args.progress_rate)
+        scheduler.submit(DownloadJob(bench.url(server, "progress"), 'v', bench.output_dir("progress")))
+        waits, tick_costs, batch_sizes = [], [], []
+        progress_events = 0
+        deadline = time.monotonic() + args.timeout
+        finished = False
+        while not finished and time.monotonic() < deadline:
+            time.sleep(0.1)
+            tick = time.perf_counter()
+            drained = 0
+            try:
+                while True:
+                    kind, job, payload = scheduler.events.get_nowait()
+                    waits.append(tick - scheduler.events.last_put)
+                    drained += 1
+                    progress_events += kind == 'progress'
+                    finished = finished or (kind == 'status' and payload in ('done', 'failed'))
+            except Empty:
+                pass
+            tick_costs.append(time.perf_counter() - tick)
+            batch_sizes.append(drained)
+        scheduler.shutdown()
+        results['ui_poll'] = {
+            'progress_events': progress_events,
+            'chunk_kb': float(os.environ.get('FAKE_YTDLP_CHUNK_KB', '16')),
+            'event_wait': summarize(waits),
+            'tick_cost': summarize(tick_costs),
+            'max_events_per_tick': max(batch_sizes or [0]),
+        }
+    return results
+
+def long_info_json(format_count, fragment_count):
+    """-j output shaped like a long live replay: fragment lists per format and captions in 150 languages"""
+    formats = [{
+        'format_id': str(100 + n), 'format_note': '1080p', 'ext': 'mp4', 'vcodec': 'avc1.640028', 'acodec': 'none',
+        'width': 1920, 'height': 1080, 'fps': 30, 'tbr': 4000.0 + n, 'filesize_approx': 1800000000,
+        'url': 'https://media.example/videoplayback?' + 'x' * 400, 'manifest_url': 'https://media.example/dash',
+        'http_headers': {'User-Agent': 'Mozilla/5.0', 'Accept': '*/*'},
+        'fragments': [{'url': f'https://media.example/sq/{i}', 'duration': 5.0} for i in range(fragment_count)],
+    } for n in range(format_count)]
+    captions = {f'lang{n}': [{'ext': ext, 'url': f'https://media.example/timedtext?lang={n}&fmt={ext}',
+                              'name': f'Language {n}'} for ext in ('json3', 'srv1', 'srv2', 'srv3', 'ttml', 'vtt')]
+                for n in range(150)}
+    return json.dumps({'id': 'replay', 'title': 'Live replay', 'duration': 36000, 'extractor_key': 'Youtube',
+                       'formats': formats, 'automatic_captions': captions,
+                       'heatmap': [{'start_time': i * 36.0, 'value': 0.5} for i in range(1000)]}).encode()
+
+def bench_infojson(bench):
+    """Parse time and memory for a large -j output: full json.loads vs the projected parser"""
+    from video_downloader import parse_info_json, project_info
+
+    args = bench.args
+    data = long_info_json(args.info_formats, args.info_fragments)
+    results = {'bytes': len(data)}
+    parsers = {'json_loads': lambda: project_info(json.loads(data)), 'projected': lambda: parse_info_json(data)}
+    for name, parse in parsers.items():
+        samples = []
+        for _ in range(5):
+            began = time.perf_counter()
+            parse()
+            samples.append(time.perf_counter() - began)
+        tracemalloc.start()
+        parse()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = dict(summarize(samples), peak_mb=round(peak / 1024 / 1024, 1))
+    return results
+
+def bench_schedule(bench):
+    """Completion times of a queue of a few archives and many small clips per queue order, on a simulated clock"""
+    from video_downloader import SchedulePolicy, SimulatedClock, parse_windows, simulate
+
+    args = bench.args
+    mb = 1024 * 1024
+    jobs = [(args.schedule_large_gb * 1024 * mb, 0)] * args.schedule_large
+    jobs += [(args.schedule_small_mb * mb, 0)] * args.schedule_small
+    is_small = [size < 1024 * mb for size, _ in jobs]
+    link = args.schedule_link_mbps * mb
+    results = {}
+    for name, windows in (('anytime', ''), ('off_peak', args.schedule_off_peak)):
+        for order in ('fifo', 'sjf'):
+            # Submitted at 09:00, the large jobs first
+            policy = SchedulePolicy(parse_windows(windows), 1024 * mb, None, order, SimulatedClock("09:00"))
+            done = simulate(jobs, policy, link, workers=args.jobs)
+            small = [t for t, flag in zip(done, is_small) if flag]
+            results[f"{name}_{order}"] = {
+                'mean_s': round(statistics.mean(done), 1),
+                'small_mean_s': round(statistics.mean(small), 1),
+                'small_max_s': round(max(small), 1),
+                'makespan_h': round(max(done) / 3600, 2),
+            }
+    return results
+
+RUNNERS = {'probe': bench_probe, 'downloads': bench_downloads, 'batch': bench_batch, 'progress': bench_progress,
+           'infojson': bench_infojson, 'schedule': bench_schedule}
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=HERE).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(old, new, path=()):
+    """Lines describing how each timing or rate changed between two result files"""
+    lines = []
+    for key, value in new.items():
+        before = old.get(key) if isinstance(old, dict) else None
+        if isinstance(value, dict):
+            lines += compare(before or {}, value, path + (key,))
+        elif isinstance(value, (int, float)) and isinstance(before, (int, float)) and before:
+            change = (value - before) / before * 100
+            lines.append(f"{'.'.join(path + (key,))}: {before} -> {value} ({change:+.1f}%)")
+    return lines
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline Video Downloader benchmarks")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--backend", choices=['subprocess', 'library'], default='subprocess',
+                        help="'subprocess' runs the fake yt-dlp, 'library' the real yt_dlp package in-process")
+    parser.add_argument("--output", help="Write the JSON results to this file (default: stdout)")
+    parser.add_argument("--compare", metavar="FILE", help="Print the change against an earlier results file")
+    parser.add_argument("--probe-runs", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Worker counts for the downloads scenario")
+    parser.add_argument("--size-mb", type=float, default=4.0, help="Media size for downloads and progress")
+    parser.add_argument("--bandwidth-kbps", type=int, default=4096,
+                        help="Per-connection server bandwidth in KiB/s (0 = unlimited)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Server delay before every response")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--batch-media-kb", type=int, default=64)
+    parser.add_argument("--no-batch-download", dest="batch_download", action="store_false",
+                        help="Only probe and queue the batch, cancel the downloads")
+    parser.add_argument("--jobs", type=int, default=3, help="Download workers for the batch scenario")
+    parser.add_argument("--probe-jobs", type=int, default=4, help="Probe workers for the batch scenario")
+    parser.add_argument("--progress-rate", type=int, default=10, help="Progress events per second per job")
+    parser.add_argument("--info-formats", type=int, default=120, help="Formats in the infojson scenario's JSON")
+    parser.add_argument("--info-fragments", type=int, default=1500, help="Fragments per format in that JSON")
+    parser.add_argument("--schedule-large", type=int, default=3, help="Archives in the schedule scenario's queue")
+    parser.add_argument("--schedule-large-gb", type=float, default=10.0)
+    parser.add_argument("--schedule-small", type=int, default=30, help="Clips queued behind the archives")
+    parser.add_argument("--schedule-small-mb", type=float, default=20.0)
+    parser.add_argument("--schedule-link-mbps", type=float, default=10.0, help="Simulated link speed in MiB/s")
+    parser.add_argument("--schedule-off-peak", default="22:00-07:00", help="Off-peak hours for the archives")
+    parser.add_argument("--timeout", type=float, default=600, help="Give up on a scenario after this many seconds")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="vd-bench-")
+    # Private app data (settings, metadata cache, index) for this run
+    os.environ['XDG_DATA_HOME'] = os.environ['LOCALAPPDATA'] = os.path.join(workdir, "data")
+    os.environ['VIDEO_DOWNLOADER_YTDLP'] = make_stub_command(workdir)
+    from video_downloader import get_app_data_dir
+    with open(os.path.join(get_app_data_dir(), "settings.json"), "w", encoding="utf-8") as f:
+        json.dump({'backend': args.backend}, f)
+
+    report = {
+        'commit': git_commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'compare', 'scenario')},
+        'scenarios': {},
+    }
+    try:
+        for name in args.scenario or SCENARIOS:
+            print(f"Running {name}...", file=sys.stderr, flush=True)
+            began = time.perf_counter()
+            report['scenarios'][name] = RUNNERS[name](Bench(args, workdir))
+            print(f"  {name} took {time.perf_counter() - began:.1f}s", file=sys.stderr, flush=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"Compared with {baseline.get('commit')}:", file=sys.stderr)
+        for line in compare(baseline['scenarios'], report['scenarios']):
+            print("  " + line, file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,13 @@
+import argparse
+import json
 import os
 import site
 import subprocess
 import sys
 import shutil
+import statistics
+import tempfile
+import time
 
 def find_ytdlp():
     # Get the scripts directory
@@ -23,12 +28,21 @@ def find_ytdlp():
     
     return None
 
-def cleanup_build_files():
-    # Move the executable to root directory
-    exe_path = os.path.join('dist', 'Video Downloader.exe')
-    if os.path.exists(exe_path):
-        shutil.move(exe_path, 'Video Downloader.exe')
-        print("Moved executable to root directory")
+def cleanup_build_files(profile='onefile'):
+    if profile == 'onedir':
+        # Move the whole application folder to root directory
+        app_dir = os.path.join('dist', 'Video Downloader')
+        if os.path.exists(app_dir):
+            if os.path.exists('Video Downloader'):
+                shutil.rmtree('Video Downloader')
+            shutil.move(app_dir, 'Video Downloader')
+            print("Moved application folder to root directory")
+    else:
+        # Move the executable to root directory
+        exe_path = os.path.join('dist', 'Video Downloader.exe')
+        if os.path.exists(exe_path):
+            shutil.move(exe_path, 'Video Downloader.exe')
+            print("Moved executable to root directory")
     
     # Delete build and dist folders
     folders_to_delete = ['build', 'dist']
@@ -43,7 +57,13 @@ def cleanup_build_files():
         os.remove(spec_file)
         print("Deleted spec file")
 
-def build_exe():
+def build_exe(profile='onefile'):
+    """Build with PyInstaller.
+
+    'onefile' gives a single exe that unpacks itself to a temp folder on every
+    launch. 'onedir' gives a folder with the exe next to its libraries, which
+    starts noticeably faster because nothing has to be unpacked.
+    """
     ytdlp_path = find_ytdlp()
     if not ytdlp_path:
         print("Error: Could not find yt-dlp.exe")
@@ -53,7 +73,7 @@ def build_exe():
     
     command = [
         'pyinstaller',
-        '--onefile',
+        f'--{profile}',
         '--windowed',
         f'--icon={icon_path}',
         f'--add-binary={ytdlp_path};.',
@@ -64,11 +84,60 @@ def build_exe():
         'Video Downloader.py'
     ]
     
-    print(f"Building with yt-dlp from: {ytdlp_path}")
+    print(f"Building {profile} with yt-dlp from: {ytdlp_path}")
     subprocess.run(command)
     
     # Clean up after successful build
-    cleanup_build_files()
+    cleanup_build_files(profile)
+
+def find_startup_target():
+    """Command that launches the app: the built executable if there is one, else the script"""
+    for exe_path in (os.path.join('Video Downloader', 'Video Downloader.exe'), 'Video Downloader.exe'):
+        if os.path.exists(exe_path):
+            return [exe_path]
+    return [sys.executable, 'Video Downloader.py']
+
+def measure_startup(runs=5):
+    """Launch the app several times and report how long it takes to show its window"""
+    target = find_startup_target()
+    print(f"Measuring startup of: {' '.join(target)} ({runs} runs)")
+
+    results = []
+    for _ in range(runs):
+        fd, report_path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        os.remove(report_path)  # The app creates it once the window is up
+        started = time.perf_counter()
+        subprocess.run(target + ['--startup-report', report_path], timeout=120)
+        wall = time.perf_counter() - started
+        try:
+            with open(report_path, encoding='utf-8') as f:
+                report = json.load(f)
+            os.remove(report_path)
+        except (OSError, ValueError):
+            print("No startup report was written (is a display available?)")
+            return None
+        # Wall time minus the in-process time is what happens before Python runs
+        # (for --onefile, mostly unpacking to the temp folder)
+        report['wall_seconds'] = round(wall, 4)
+        results.append(report)
+
+    summary = {}
+    for key in ('import_seconds', 'first_window_seconds', 'wall_seconds'):
+        values = [r[key] for r in results]
+        summary[key] = {'median': round(statistics.median(values), 4), 'min': round(min(values), 4)}
+    print(json.dumps(summary, indent=2))
+    return summary
 
 if __name__ == "__main__":
-    build_exe() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the Video Downloader executable")
+    parser.add_argument('--profile', choices=['onefile', 'onedir'], default='onefile',
+                        help="onefile: single exe (default). onedir: folder build with faster startup")
+    parser.add_argument('--measure-startup', nargs='?', type=int, const=5, metavar='RUNS',
+                        help="Report import time and time to first window instead of building")
+    args = parser.parse_args()
+
+    if args.measure_startup:
+        measure_startup(args.measure_startup)
+    else:
+        build_exe(args.profile)
\ No newline at end of file
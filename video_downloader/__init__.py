@@ -0,0 +1,50 @@
+"""Video Downloader core: probing, format selection, downloading and progress.
+
+Nothing in this package imports tkinter, so it can be used from scripts and
+on headless servers. The GUI lives in "Video Downloader.py".
+"""
+from .archive import DownloadIndex, get_download_index, reuse_existing_download
+from .backends import (
+    DownloadResult, LibraryBackend, SubprocessBackend, TransferOptions, get_backend
+)
+from .batch import BatchPipeline, expand_collection, read_url_list
+from .cache import MetadataCache, get_metadata_cache, video_cache_key
+from .download import download_video
+from .errors import (BlockedError, DownloadError, NetworkError, PostProcessError, ThrottledError, UnavailableError,
+                     UnsupportedError, error_from_output, friendly_error)
+from .formats import (Format, FormatChoice, FormatPolicy, estimate_size, extract_formats, extract_metadata,
+                      format_selection, select_formats)
+from .infodict import parse_info_json, project_info
+from .journal import JobJournal, restore_jobs
+from .metrics import JobMetrics, MetricsRegistry, get_metrics_registry, serve_metrics
+from .postprocess import CutTask, PostProcessTask, PostProcessor, smart_cut
+from .probe import Prefetcher, fetch_video_info, get_available_formats, is_collection_url
+from .progress import ProgressEvent, ProgressThrottle
+from .retry import CircuitBreaker, RetryPolicy
+from .schedule import SchedulePolicy, SimulatedClock, TimeWindow, parse_windows, simulate
+from .scheduler import DownloadJob, DownloadScheduler
+from .sections import Section, format_sections, parse_sections, split_sections
+from .settings import get_app_data_dir, get_downloads_folder, load_settings, save_settings
+from .store import ContentStore
+from .subscriptions import Subscription, SubscriptionStore, find_new_videos
+from .tools import check_ffmpeg, discover_tools
+from .urls import UrlInfo, classify_url, warm_extractor_index
+from .worker import QueueWorker
+from .workqueue import QueuedJob, SQLiteJobQueue, connect_broker, open_queue, serve_broker
+
+__all__ = [
+    'BatchPipeline', 'BlockedError', 'CircuitBreaker', 'ContentStore', 'CutTask', 'DownloadError', 'DownloadIndex',
+    'DownloadJob', 'DownloadResult', 'DownloadScheduler', 'Format', 'FormatChoice', 'FormatPolicy', 'JobJournal',
+    'JobMetrics', 'LibraryBackend', 'MetadataCache', 'MetricsRegistry', 'NetworkError', 'PostProcessError',
+    'PostProcessTask', 'PostProcessor', 'Prefetcher', 'ProgressEvent', 'ProgressThrottle', 'QueueWorker',
+    'QueuedJob', 'RetryPolicy', 'SQLiteJobQueue', 'SchedulePolicy', 'Section', 'SimulatedClock',
+    'SubprocessBackend', 'Subscription', 'SubscriptionStore', 'ThrottledError', 'TimeWindow', 'TransferOptions',
+    'UnavailableError', 'UnsupportedError', 'UrlInfo', 'check_ffmpeg', 'classify_url', 'connect_broker',
+    'discover_tools', 'download_video', 'error_from_output', 'estimate_size', 'expand_collection',
+    'extract_formats', 'extract_metadata', 'fetch_video_info', 'find_new_videos', 'format_sections',
+    'format_selection', 'friendly_error', 'get_app_data_dir', 'get_available_formats', 'get_backend',
+    'get_download_index', 'get_downloads_folder', 'get_metadata_cache', 'get_metrics_registry', 'is_collection_url',
+    'load_settings', 'open_queue', 'parse_info_json', 'parse_sections', 'parse_windows', 'project_info',
+    'read_url_list', 'restore_jobs', 'reuse_existing_download', 'save_settings', 'select_formats', 'serve_broker',
+    'serve_metrics', 'simulate', 'smart_cut', 'split_sections', 'video_cache_key', 'warm_extractor_index',
+]
@@ -0,0 +1,8 @@
+import multiprocessing
+import sys
+
+from .cli import main
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Post-processing workers in frozen builds
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""Index of finished downloads, used to skip media that was already fetched"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from .sections import format_sections
+from .settings import get_app_data_dir
+
+def archive_id(extractor, video_id):
+    """The line yt-dlp writes to a --download-archive file for this video"""
+    return f"{extractor.lower()} {video_id}"
+
+def format_key(download_type, resolution_id=None, sections=()):
+    """Identifies which variant of a video was saved ('v', 'v:137', 'a', or 'v@1:00-1:30' for a clip)"""
+    key = f"{download_type}:{resolution_id}" if resolution_id else download_type
+    return f"{key}@{format_sections(sections)}" if sections else key
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class DownloadIndex:
+    """SQLite table of finished downloads plus a yt-dlp compatible archive file.
+
+    Each row records the video ID, extractor, chosen format, output path, size
+    and checksum. The archive file lists every downloaded video in yt-dlp's
+    "<extractor> <id>" format, so it can be passed to yt-dlp's
+    --download-archive by other tools.
+    """
+
+    def __init__(self, path=None, archive_path=None):
+        data_dir = get_app_data_dir()
+        self.path = path or os.path.join(data_dir, "downloads.sqlite3")
+        self.archive_path = archive_path or os.path.join(data_dir, "download_archive.txt")
+        self._lock = threading.Lock()
+        self._archived = None  # Lines of the archive file, read on the first record()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS downloads ("
+            "extractor TEXT NOT NULL, video_id TEXT NOT NULL, format TEXT NOT NULL, "
+            "path TEXT NOT NULL, size INTEGER NOT NULL, sha256 TEXT, completed REAL NOT NULL, "
+            "PRIMARY KEY (extractor, video_id, format, path))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS downloads_sha256 ON downloads (sha256)")
+        self._db.commit()
+
+    def record(self, extractor, video_id, fmt, path, sha256=None):
+        """Add a finished download (replacing any earlier row for the same file).
+
+        The checksum is computed unless the caller already knows it.
+        """
+        path = os.path.abspath(path)
+        size = os.path.getsize(path)
+        sha256 = sha256 or file_sha256(path)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO downloads (extractor, video_id, format, path, size, sha256, completed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (extractor.lower(), video_id, fmt, path, size, sha256, time.time())
+            )
+            self._db.commit()
+            if self._archived is None:
+                self._archived = self._archive_lines()
+            line = archive_id(extractor, video_id)
+            if line not in self._archived:
+                with open(self.archive_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+                self._archived.add(line)
+
+    def lookup(self, extractor, video_id, fmt=None):
+        """Rows for a video as dicts, newest first (optionally only one format)"""
+        query = "SELECT extractor, video_id, format, path, size, sha256, completed FROM downloads " \
+                "WHERE extractor = ? AND video_id = ?"
+        params = [extractor.lower(), video_id]
+        if fmt is not None:
+            query += " AND format = ?"
+            params.append(fmt)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY completed DESC", params).fetchall()
+        keys = ('extractor', 'video_id', 'format', 'path', 'size', 'sha256', 'completed')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def find_existing(self, extractor, video_id, fmt):
+        """The newest recorded file for this video and format that is still on disk with the same size"""
+        for row in self.lookup(extractor, video_id, fmt):
+            try:
+                if os.path.getsize(row['path']) == row['size']:
+                    return row
+            except OSError:
+                continue  # Moved or deleted
+        return None
+
+    def forget(self, path):
+        """Drop the rows for a file"""
+        with self._lock:
+            self._db.execute("DELETE FROM downloads WHERE path = ?", (os.path.abspath(path),))
+            self._db.commit()
+
+    def _archive_lines(self):
+        try:
+            with open(self.archive_path, encoding="utf-8") as f:
+                return set(line.strip() for line in f)
+        except OSError:
+            return set()
+
+_download_index = None
+_download_index_lock = threading.Lock()
+
+def get_download_index():
+    """Get the shared download index, creating it on first use"""
+    global _download_index
+    with _download_index_lock:
+        if _download_index is None:
+            _download_index = DownloadIndex()
+        return _download_index
+
+def reuse_existing_download(index, info, fmt, download_path):
+    """Skip or relink a video that is already on disk.
+
+    Returns the path of the usable file, or None if it must be downloaded.
+    A copy saved to another folder is hardlinked (or copied, across drives)
+    into download_path instead of being fetched again.
+    """
+    extractor = info.get('extractor_key') or info.get('extractor')
+    video_id = info.get('id')
+    if not extractor or not video_id:
+        return None
+    existing = index.find_existing(extractor, video_id, fmt)
+    if existing is None:
+        return None
+
+    source = existing['path']
+    if os.path.normcase(os.path.dirname(source)) == os.path.normcase(os.path.abspath(download_path)):
+        return source
+
+    target = os.path.join(download_path, os.path.basename(source))
+    if os.path.exists(target):
+        if os.path.getsize(target) != existing['size']:
+            return None  # A different file with the same name, download normally
+    else:
+        os.makedirs(download_path, exist_ok=True)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+    index.record(extractor, video_id, fmt, target, existing['sha256'])
+    return target
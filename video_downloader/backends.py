@@ -0,0 +1,455 @@
+"""yt-dlp execution backends: in-process library or one executable run per operation"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from typing import NamedTuple, Optional, Tuple
+
+from .errors import DownloadError, UnavailableError, error_from_output
+from .infodict import parse_info_json, project_info
+from .progress import (
+    POSTPROCESS_PREFIX, POSTPROCESS_TEMPLATE, PROGRESS_PREFIX, PROGRESS_TEMPLATE, progress_event_from_dict
+)
+from .sections import SMART_CUT_INPUT_ARGS, download_ranges
+from .settings import load_settings
+
+class TransferOptions:
+    """How the bytes of a download are fetched: fragments, external downloader, chunking and rate limit"""
+
+    def __init__(self, concurrent_fragments=1, external_downloader=None, external_downloader_args=None,
+                 http_chunk_size=None, rate_limit=None):
+        self.concurrent_fragments = max(1, int(concurrent_fragments))
+        self.external_downloader = external_downloader or None
+        self.external_downloader_args = external_downloader_args or []
+        self.http_chunk_size = http_chunk_size or None  # bytes
+        self.rate_limit = rate_limit or None  # bytes per second
+
+    @classmethod
+    def from_settings(cls, settings, turbo=None):
+        """Build options from user settings; turbo defaults to the 'turbo_mode' setting"""
+        if turbo is None:
+            turbo = settings['turbo_mode']
+        rate_limit = int(settings['rate_limit_kbps'] * 1024)
+        if not turbo:
+            return cls(rate_limit=rate_limit)
+        downloader = settings['turbo_external_downloader']
+        if downloader and not shutil.which(downloader):
+            downloader = None  # Not installed, fragments alone still help
+        return cls(
+            concurrent_fragments=settings['turbo_concurrent_fragments'],
+            external_downloader=downloader,
+            external_downloader_args=settings['turbo_external_downloader_args'].split(),
+            http_chunk_size=int(settings['turbo_http_chunk_size_mb'] * 1024 * 1024),
+            rate_limit=rate_limit
+        )
+
+    def to_dict(self):
+        """Plain dict for storing in the job journal"""
+        return {
+            'concurrent_fragments': self.concurrent_fragments,
+            'external_downloader': self.external_downloader,
+            'external_downloader_args': list(self.external_downloader_args),
+            'http_chunk_size': self.http_chunk_size,
+            'rate_limit': self.rate_limit,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict()"""
+        return cls(**data)
+
+    def with_rate_limit(self, rate_limit):
+        """Copy of these options with a different rate limit"""
+        return TransferOptions(self.concurrent_fragments, self.external_downloader, self.external_downloader_args,
+                               self.http_chunk_size, rate_limit)
+
+    def to_args(self):
+        """Command line options for the yt-dlp executable"""
+        args = []
+        if self.concurrent_fragments > 1:
+            args += ["-N", str(self.concurrent_fragments)]
+        if self.external_downloader:
+            args += ["--downloader", self.external_downloader]
+            if self.external_downloader_args:
+                args += ["--downloader-args", f"{self.external_downloader}:{' '.join(self.external_downloader_args)}"]
+        if self.http_chunk_size:
+            args += ["--http-chunk-size", str(self.http_chunk_size)]
+        if self.rate_limit:
+            args += ["-r", str(self.rate_limit)]
+        return args
+
+    def to_params(self):
+        """YoutubeDL parameters for the in-process backend"""
+        params = {'concurrent_fragment_downloads': self.concurrent_fragments}
+        if self.external_downloader:
+            params['external_downloader'] = {'default': self.external_downloader}
+            if self.external_downloader_args:
+                params['external_downloader_args'] = {self.external_downloader: list(self.external_downloader_args)}
+        if self.http_chunk_size:
+            params['http_chunk_size'] = self.http_chunk_size
+        if self.rate_limit:
+            params['ratelimit'] = self.rate_limit
+        return params
+
+class DownloadResult(NamedTuple):
+    """Outcome of one download"""
+    ok: bool
+    filepath: Optional[str] = None  # Final file, after merging and moving
+    video_id: Optional[str] = None
+    extractor: Optional[str] = None  # yt-dlp extractor key, e.g. 'Youtube'
+    files: Tuple[str, ...] = ()  # Every file written, when several formats were downloaded separately
+    error: Optional[DownloadError] = None  # Why it failed, if yt-dlp said
+
+class SubprocessBackend:
+    """Runs the yt-dlp executable once per operation"""
+    name = 'subprocess'
+
+    def __init__(self, executable=None):
+        # A path, or a command list such as [sys.executable, "stub.py"]
+        executable = executable or "yt-dlp"
+        self.command = [executable] if isinstance(executable, str) else list(executable)
+
+    def probe(self, video_url, process_callback=None):
+        """Returns the compact info dict (see project_info) for a single video. Raises DownloadError on failure.
+
+        process_callback receives the Popen so the caller can terminate a
+        probe that is no longer needed.
+        """
+        command = self.command + [
+            "-j",
+            "--no-playlist",
+            video_url
+        ]
+        # Bytes, not text: the JSON can be megabytes and is parsed without decoding most of it into objects
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   startupinfo=self._startupinfo())
+        if process_callback:
+            process_callback(process)
+        stdout, stderr = process.communicate()
+
+        if process.returncode is not None and process.returncode < 0:
+            raise DownloadError("Probe cancelled")
+
+        # Warnings on stderr are harmless as long as the info came through
+        if process.returncode != 0 or not stdout.strip():
+            raise (error_from_output(stderr.decode('utf-8', 'replace'))
+                   or UnavailableError("Invalid URL or no video found"))
+        return parse_info_json(stdout)
+
+    def list_collection(self, url):
+        """Returns the flat (unprobed) info dict of a playlist or channel. Raises DownloadError on failure."""
+        command = self.command + ["--flat-playlist", "-J", url]
+        result = subprocess.run(command, capture_output=True, text=True, startupinfo=self._startupinfo())
+        if result.returncode != 0 or not result.stdout.strip():
+            raise error_from_output(result.stderr) or DownloadError(f"Could not list {url}")
+        return json.loads(result.stdout)
+
+    def iter_collection(self, url):
+        """Yields the flat entries of a playlist or channel as yt-dlp lists them, page by page.
+
+        Closing the generator early stops yt-dlp before it fetches the next
+        page. Raises DownloadError if the listing fails.
+        """
+        command = self.command + ["--flat-playlist", "--lazy-playlist", "-j", url]
+        with tempfile.TemporaryFile() as stderr:  # A file, so warnings cannot fill a pipe nobody reads yet
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, text=True, encoding="utf-8",
+                                       errors="replace", startupinfo=self._startupinfo())
+            try:
+                for line in process.stdout:
+                    if line.startswith('{'):
+                        yield json.loads(line)
+                if process.wait() != 0:
+                    stderr.seek(0)
+                    message = stderr.read().decode("utf-8", "replace")
+                    raise error_from_output(message) or DownloadError(f"Could not list {url}")
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                process.stdout.close()
+
+    def download(self, video_url, format_arg, format_sort, download_path, output_callback, progress_callback,
+                 process_callback=None, transfer=None, postprocess_callback=None,
+                 output_template=None, sections=(), precision='keyframe'):
+        """Downloads one video (only the given Sections, if any) and returns a DownloadResult"""
+        # Create output template with automatic numbering for conflicts
+        output_template = os.path.join(download_path, output_template or "%(title)s.%(ext)s")
+        
+        command = self.command + [
+            "-f", format_arg,
+            "-S", ",".join(format_sort),
+            "--no-playlist",
+            "-o", output_template,
+            # Keep .part files and pick up where an interrupted run stopped
+            "--continue",
+            "--part",
+            "--output-na-placeholder", "",  # Handles special characters in filenames
+            "--paths", "home:" + download_path,  # Set download path
+            "--restrict-filenames",  # Restrict filenames to ASCII characters
+            # Machine-readable progress, one record per line
+            "--newline",
+            "--progress-template", PROGRESS_TEMPLATE,
+            "--progress-template", POSTPROCESS_TEMPLATE,
+        ]
+        # Where the file ended up, written once it is in its final place
+        fd, result_path = tempfile.mkstemp(prefix="vd-result-", suffix=".jsonl")
+        os.close(fd)
+        command += ["--print-to-file", "after_move:%(.{id,extractor_key,filepath})j", result_path]
+        if transfer:
+            command += transfer.to_args()
+        for section in sections:
+            command += ["--download-sections", section.to_arg()]
+        if sections and precision == 'exact':
+            command.append("--force-keyframes-at-cuts")
+        elif sections and precision == 'smart':
+            command += ["--downloader-args", "ffmpeg_i:" + " ".join(SMART_CUT_INPUT_ARGS)]
+        command.append(video_url)
+
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            startupinfo=self._startupinfo()
+        )
+        if process_callback:
+            process_callback(process)
+
+        while True:
+            output = process.stdout.readline()
+            if output == '' and process.poll() is not None:
+                break
+            if output.startswith(PROGRESS_PREFIX):
+                try:
+                    progress_callback(progress_event_from_dict(json.loads(output[len(PROGRESS_PREFIX):])))
+                except (ValueError, TypeError):
+                    pass  # Ignore malformed records
+            elif output.startswith(POSTPROCESS_PREFIX):
+                if postprocess_callback:
+                    try:
+                        record = json.loads(output[len(POSTPROCESS_PREFIX):])
+                        postprocess_callback(record.get('postprocessor'), record.get('status'))
+                    except (ValueError, TypeError, AttributeError):
+                        pass
+            elif output:
+                output_callback(output)
+
+        _, stderr = process.communicate()
+        if stderr:
+            output_callback(stderr)
+        # A terminated process (negative return code) was stopped on purpose, not an error
+        error = error_from_output(stderr) if process.returncode > 0 else None
+
+        records = []
+        try:
+            with open(result_path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f.read().splitlines() if line.strip()]
+        except (OSError, ValueError):
+            pass  # Nothing was downloaded
+        finally:
+            try:
+                os.remove(result_path)
+            except OSError:
+                pass
+        record = records[-1] if records else {}
+        return DownloadResult(process.returncode == 0, record.get('filepath'), record.get('id'),
+                              record.get('extractor_key'), tuple(r['filepath'] for r in records if r.get('filepath')),
+                              error)
+
+    @staticmethod
+    def _startupinfo():
+        # Hide the console window on Windows
+        startupinfo = None
+        if os.name == 'nt':
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+            startupinfo.wShowWindow = subprocess.SW_HIDE
+        return startupinfo
+
+class _CallbackLogger:
+    """yt-dlp logger that forwards messages to an output callback"""
+
+    def __init__(self, output_callback):
+        self.output_callback = output_callback
+
+    def debug(self, msg):
+        # yt-dlp sends regular output through debug() prefixed with [extractor] etc.
+        if not msg.startswith('[debug] '):
+            self.output_callback(msg + "\n")
+
+    def info(self, msg):
+        self.output_callback(msg + "\n")
+
+    def warning(self, msg):
+        self.output_callback(f"WARNING: {msg}\n")
+
+    def error(self, msg):
+        self.output_callback(msg + "\n")
+
+class _InProcessHandle:
+    """Stands in for a Popen so the scheduler can stop an in-process download"""
+
+    def __init__(self):
+        self.stopped = False
+
+    def terminate(self):
+        self.stopped = True
+
+class LibraryBackend:
+    """Runs yt-dlp in-process through yt_dlp.YoutubeDL.
+
+    Each thread keeps a warm YoutubeDL for probing, so extractors are imported
+    once and the HTTP session is reused across URLs. Downloads get their own
+    instance because their options differ per job.
+    """
+    name = 'library'
+
+    def __init__(self):
+        import yt_dlp
+        self._yt_dlp = yt_dlp
+        self._local = threading.local()
+
+    def probe(self, video_url, process_callback=None):
+        """Returns the compact info dict (see project_info) for a single video. Raises DownloadError on failure.
+
+        An in-process probe cannot be interrupted, so process_callback is
+        accepted for compatibility and a superseded probe simply finishes.
+        """
+        ydl = getattr(self._local, 'probe_ydl', None)
+        if ydl is None:
+            # Errors come back as exceptions, so keep yt-dlp from printing them too
+            ydl = self._yt_dlp.YoutubeDL({
+                'quiet': True, 'no_warnings': True, 'noplaylist': True, 'logger': _CallbackLogger(lambda msg: None)
+            })
+            self._local.probe_ydl = ydl
+        try:
+            info = ydl.extract_info(video_url, download=False)
+        except self._yt_dlp.utils.DownloadError as e:
+            raise error_from_output(str(e)) or DownloadError(str(e))
+        if not info:
+            raise UnavailableError("Invalid URL or no video found")
+        return ydl.sanitize_info(project_info(info))  # Project first, sanitizing copies everything it is given
+
+    def list_collection(self, url):
+        """Returns the flat (unprobed) info dict of a playlist or channel. Raises DownloadError on failure."""
+        params = {
+            'quiet': True, 'no_warnings': True, 'extract_flat': 'in_playlist',
+            'logger': _CallbackLogger(lambda msg: None)
+        }
+        with self._yt_dlp.YoutubeDL(params) as ydl:
+            try:
+                info = ydl.extract_info(url, download=False)
+            except self._yt_dlp.utils.DownloadError as e:
+                raise error_from_output(str(e)) or DownloadError(str(e))
+            # Not projected: the listing is flat already, and expansion needs its entries
+            return ydl.sanitize_info(info)
+
+    def iter_collection(self, url):
+        """Yields the flat entries of a playlist or channel as yt-dlp lists them, page by page.
+
+        Closing the generator early stops yt-dlp before it fetches the next
+        page. Raises DownloadError if the listing fails.
+        """
+        params = {
+            'quiet': True, 'no_warnings': True, 'extract_flat': 'in_playlist', 'lazy_playlist': True,
+            'logger': _CallbackLogger(lambda msg: None)
+        }
+        utils = self._yt_dlp.utils
+        with self._yt_dlp.YoutubeDL(params) as ydl:
+            try:
+                # Unprocessed, the entries stay a generator or paged list that fetches pages as it is read
+                info = ydl.extract_info(url, download=False, process=False)
+                for _ in range(3):  # Follow redirects such as a channel's home page to its tab
+                    if info.get('_type') not in ('url', 'url_transparent'):
+                        break
+                    info = ydl.extract_info(info['url'], ie_key=info.get('ie_key'), download=False, process=False)
+                for entry in info.get('entries') or []:
+                    if entry:
+                        yield ydl.sanitize_info(entry)
+            except (utils.DownloadError, utils.ExtractorError) as e:
+                raise error_from_output(str(e)) or DownloadError(str(e))
+
+    def download(self, video_url, format_arg, format_sort, download_path, output_callback, progress_callback,
+                 process_callback=None, transfer=None, postprocess_callback=None,
+                 output_template=None, sections=(), precision='keyframe'):
+        """Downloads one video (only the given Sections, if any) and returns a DownloadResult"""
+        handle = _InProcessHandle()
+        if process_callback:
+            process_callback(handle)
+
+        def hook(d):
+            if handle.stopped:
+                raise self._yt_dlp.utils.DownloadCancelled("Download stopped")
+            if d['status'] in ('downloading', 'finished'):
+                progress_callback(progress_event_from_dict(d))
+
+        def postprocessor_hook(d):
+            if postprocess_callback:
+                postprocess_callback(d.get('postprocessor'), d.get('status'))
+
+        params = {
+            'format': format_arg,
+            'format_sort': list(format_sort),
+            'noplaylist': True,
+            'outtmpl': {'default': output_template or '%(title)s.%(ext)s'},
+            'paths': {'home': download_path},
+            'continuedl': True,
+            'nopart': False,
+            'outtmpl_na_placeholder': '',
+            'restrictfilenames': True,
+            'noprogress': True,
+            'progress_hooks': [hook],
+            'postprocessor_hooks': [postprocessor_hook],
+            'logger': _CallbackLogger(output_callback),
+        }
+        if transfer:
+            params.update(transfer.to_params())
+        if sections:
+            params['download_ranges'] = self._yt_dlp.utils.download_range_func(None, download_ranges(sections))
+            params['force_keyframes_at_cuts'] = precision == 'exact'
+            if precision == 'smart':
+                downloader_args = dict(params.get('external_downloader_args') or {})
+                downloader_args['ffmpeg_i'] = list(SMART_CUT_INPUT_ARGS)
+                params['external_downloader_args'] = downloader_args
+        try:
+            with self._yt_dlp.YoutubeDL(params) as ydl:
+                info = ydl.extract_info(video_url, download=True)
+        except self._yt_dlp.utils.DownloadCancelled as e:
+            output_callback(f"{e}\n")
+            return DownloadResult(False)
+        except self._yt_dlp.utils.DownloadError as e:
+            output_callback(f"{e}\n")
+            return DownloadResult(False, error=error_from_output(str(e)))
+        if not info or handle.stopped:
+            return DownloadResult(False)
+        downloads = info.get('requested_downloads') or [{}]
+        return DownloadResult(True, downloads[-1].get('filepath'), info.get('id'), info.get('extractor_key'),
+                              tuple(d['filepath'] for d in downloads if d.get('filepath')))
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """Get the yt-dlp backend chosen in settings ('auto' prefers the in-process library).
+
+    The yt-dlp executable is taken from the VIDEO_DOWNLOADER_YTDLP environment
+    variable, then the ytdlp_path setting, then PATH.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            settings = load_settings()
+            choice = settings['backend']
+            if choice in ('library', 'auto'):
+                try:
+                    _backend = LibraryBackend()
+                except ImportError:
+                    if choice == 'library':
+                        # stderr: stdout may be the CLI's --json-progress event stream
+                        print("yt_dlp is not importable, falling back to the yt-dlp executable", file=sys.stderr)
+            if _backend is None:
+                _backend = SubprocessBackend(os.environ.get('VIDEO_DOWNLOADER_YTDLP') or settings['ytdlp_path'])
+        return _backend
@@ -0,0 +1,169 @@
+"""Batch mode: URL lists, playlists and channels"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .archive import format_key, reuse_existing_download
+from .backends import get_backend
+from .cache import video_cache_key
+from .errors import ThrottledError
+from .probe import fetch_video_info, is_collection_url
+from .scheduler import DownloadJob
+from .sections import split_sections
+
+def read_url_list(text):
+    """Split pasted or loaded text into lines, skipping blank lines and # comments.
+
+    A line is a URL, optionally followed by time ranges to clip
+    ("URL 1:00-1:30,2:00-2:10", see split_sections).
+    """
+    urls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            urls.append(line)
+    return urls
+
+def expand_collection(url, max_depth=2):
+    """Lists the video URLs in a playlist or channel without probing each video.
+
+    Raises ValueError if yt-dlp cannot list the collection.
+    """
+    urls = []
+    pending = [(get_backend().list_collection(url), max_depth)]
+    while pending:
+        info, depth = pending.pop(0)
+        for entry in info.get('entries') or []:
+            if not entry:
+                continue
+            entry_url = entry.get('url') or entry.get('webpage_url')
+            if entry.get('_type') == 'playlist':
+                pending.append((entry, depth))
+            elif entry_url and is_collection_url(entry_url):
+                # Channel tabs (Videos, Shorts, ...) come back as nested playlists
+                if depth > 0:
+                    urls.extend(expand_collection(entry_url, depth - 1))
+            elif entry_url:
+                urls.append(entry_url)
+    return urls
+
+class BatchPipeline:
+    """Expands a batch of URLs, probes N of them at a time and queues each video as soon as it resolves.
+
+    Probing and downloading overlap: the scheduler starts on the first
+    resolved video while the rest are still being probed. Progress messages
+    go onto the scheduler's event queue as ('log', None, text).
+    """
+
+    def __init__(self, scheduler, download_type, download_path, probe_workers=4, transfer=None, resolution_id=None,
+                 policy=None, sections=(), precision='keyframe'):
+        self.scheduler = scheduler
+        self.download_type = download_type
+        self.download_path = download_path
+        self.transfer = transfer
+        self.resolution_id = resolution_id
+        self.policy = policy  # FormatPolicy passed on to each job
+        self.sections = tuple(sections)  # Clip ranges for lines that do not give their own
+        self.precision = precision
+        self.probe_workers = max(1, int(probe_workers))
+        self.queued = 0
+        self.failed = 0
+        self.existing = 0  # Already downloaded, skipped or relinked
+        self._cancelled = threading.Event()
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def run(self, urls):
+        """Expand and probe on the calling thread (returns once every video is queued or skipped)"""
+        self._run(list(urls))
+
+    def start(self, urls):
+        """Run the pipeline on a background thread"""
+        thread = threading.Thread(target=self._run, args=(list(urls),), daemon=True)
+        thread.start()
+        return thread
+
+    def cancel(self):
+        """Stop expanding and probing (already queued jobs keep running)"""
+        self._cancelled.set()
+
+    def _run(self, urls):
+        with ThreadPoolExecutor(max_workers=self.probe_workers) as pool:
+            for line in urls:
+                if self._cancelled.is_set():
+                    break
+                try:
+                    url, sections = split_sections(line)
+                except ValueError as e:
+                    with self._lock:
+                        self.failed += 1
+                    self._log(f"Skipped {line}: {e}\n")
+                    continue
+                sections = sections or self.sections
+                if is_collection_url(url):
+                    self._log(f"Listing {url}\n")
+                    try:
+                        items = expand_collection(url)
+                    except ValueError as e:
+                        self._log(f"Skipped {url}: {e}\n")
+                        continue
+                    self._log(f"Found {len(items)} videos in {url}\n")
+                else:
+                    items = [url]
+                for item in items:
+                    pool.submit(self._resolve, item, sections)
+        self._log(f"Batch finished resolving: {self.queued} queued, {self.existing} already downloaded, "
+                  f"{self.failed} skipped\n")
+
+    def _resolve(self, url, sections=()):
+        if self._cancelled.is_set():
+            return
+        with self._lock:
+            key = (video_cache_key(url), sections)  # Different clips of one video are separate jobs
+            if key in self._seen:
+                return
+            self._seen.add(key)
+        job = DownloadJob(url, self.download_type, self.download_path, self.resolution_id,
+                          transfer=self.transfer, policy=self.policy, sections=sections, precision=self.precision)
+        breaker = self.scheduler.breaker
+        if breaker and job.site and breaker.is_open(job.site):
+            # The site is throttling; queue without probing and let the scheduler wait it out
+            self._submit(job)
+            return
+        try:
+            info = fetch_video_info(url)
+        except Exception as e:
+            if breaker and job.site and isinstance(e, ThrottledError):
+                cooldown = breaker.record(job.site, True)
+                if cooldown:
+                    self._log(f"{job.site} is limiting requests (HTTP 429); holding its downloads for "
+                              f"{cooldown:.0f}s\n")
+            if getattr(e, 'retryable', False) and self.scheduler.retry:
+                self._submit(job)  # Transient, the scheduler retries it with backoff
+                return
+            with self._lock:
+                self.failed += 1
+            self._log(f"Skipped {url}: {str(e).strip()}\n")
+            return
+        if self._cancelled.is_set():
+            return
+        if self.scheduler.index:
+            try:
+                existing = reuse_existing_download(self.scheduler.index, info,
+                                                   format_key(self.download_type, self.resolution_id, sections),
+                                                   self.download_path)
+            except OSError:
+                existing = None
+            if existing:
+                with self._lock:
+                    self.existing += 1
+                self._log(f"Already downloaded: {existing}\n")
+                return
+        self._submit(job)
+
+    def _submit(self, job):
+        self.scheduler.submit(job)
+        with self._lock:
+            self.queued += 1
+
+    def _log(self, text):
+        self.scheduler.events.put(('log', None, text))
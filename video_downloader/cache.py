@@ -0,0 +1,139 @@
+"""On-disk and in-memory cache of yt-dlp info dicts"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from .settings import get_app_data_dir, load_settings
+from .urls import classify_url
+
+TOUCH_FLUSH_INTERVAL = 30  # Seconds memory-tier hits may wait before their access times reach the disk tier
+
+class MetadataCache:
+    """Two-tier cache of yt-dlp info dicts keyed by video ID.
+
+    A small in-memory LRU sits in front of a SQLite file holding compressed
+    JSON. Entries expire after `ttl` seconds and the least recently used rows
+    are evicted once the file holds more than `max_bytes` of data.
+    """
+
+    def __init__(self, path=None, ttl=6 * 3600, max_bytes=64 * 1024 * 1024, memory_entries=32):
+        self.path = path or os.path.join(get_app_data_dir(), "metadata_cache.sqlite3")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()  # key -> (created, info)
+        self._touched = {}  # key -> time of a memory-tier hit not yet written to the accessed column
+        self._touch_flushed = time.time()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS info ("
+            "key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS info_accessed ON info (accessed)")
+        self._db.commit()
+
+    def get(self, key):
+        """Return the cached info dict for key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                # Recorded for the disk tier's LRU in batches, so the hottest keys are not evicted first
+                self._touched[key] = now
+                if now - self._touch_flushed >= TOUCH_FLUSH_INTERVAL:
+                    self._flush_touched()
+                    self._db.commit()
+                return entry[1]
+
+            row = self._db.execute("SELECT data, created FROM info WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] < self.ttl:
+                info = json.loads(zlib.decompress(row[0]))
+                self._db.execute("UPDATE info SET accessed = ? WHERE key = ?", (now, key))
+                self._flush_touched()
+                self._db.commit()
+                self._remember(key, row[1], info)
+                self.hits += 1
+                return info
+
+            if row:  # Expired
+                self._db.execute("DELETE FROM info WHERE key = ?", (key,))
+                self._db.commit()
+            self._memory.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, key, info):
+        """Store an info dict and evict old entries if the cache is over size"""
+        now = time.time()
+        data = zlib.compress(json.dumps(info).encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO info (key, data, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now)
+            )
+            self._flush_touched()
+            self._evict()
+            self._db.commit()
+            self._remember(key, now, info)
+
+    def stats(self):
+        """Hit/miss counters plus the current size of the disk tier"""
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM info").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'bytes': size}
+
+    def _remember(self, key, created, info):
+        self._memory[key] = (created, info)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _flush_touched(self):
+        if self._touched:
+            self._db.executemany("UPDATE info SET accessed = ? WHERE key = ?",
+                                 [(accessed, key) for key, accessed in self._touched.items()])
+            self._touched.clear()
+        self._touch_flushed = time.time()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM info").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM info ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM info WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            total -= size
+
+_metadata_cache = None
+_metadata_cache_lock = threading.Lock()
+
+def get_metadata_cache():
+    """Get the shared metadata cache, creating it on first use"""
+    global _metadata_cache
+    with _metadata_cache_lock:
+        if _metadata_cache is None:
+            settings = load_settings()
+            _metadata_cache = MetadataCache(
+                ttl=settings['metadata_cache_ttl'],
+                max_bytes=int(settings['metadata_cache_max_mb'] * 1024 * 1024)
+            )
+        return _metadata_cache
+
+def video_cache_key(video_url):
+    """Derive a stable cache key for a URL (e.g. 'youtube:<id>' for every form of a YouTube link)"""
+    try:
+        return classify_url(video_url).key
+    except ValueError:
+        return video_url.strip()
@@ -0,0 +1,583 @@
+"""Headless command line interface: python -m video_downloader"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from queue import Empty
+
+from .archive import get_download_index
+from .backends import TransferOptions
+from .batch import BatchPipeline, expand_collection, read_url_list
+from .errors import ThrottledError
+from .formats import FormatPolicy
+from .journal import JobJournal, restore_jobs
+from .metrics import MetricsRegistry, get_metrics_registry, serve_metrics
+from .postprocess import PostProcessor
+from .probe import is_collection_url
+from .retry import CircuitBreaker, RetryPolicy
+from .schedule import QUEUE_ORDERS, SchedulePolicy
+from .scheduler import DownloadJob, DownloadScheduler
+from .sections import CLIP_PRECISIONS, format_sections, parse_sections, split_sections
+from .settings import get_app_data_dir, get_downloads_folder, load_settings
+from .store import ContentStore
+from .subscriptions import SubscriptionStore, find_new_videos
+from .worker import QueueWorker
+from .workqueue import DEFAULT_BROKER_PORT, QUEUE_STATUSES, is_loopback, new_broker_key, open_queue, serve_broker
+
+def parse_args(argv=None):
+    """Build and parse the command line"""
+    parser = argparse.ArgumentParser(
+        prog="python -m video_downloader",
+        description="Download videos or audio with yt-dlp, without the GUI.",
+        epilog="More commands: python -m video_downloader {enqueue,worker,broker,queue,store,sync} --help"
+    )
+    parser.add_argument("urls", nargs="*",
+                        help="Video, playlist or channel URLs. Use - (or pipe them in) to read URLs from stdin")
+    parser.add_argument("-a", "--batch-file", help="Read URLs from a file, one per line")
+    parser.add_argument("-o", "--output", default=get_downloads_folder(), help="Download folder")
+    parser.add_argument("-f", "--format", default="video",
+                        help="'video' (up to 1080p), 'audio', or a yt-dlp video format ID")
+    parser.add_argument("--policy", metavar="SPEC",
+                        help="Format policy for automatic selection, e.g. 'smallest,>=720p,<=200MB,mp4' "
+                             "(default from settings)")
+    _add_clip_args(parser)
+    parser.add_argument("-j", "--jobs", type=int, help="Downloads to run at once (default from settings)")
+    parser.add_argument("--probe-jobs", type=int, help="Videos to probe at once (default from settings)")
+    parser.add_argument("--turbo", action="store_true", default=None, help="Enable turbo transfer mode")
+    parser.add_argument("--rate-limit", type=int, metavar="KBPS", help="Per-download rate limit in KiB/s")
+    parser.add_argument("--global-rate-limit", type=int, metavar="KBPS", help="Total rate limit in KiB/s")
+    parser.add_argument("--order", choices=QUEUE_ORDERS,
+                        help="Queue order: priority, sjf (smallest estimated download first) or fifo "
+                             "(default: the queue_order setting)")
+    parser.add_argument("--force", action="store_true",
+                        help="Download even if the video is already in the download index")
+    parser.add_argument("--resume", action="store_true",
+                        help="Also finish downloads left over from an earlier run that was interrupted")
+    parser.add_argument("--stats-file", help="Keep the timing and throughput totals in this JSON file "
+                                             "instead of stats.json in the app data folder")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="Serve Prometheus metrics at http://127.0.0.1:PORT/metrics while running")
+    parser.add_argument("--json-progress", action="store_true",
+                        help="Print one JSON object per event on stdout instead of text")
+    return parser.parse_args(argv)
+
+def collect_urls(args, stdin=None):
+    """URLs from the arguments, the batch file and stdin, in that order"""
+    stdin = stdin or sys.stdin
+    urls = [url for url in args.urls if url != '-']
+    if args.batch_file:
+        with open(args.batch_file, encoding="utf-8", errors="replace") as f:
+            urls += read_url_list(f.read())
+    if '-' in args.urls or (not urls and not stdin.isatty()):
+        urls += read_url_list(stdin.read())
+    return urls
+
+def format_event(kind, job, payload, json_progress):
+    """Render a scheduler event as a line of output (or None to print nothing)"""
+    if json_progress:
+        record = {'event': kind, 'time': time.time()}
+        if job is not None:
+            record.update(job=job.id, url=job.url)
+        if kind == 'progress':
+            record.update(payload._asdict())
+        elif kind == 'status':
+            record['status'] = payload
+            if payload in ('done', 'failed', 'cancelled'):
+                record['metrics'] = job.metrics.to_dict()
+            if payload == 'failed' and job.error is not None:
+                record['error'] = getattr(job.error, 'kind', 'error')
+        else:
+            record['message'] = payload.rstrip('\n')
+        return json.dumps(record)
+
+    if kind == 'log':
+        return payload.rstrip('\n')
+    if kind == 'output':
+        return f"[{job.id}] {payload.rstrip()}"
+    if kind == 'status':
+        if payload == 'done' and job.metrics.total_bytes:
+            return f"[{job.id}] {payload}: {job.url} ({job.metrics.summary()})"
+        return f"[{job.id}] {payload}: {job.url}"
+    return None  # Progress is too chatty for plain text output
+
+def _clip_ranges(text):
+    try:
+        return parse_sections(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def _add_clip_args(parser):
+    parser.add_argument("--clip", metavar="RANGES", type=_clip_ranges,
+                        help="Only download these time ranges, e.g. '1:00-1:30,2:00-2:10' (one file each). "
+                             "Lines of a batch file can also end with their own ranges")
+    parser.add_argument("--clip-precision", choices=CLIP_PRECISIONS,
+                        help="keyframe: copy, cut at the nearest keyframes; exact: re-encode the clips; "
+                             "smart: re-encode only up to the first keyframe (default from settings)")
+
+def _add_queue_args(parser):
+    parser.add_argument("--queue", default=os.path.join(get_app_data_dir(), "queue.sqlite3"),
+                        help="Shared queue: a SQLite file (default: queue.sqlite3 in the app data folder) "
+                             "or broker://host[:port]")
+    parser.add_argument("--authkey", help="Broker password (default: $VIDEO_DOWNLOADER_BROKER_KEY)")
+
+def _format_type(text):
+    # (download type, resolution ID) for a -f value
+    if text in ('video', 'v'):
+        return 'v', None
+    if text in ('audio', 'a'):
+        return 'a', None
+    return 'v', text
+
+def worker_main(argv):
+    """python -m video_downloader worker: download jobs from a shared queue"""
+    parser = argparse.ArgumentParser(prog="python -m video_downloader worker",
+                                     description="Download jobs from a shared queue until interrupted.")
+    _add_queue_args(parser)
+    parser.add_argument("-o", "--output", default=get_downloads_folder(),
+                        help="Download folder for jobs enqueued without one")
+    parser.add_argument("-j", "--jobs", type=int, help="Downloads to run at once (default from settings)")
+    parser.add_argument("--lease", type=float, default=60.0,
+                        help="Seconds a claimed job stays reserved without a heartbeat (SQLite queues)")
+    parser.add_argument("--worker-id", help="Name stored with each job (default: host:pid)")
+    parser.add_argument("--until-empty", action="store_true", help="Exit once the queue is drained")
+    parser.add_argument("--stats-file", help="Keep the timing and throughput totals in this JSON file")
+    parser.add_argument("--json-progress", action="store_true",
+                        help="Print one JSON object per event on stdout instead of text")
+    args = parser.parse_args(argv)
+    settings = load_settings()
+    try:
+        queue = open_queue(args.queue, args.authkey, args.lease)
+        policy = FormatPolicy.from_settings(settings)
+        store = ContentStore.from_settings(settings)
+        schedule = SchedulePolicy.from_settings(settings)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    scheduler = DownloadScheduler(
+        args.jobs or settings['max_concurrent_downloads'],
+        progress_rate=settings['progress_updates_per_second'],
+        global_rate_limit=int(settings['global_rate_limit_kbps'] * 1024),
+        index=get_download_index() if settings['skip_downloaded'] else None,
+        metrics=MetricsRegistry(args.stats_file) if args.stats_file else get_metrics_registry(),
+        postprocessor=PostProcessor.from_settings(settings),
+        retry=RetryPolicy.from_settings(settings),
+        breaker=CircuitBreaker.from_settings(settings),
+        store=store,
+        schedule=schedule
+    )
+    worker = QueueWorker(queue, scheduler, args.output, args.worker_id, heartbeat=args.lease / 3,
+                         transfer=TransferOptions.from_settings(settings), policy=policy)
+    out = sys.stdout if args.json_progress else sys.stderr
+
+    def print_event(kind, job, payload):
+        line = format_event(kind, job, payload, args.json_progress)
+        if line is not None:
+            print(line, file=out, flush=True)
+
+    print(f"Worker {worker.worker_id} on {args.queue}", file=sys.stderr)
+    try:
+        worker.run(args.until_empty, print_event)
+    except KeyboardInterrupt:
+        worker.stop()  # Unfinished jobs go back to the queue for the other workers
+        return 130
+    scheduler.shutdown()
+    return 1 if any(status != 'done' for status in worker.completed.values()) else 0
+
+def enqueue_main(argv):
+    """python -m video_downloader enqueue: add URLs to a shared queue"""
+    parser = argparse.ArgumentParser(prog="python -m video_downloader enqueue",
+                                     description="Add URLs to a shared queue for workers to download. "
+                                                 "Playlists and channels are expanded first.")
+    _add_queue_args(parser)
+    parser.add_argument("urls", nargs="*", help="URLs. Use - (or pipe them in) to read URLs from stdin")
+    parser.add_argument("-a", "--batch-file", help="Read URLs from a file, one per line")
+    parser.add_argument("-o", "--output", help="Download folder on the workers (default: each worker's -o)")
+    parser.add_argument("-f", "--format", default="video",
+                        help="'video' (up to 1080p), 'audio', or a yt-dlp video format ID")
+    parser.add_argument("--policy", metavar="SPEC", help="Format policy (default: each worker's setting)")
+    _add_clip_args(parser)
+    parser.add_argument("--priority", type=int, default=0, help="Higher runs first")
+    args = parser.parse_args(argv)
+    urls = collect_urls(args)
+    if not urls:
+        print("No URLs given", file=sys.stderr)
+        return 2
+    if args.policy:
+        try:
+            FormatPolicy.parse(args.policy)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+    download_type, resolution_id = _format_type(args.format)
+
+    try:
+        queue = open_queue(args.queue, args.authkey)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(e, file=sys.stderr)
+        return 2
+    precision = args.clip_precision or load_settings()['clip_precision']
+    added = failed = 0
+    for line in urls:
+        try:
+            url, sections = split_sections(line)
+        except ValueError as e:
+            print(f"Skipped {line}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        sections = format_sections(sections or args.clip or ())
+        if is_collection_url(url):
+            try:
+                items = expand_collection(url)
+            except ValueError as e:
+                print(f"Skipped {url}: {e}", file=sys.stderr)
+                failed += 1
+                continue
+        else:
+            items = [url]
+        for item in items:
+            queue.enqueue(item, download_type, resolution_id, args.output, args.priority, args.policy,
+                          sections, precision if sections else None)
+            added += 1
+    print(f"Queued {added} jobs on {args.queue}", file=sys.stderr)
+    return 1 if failed else 0
+
+def broker_main(argv):
+    """python -m video_downloader broker: serve a queue to workers on other machines"""
+    parser = argparse.ArgumentParser(prog="python -m video_downloader broker",
+                                     description="Serve a SQLite queue over the network (workers use "
+                                                 "--queue broker://host:port).")
+    parser.add_argument("--queue", default=os.path.join(get_app_data_dir(), "queue.sqlite3"),
+                        help="SQLite file the broker keeps the jobs in")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (0.0.0.0 for every interface)")
+    parser.add_argument("--port", type=int, default=DEFAULT_BROKER_PORT)
+    parser.add_argument("--authkey", help="Password workers must present (default: $VIDEO_DOWNLOADER_BROKER_KEY; "
+                                           "required unless --host is a loopback address, which gets a random one)")
+    parser.add_argument("--lease", type=float, default=60.0, help="Seconds a claimed job stays reserved")
+    args = parser.parse_args(argv)
+    authkey = args.authkey or os.environ.get('VIDEO_DOWNLOADER_BROKER_KEY')
+    if not authkey:
+        if not is_loopback(args.host):
+            print(f"A broker listening on {args.host} needs a key: pass --authkey or set "
+                  "VIDEO_DOWNLOADER_BROKER_KEY", file=sys.stderr)
+            return 2
+        authkey = new_broker_key()
+        print(f"Broker key (give it to workers with --authkey): {authkey}", file=sys.stderr)
+    print(f"Broker for {args.queue} on {args.host}:{args.port}", file=sys.stderr)
+    try:
+        serve_broker(args.queue, args.host, args.port, authkey, args.lease)
+    except KeyboardInterrupt:
+        return 0
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    return 0
+
+def queue_main(argv):
+    """python -m video_downloader queue: show or cancel jobs in a shared queue"""
+    parser = argparse.ArgumentParser(prog="python -m video_downloader queue",
+                                     description="Show the jobs in a shared queue.")
+    _add_queue_args(parser)
+    parser.add_argument("--status", choices=QUEUE_STATUSES, help="Only list jobs with this status")
+    parser.add_argument("--limit", type=int, default=20, help="Jobs to list")
+    parser.add_argument("--cancel", type=int, metavar="ID", action="append", help="Cancel a job (repeatable)")
+    parser.add_argument("--json", action="store_true", help="Print JSON")
+    args = parser.parse_args(argv)
+    try:
+        queue = open_queue(args.queue, args.authkey)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(e, file=sys.stderr)
+        return 2
+    for job_id in args.cancel or []:
+        queue.cancel(job_id)
+    counts, jobs = queue.counts(), queue.jobs(args.status, args.limit)
+    if args.json:
+        print(json.dumps({'counts': counts, 'jobs': jobs}))
+        return 0
+    print(", ".join(f"{counts.get(status, 0)} {status}" for status in QUEUE_STATUSES))
+    for job in jobs:
+        detail = job['filepath'] or job['error'] or ""
+        print(f"{job['id']:>6} {job['status']:<9} {job['worker'] or '-':<24} {job['url']} {detail}".rstrip())
+    return 0
+
+def store_main(argv):
+    """python -m video_downloader store: add existing files to the content store, prune it, show its size"""
+    parser = argparse.ArgumentParser(prog="python -m video_downloader store",
+                                     description="Show the content store, add existing files to it (identical "
+                                                 "files then share one copy on disk) or prune it.")
+    parser.add_argument("--root", help="Store folder (default: the content_store setting)")
+    parser.add_argument("--ingest", nargs="+", metavar="PATH",
+                        help="Files or folders to deduplicate in place (on the store's drive)")
+    parser.add_argument("--prune", action="store_true",
+                        help="Forget deleted files and delete the stored copies nothing uses any more")
+    parser.add_argument("--json", action="store_true", help="Print JSON")
+    args = parser.parse_args(argv)
+    settings = load_settings()
+    if args.root:
+        settings['content_store'] = args.root
+    try:
+        store = ContentStore.from_settings(settings)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(e, file=sys.stderr)
+        return 2
+    if store is None:
+        print("No content store configured: set content_store in settings.json or pass --root", file=sys.stderr)
+        return 2
+
+    failed = 0
+    for top in args.ingest or []:
+        paths = [top]
+        if os.path.isdir(top):
+            paths = [os.path.join(folder, name) for folder, _, names in os.walk(top) for name in names]
+        for path in paths:
+            if os.path.commonpath([store.root, os.path.abspath(path)]) == store.root or os.path.islink(path):
+                continue
+            try:
+                store.ingest(path)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Skipped {path}: {e}", file=sys.stderr)
+                failed += 1
+    freed = store.prune() if args.prune else 0
+    stats = store.stats()
+    if args.json:
+        print(json.dumps(dict(stats, freed_bytes=freed)))
+    else:
+        print(f"{stats['files']} files in {stats['objects']} objects, {stats['stored_bytes'] / 1024 ** 3:.2f} GiB "
+              f"stored, {stats['saved_bytes'] / 1024 ** 3:.2f} GiB saved by links")
+        if args.prune:
+            print(f"Pruned {freed / 1024 ** 3:.2f} GiB")
+    return 1 if failed else 0
+
+def sync_main(argv):
+    """python -m video_downloader sync: download the new videos of subscribed channels and playlists"""
+    parser = argparse.ArgumentParser(prog="python -m video_downloader sync",
+                                     description="Download the new uploads of subscribed channels and playlists. "
+                                                 "Channels are listed only back to the newest video seen before.")
+    parser.add_argument("--add", nargs="+", metavar="URL",
+                        help="Subscribe to channels or playlists (with this -o and -f) and exit")
+    parser.add_argument("--remove", nargs="+", metavar="ID", help="Unsubscribe (by ID or URL) and exit")
+    parser.add_argument("--list", action="store_true", help="List the subscriptions and exit")
+    parser.add_argument("-o", "--output",
+                        help="Download folder (default: the one given with --add, else the Downloads folder)")
+    parser.add_argument("-f", "--format", default="video",
+                        help="For --add: 'video' (up to 1080p), 'audio', or a yt-dlp video format ID")
+    parser.add_argument("--backfill", type=int, default=0, metavar="N",
+                        help="On a subscription's first sync also download its N newest videos "
+                             "(default: only what is uploaded from then on)")
+    parser.add_argument("--interval", type=float, metavar="MINUTES",
+                        help="Keep running and sync again every MINUTES")
+    parser.add_argument("--subscriptions", help="Subscription database (default: subscriptions.sqlite3 in the "
+                                                "app data folder)")
+    parser.add_argument("-j", "--jobs", type=int, help="Downloads to run at once (default from settings)")
+    parser.add_argument("--json-progress", action="store_true",
+                        help="Print one JSON object per event on stdout instead of text")
+    args = parser.parse_args(argv)
+    try:
+        subscriptions = SubscriptionStore(args.subscriptions)
+    except (OSError, sqlite3.Error) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if args.add or args.remove or args.list:
+        failed = 0
+        download_type, resolution_id = _format_type(args.format)
+        for url in args.add or []:
+            try:
+                subscription = subscriptions.add(url, download_type, resolution_id, args.output)
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                failed += 1
+                continue
+            print(f"Subscribed [{subscription.id}] {subscription.url}", file=sys.stderr)
+        for key in args.remove or []:
+            if not subscriptions.remove(key):
+                print(f"No subscription {key}", file=sys.stderr)
+                failed += 1
+        if args.list:
+            for subscription in subscriptions.subscriptions():
+                synced = (time.strftime("%Y-%m-%d %H:%M", time.localtime(subscription.last_sync))
+                          if subscription.last_sync else "never synced")
+                print(f"{subscription.id:>4} {subscription.url} ({synced}, newest seen: "
+                      f"{subscription.last_video_id or '-'}) -> {subscription.download_path or 'default folder'}")
+        return 1 if failed else 0
+
+    settings = load_settings()
+    try:
+        policy = FormatPolicy.from_settings(settings)
+        store = ContentStore.from_settings(settings)
+        schedule = SchedulePolicy.from_settings(settings)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(e, file=sys.stderr)
+        return 2
+    transfer = TransferOptions.from_settings(settings)
+    # Its own journal, so downloads a crash interrupted are finished on the next run: their videos are already
+    # marked seen and no later sync would list them again
+    journal = JobJournal(os.path.join(get_app_data_dir(), "sync_jobs.sqlite3"))
+    scheduler = DownloadScheduler(
+        args.jobs or settings['max_concurrent_downloads'],
+        progress_rate=settings['progress_updates_per_second'],
+        global_rate_limit=int(settings['global_rate_limit_kbps'] * 1024),
+        index=get_download_index() if settings['skip_downloaded'] else None,
+        journal=journal,
+        metrics=get_metrics_registry(),
+        postprocessor=PostProcessor.from_settings(settings),
+        retry=RetryPolicy.from_settings(settings),
+        breaker=CircuitBreaker.from_settings(settings),
+        store=store,
+        schedule=schedule
+    )
+    for job in restore_jobs(journal):
+        job.status = 'queued'
+        scheduler.submit(job)
+    output = args.output or get_downloads_folder()
+    listing_failed = 0
+
+    def sync_round():
+        nonlocal listing_failed
+        for subscription in subscriptions.subscriptions():
+            try:
+                videos = find_new_videos(subscriptions, subscription, args.backfill)
+            except ValueError as e:
+                print(f"Could not list {subscription.url}: {str(e).strip()}", file=sys.stderr)
+                listing_failed += 1
+                if isinstance(e, ThrottledError):
+                    break  # Every subscription on the site would be refused too; try again next round
+                continue
+            for video in videos:
+                scheduler.submit(DownloadJob(video.url, subscription.download_type,
+                                             subscription.download_path or output, subscription.resolution_id,
+                                             transfer=transfer, policy=policy))
+            newest = videos[-1].key if videos and subscription.newest_first else None
+            subscriptions.mark_seen(subscription, [video.key for video in videos], newest)
+            print(f"{subscription.url}: {len(videos)} new", file=sys.stderr)
+
+    out = sys.stdout if args.json_progress else sys.stderr
+    finished = {}  # job id -> final status
+    next_sync = time.monotonic()
+    try:
+        while True:
+            if next_sync is not None and time.monotonic() >= next_sync:
+                sync_round()
+                next_sync = time.monotonic() + args.interval * 60 if args.interval else None
+            try:
+                kind, job, payload = scheduler.events.get(timeout=0.2)
+            except Empty:
+                if next_sync is None and len(finished) == len(scheduler.jobs):
+                    break
+                continue
+            if kind == 'status' and payload in ('done', 'failed', 'cancelled'):
+                finished[job.id] = payload
+            line = format_event(kind, job, payload, args.json_progress)
+            if line is not None:
+                print(line, file=out, flush=True)
+    except KeyboardInterrupt:
+        scheduler.shutdown()  # Running jobs stay in the journal for the next run
+        return 130
+    finally:
+        journal.prune()
+    failed = sum(1 for status in finished.values() if status != 'done')
+    return 1 if failed or listing_failed else 0
+
+# Subcommands for distributed mode, the content store and subscriptions; anything else is a URL for the regular
+# download mode
+COMMANDS = {'worker': worker_main, 'enqueue': enqueue_main, 'broker': broker_main, 'queue': queue_main,
+            'store': store_main, 'sync': sync_main}
+
+def main(argv=None):
+    """Entry point. Returns the process exit code."""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in COMMANDS:
+        return COMMANDS[argv[0]](argv[1:])
+    args = parse_args(argv)
+    settings = load_settings()
+    urls = collect_urls(args)
+    # Separate from the GUI's journal so the two never restore each other's jobs
+    journal = JobJournal(os.path.join(get_app_data_dir(), "cli_jobs.sqlite3"))
+    restored = restore_jobs(journal) if args.resume else []
+    if not urls and not restored:
+        print("No URLs given", file=sys.stderr)
+        return 2
+
+    download_type, resolution_id = _format_type(args.format)
+
+    if args.rate_limit is not None:
+        settings['rate_limit_kbps'] = args.rate_limit
+    if args.global_rate_limit is not None:
+        settings['global_rate_limit_kbps'] = args.global_rate_limit
+    transfer = TransferOptions.from_settings(settings, args.turbo)
+    if args.policy is not None:
+        settings['format_policy'] = args.policy
+    if args.order is not None:
+        settings['queue_order'] = args.order
+    try:
+        policy = FormatPolicy.from_settings(settings)
+        store = ContentStore.from_settings(settings)
+        schedule = SchedulePolicy.from_settings(settings)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    scheduler = DownloadScheduler(
+        args.jobs or settings['max_concurrent_downloads'],
+        progress_rate=settings['progress_updates_per_second'],
+        global_rate_limit=int(settings['global_rate_limit_kbps'] * 1024),
+        index=get_download_index() if settings['skip_downloaded'] and not args.force else None,
+        journal=journal,
+        metrics=MetricsRegistry(args.stats_file) if args.stats_file else get_metrics_registry(),
+        postprocessor=PostProcessor.from_settings(settings),
+        retry=RetryPolicy.from_settings(settings),
+        breaker=CircuitBreaker.from_settings(settings),
+        store=store,
+        schedule=schedule
+    )
+    metrics_server = None
+    if args.metrics_port:
+        def gauges():
+            active = scheduler.active_jobs()
+            return {f"jobs_{status}": sum(1 for job in active if job.status == status)
+                    for status in ('queued', 'running', 'processing', 'paused')}
+        try:
+            metrics_server = serve_metrics(scheduler.metrics, args.metrics_port, gauges=gauges)
+        except OSError as e:
+            print(f"Could not serve metrics on port {args.metrics_port}: {e}", file=sys.stderr)
+            return 2
+    for job in restored:
+        job.status = 'queued'  # Nobody is around to resume paused jobs
+        scheduler.submit(job)
+    if restored:
+        print(f"Resuming {len(restored)} unfinished downloads", file=sys.stderr)
+    pipeline = BatchPipeline(scheduler, download_type, args.output,
+                             args.probe_jobs or settings['batch_probe_workers'], transfer, resolution_id, policy,
+                             args.clip or (), args.clip_precision or settings['clip_precision'])
+    resolver = pipeline.start(urls)
+
+    # Print events on the main thread until probing is over and the queue is empty
+    out = sys.stdout if args.json_progress else sys.stderr
+    finished = {}  # job id -> final status
+    try:
+        while True:
+            try:
+                kind, job, payload = scheduler.events.get(timeout=0.2)
+            except Empty:
+                if not resolver.is_alive() and len(finished) == len(scheduler.jobs):
+                    break
+                continue
+            if kind == 'status' and payload in ('done', 'failed', 'cancelled'):
+                finished[job.id] = payload
+            line = format_event(kind, job, payload, args.json_progress)
+            if line is not None:
+                print(line, file=out, flush=True)
+    except KeyboardInterrupt:
+        # Leave running jobs in the journal as queued for --resume
+        pipeline.cancel()
+        scheduler.shutdown()
+        return 130
+    finally:
+        journal.prune()
+        if metrics_server:
+            metrics_server.shutdown()
+
+    failed = sum(1 for status in finished.values() if status != 'done')
+    return 1 if failed or pipeline.failed else 0
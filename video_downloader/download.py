@@ -0,0 +1,67 @@
+"""Downloading a single video"""
+import subprocess
+
+from .backends import DownloadResult, get_backend
+from .formats import format_selection
+from .postprocess import plan_cut, run_cut
+from .sections import clip_template, parse_sections
+from .tools import discover_tools
+
+def download_video(video_url, download_type, output_callback, download_path, update_progress_callback, resolution_id=None,
+                   process_callback=None, transfer=None, postprocess_callback=None, output_template=None,
+                   sections=(), precision='keyframe', finish_cuts=True):
+    """Downloads the video, updates progress, and sends output to callback.
+
+    update_progress_callback receives ProgressEvent tuples. process_callback
+    (optional) receives an object with terminate() so the caller can stop the
+    download. transfer is an optional TransferOptions (turbo mode, rate
+    limit). postprocess_callback (optional) is called with the name of a
+    yt-dlp post-processor and 'started' or 'finished'. output_template
+    overrides the file name template ("%(title)s.%(ext)s"). Returns a DownloadResult; its `ok` is True if the download
+    finished cleanly.
+
+    sections ("1:00-1:30,2:00-2:10" or Section tuples) fetch only those
+    time ranges, one file each. precision is one of CLIP_PRECISIONS:
+    'keyframe' copies the streams, 'exact' has yt-dlp re-encode the clips
+    and 'smart' re-encodes only up to each clip's first keyframe. With
+    finish_cuts=False smart-mode clips are left as downloaded ("*.uncut.*")
+    for the caller to pass to a CutTask.
+    """
+    selection = format_selection(download_type, resolution_id)
+    if selection is None:
+        output_callback("Invalid download type.\n")
+        return DownloadResult(False)
+    format_arg, format_sort = selection
+    if isinstance(sections, str):
+        try:
+            sections = parse_sections(sections)
+        except ValueError as e:
+            output_callback(f"{e}\n")
+            return DownloadResult(False)
+    if download_type != 'v' and precision == 'smart':
+        precision = 'keyframe'  # Audio has no keyframes to work around
+    if sections:
+        output_template = clip_template(output_template, uncut=precision == 'smart')
+
+    try:
+        result = get_backend().download(video_url, format_arg, format_sort, download_path, output_callback,
+                                        update_progress_callback, process_callback, transfer, postprocess_callback,
+                                        output_template, sections, precision)
+    except subprocess.CalledProcessError as e:
+        output_callback(f"Error downloading video:\n{e.stderr}\n")
+        return DownloadResult(False)
+    except Exception as e:
+        output_callback(f"An unexpected error occurred: {e}\n")
+        return DownloadResult(False)
+
+    files = result.files or ((result.filepath,) if result.filepath else ())
+    if result.ok and sections and precision == 'smart' and finish_cuts and files:
+        # yt-dlp cut the clips with ffmpeg, so it is installed even if not where discover_tools looks
+        task = plan_cut(discover_tools()['ffmpeg'] or 'ffmpeg', files, sections)
+        ok, _, message = run_cut(task)
+        if message:
+            output_callback(message)
+        if not ok:
+            return result._replace(ok=False)
+        return result._replace(filepath=task.output, files=task.outputs)
+    return result
@@ -0,0 +1,88 @@
+"""Typed yt-dlp failures and how to tell them apart from its output"""
+import re
+
+class DownloadError(ValueError):
+    """A yt-dlp failure. Subclasses say what went wrong and whether trying again can help.
+
+    Derives from ValueError, which probes raised before these types
+    existed, so older handlers still catch it.
+    """
+    kind = 'error'
+    retryable = False
+
+class NetworkError(DownloadError):
+    """Timeouts, resets, DNS failures and 5xx responses"""
+    kind = 'network'
+    retryable = True
+
+class ThrottledError(DownloadError):
+    """HTTP 429 or the site's bot check"""
+    kind = 'throttled'
+    retryable = True
+
+class BlockedError(DownloadError):
+    """Geo block, age gate, private or members-only video"""
+    kind = 'blocked'
+
+class UnavailableError(DownloadError):
+    """Removed or missing video, or no format that can be downloaded"""
+    kind = 'unavailable'
+
+class UnsupportedError(DownloadError):
+    """No extractor for the URL"""
+    kind = 'unsupported'
+
+class PostProcessError(DownloadError):
+    """ffmpeg failed to merge, convert or tag the download"""
+    kind = 'postprocess'
+
+# First match wins, so the more specific patterns come first
+_PATTERNS = [
+    # Only the server's own words: a bare "rate limit" also appears in notes about the user's --limit-rate
+    (ThrottledError, r"HTTP Error 429|Too Many Requests|(?:been|being) rate.?limited|confirm you.re not a bot"),
+    (PostProcessError, r"Postprocessing|Conversion failed|ffmpeg (?:not found|exited)"),
+    (BlockedError, r"not (?:made )?available in your country|geo.?restrict|Sign in to confirm your age|"
+                   r"age.?restrict|members.only|Join this channel|Private video|video is private|"
+                   r"requires? (?:login|authentication)"),
+    (UnsupportedError, r"Unsupported URL|is not a valid URL"),
+    (UnavailableError, r"Video unavailable|has been removed|HTTP Error 40[34]|HTTP Error 410|does not exist|"
+                       r"Requested format is not available|Unable to extract|no video found"),
+    (NetworkError, r"HTTP Error 5\d\d|timed? ?out|Connection (?:reset|refused|aborted)|Remote end closed|"
+                   r"IncompleteRead|Temporary failure in name resolution|Name or service not known|"
+                   r"Network is unreachable|getaddrinfo failed|Errno (?:101|104|110|111|113)|urlopen error|"
+                   r"SSL: |Unable to download (?:webpage|API page|JSON)"),
+]
+_COMPILED = [(error_class, re.compile(pattern, re.IGNORECASE)) for error_class, pattern in _PATTERNS]
+
+def friendly_error(error_msg):
+    """Map raw yt-dlp error output to a message fit for the user"""
+    if "Video unavailable" in error_msg:
+        return "This video is unavailable or private"
+    elif "Unsupported URL" in error_msg:
+        return "Invalid URL or unsupported platform"
+    elif "Sign in to confirm your age" in error_msg:
+        return "Age-restricted video"
+    elif "Requested format is not available" in error_msg:
+        return "The requested video format is not available"
+    elif "Unable to extract video data" in error_msg:
+        return "Unable to find video. Please check the URL"
+    elif re.search(r"HTTP Error 429|Too Many Requests", error_msg):
+        return "The site is limiting requests (HTTP 429)"
+    return error_msg
+
+def error_from_output(text):
+    """The DownloadError described by yt-dlp's stderr (or an exception message).
+
+    WARNING lines are ignored; returns None if there is nothing else.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    errors = [line for line in lines if line.startswith('ERROR')]
+    if not errors:
+        errors = [line for line in lines if not line.startswith(('WARNING', '[', 'Deprecated'))]
+    if not errors:
+        return None
+    message = re.sub(r'^ERROR:\s*', '', errors[-1])
+    for error_class, pattern in _COMPILED:
+        if any(pattern.search(line) for line in errors):
+            return error_class(friendly_error(message))
+    return DownloadError(friendly_error(message))
@@ -0,0 +1,356 @@
+"""Turning yt-dlp info dicts into format choices"""
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+# Codecs that can be stream-copied into each container without re-encoding
+CONTAINER_CODECS = {
+    'mp4': ({'h264', 'h265', 'av1'}, {'aac', 'mp3', 'ac3', 'eac3'}),
+    'webm': ({'vp9', 'vp8', 'av1'}, {'opus', 'vorbis'}),
+}
+
+# Rough bytes per second of each video codec relative to h264 at equal quality
+CODEC_EFFICIENCY = {'av1': 0.6, 'h265': 0.7, 'vp9': 0.75, 'h264': 1.0, 'vp8': 1.1}
+
+# Extensions that only ever hold audio, for formats whose codecs the site does not name
+AUDIO_EXTS = frozenset(('aac', 'flac', 'm4a', 'mka', 'mp3', 'oga', 'ogg', 'opus', 'wav', 'weba'))
+
+def codec_family(codec):
+    """Normalize a yt-dlp codec string ('avc1.640028', 'vp09.00...') to a short family name"""
+    codec = (codec or '').lower()
+    if not codec or codec == 'none':
+        return None
+    for prefix, family in (('avc', 'h264'), ('h264', 'h264'), ('hev', 'h265'), ('hvc', 'h265'),
+                           ('h265', 'h265'), ('av01', 'av1'), ('av1', 'av1'), ('vp09', 'vp9'), ('vp9', 'vp9'),
+                           ('vp8', 'vp8'), ('mp4a', 'aac'), ('aac', 'aac'), ('opus', 'opus'),
+                           ('vorbis', 'vorbis'), ('mp3', 'mp3'), ('ac-3', 'ac3'), ('ac3', 'ac3'),
+                           ('ec-3', 'eac3'), ('eac3', 'eac3')):
+        if codec.startswith(prefix):
+            return family
+    return codec.split('.')[0]
+
+class Format:
+    """One entry of an info dict's 'formats' list, with the fields the selector needs"""
+    __slots__ = ('format_id', 'ext', 'vcodec', 'acodec', 'width', 'height', 'fps', 'tbr', 'abr', 'asr',
+                 'filesize', 'dynamic_range', 'duration', '_video', '_audio')
+
+    def __init__(self, fmt, duration=None):
+        self.format_id = str(fmt.get('format_id'))
+        self.ext = fmt.get('ext')
+        self.vcodec = codec_family(fmt.get('vcodec'))
+        self.acodec = codec_family(fmt.get('acodec'))
+        self.width = fmt.get('width')
+        self.height = fmt.get('height')
+        self.fps = fmt.get('fps')
+        self.tbr = fmt.get('tbr')  # kbit/s
+        self.abr = fmt.get('abr')
+        self.asr = fmt.get('asr')
+        self.filesize = fmt.get('filesize') or fmt.get('filesize_approx')
+        self.dynamic_range = fmt.get('dynamic_range') or 'SDR'
+        self.duration = duration
+        # yt-dlp says 'none' for a stream that is absent and leaves the codec out when the site does not say.
+        # Unknown codecs are guessed: dimensions mean video; a bitrate, an audio-only extension or a
+        # 'none' video codec mean audio; and a video whose codecs are both unnamed is taken to be muxed.
+        no_video, no_audio = fmt.get('vcodec') == 'none', fmt.get('acodec') == 'none'
+        self._video = not no_video and bool(self.height or self.width)
+        self._audio = not no_audio and (self.acodec is not None or bool(self.abr) or no_video or (
+            self.vcodec is None if self._video else self.ext in AUDIO_EXTS))
+
+    @property
+    def has_video(self):
+        return self._video
+
+    @property
+    def has_audio(self):
+        return self._audio
+
+    @property
+    def is_hdr(self):
+        return self.dynamic_range not in (None, 'SDR')
+
+    def estimated_size(self):
+        """Size in bytes from yt-dlp's filesize, else from bitrate and duration (None if unknown)"""
+        if self.filesize:
+            return int(self.filesize)
+        bitrate = self.tbr or self.abr
+        if bitrate and self.duration:
+            return int(bitrate * 1000 / 8 * self.duration)
+        return None
+
+    def fits(self, container):
+        """True if this format can be stream-copied into container (by extension when a codec is unnamed)"""
+        video_codecs, audio_codecs = CONTAINER_CODECS[container]
+        same_ext = self.ext == container or (container == 'mp4' and self.ext == 'm4a')
+        return ((not self.has_video or self.vcodec in video_codecs or (self.vcodec is None and same_ext)) and
+                (not self.has_audio or self.acodec in audio_codecs or (self.acodec is None and same_ext)))
+
+    def label(self):
+        """Dropdown text such as '1080p60 AV1 HDR (~85 MB)'"""
+        if self.has_video:
+            text = f"{self.height}p" if self.height else f"{self.width}w"
+            if self.fps and self.fps > 30:
+                text += f"{int(round(self.fps))}"
+            if self.vcodec:  # Unnamed codecs are left out
+                text += f" {self.vcodec.upper()}"
+            if self.is_hdr:
+                text += " HDR"
+        else:
+            text = f"{int(self.abr)}kbps" if self.abr else (f"{int(self.asr / 1000)}kHz" if self.asr else "audio")
+            if self.acodec:
+                text += f" {self.acodec.upper()}"
+        size = self.estimated_size()
+        if size:
+            text += f" (~{size / 1024 / 1024:.0f} MB)"
+        return text
+
+    def __repr__(self):
+        return f"Format({self.format_id!r}, {self.label()!r})"
+
+def parse_formats(video_info):
+    """Every format in an info dict as Format objects (storyboards and the like are skipped)"""
+    duration = video_info.get('duration')
+    formats = [Format(fmt, duration) for fmt in video_info.get('formats') or [] if fmt.get('format_id')]
+    return [fmt for fmt in formats if fmt.has_video or fmt.has_audio]
+
+class FormatPolicy:
+    """Rules for picking a format automatically.
+
+    prefer is 'best' (highest quality that passes the limits) or 'smallest'
+    (smallest estimated file that passes them). container, if set, only
+    allows codecs that can be stream-copied into it, so merging never has
+    to re-encode.
+    """
+
+    def __init__(self, prefer='best', min_height=None, max_height=None, max_fps=None, max_filesize=None,
+                 container=None, min_abr=64):
+        if prefer not in ('best', 'smallest'):
+            raise ValueError(f"Unknown preference: {prefer}")
+        if container is not None and container not in CONTAINER_CODECS:
+            raise ValueError(f"Unsupported container: {container}")
+        self.prefer = prefer
+        self.min_height = min_height
+        self.max_height = max_height
+        self.max_fps = max_fps
+        self.max_filesize = max_filesize  # bytes
+        self.container = container
+        self.min_abr = min_abr  # Lowest audio bitrate 'smallest' will go to
+
+    @classmethod
+    def parse(cls, text):
+        """Build a policy from a short spec like 'smallest,>=720p,mp4,<=200MB'.
+
+        Tokens: best | smallest | >=720p | <=1080p | fps<=30 | <=200MB (or GB) | mp4 | webm.
+        Raises ValueError for anything else.
+        """
+        kwargs = {}
+        for token in (t.strip().lower() for t in text.split(',')):
+            if not token:
+                continue
+            if token in ('best', 'smallest'):
+                kwargs['prefer'] = token
+            elif token in CONTAINER_CODECS:
+                kwargs['container'] = token
+            elif re.fullmatch(r'>=\d+p', token):
+                kwargs['min_height'] = int(token[2:-1])
+            elif re.fullmatch(r'<=\d+p', token):
+                kwargs['max_height'] = int(token[2:-1])
+            elif re.fullmatch(r'fps<=\d+', token):
+                kwargs['max_fps'] = int(token[5:])
+            elif re.fullmatch(r'<=\d+(\.\d+)?(mb|gb)', token):
+                scale = 1024 ** 3 if token.endswith('gb') else 1024 ** 2
+                kwargs['max_filesize'] = int(float(token[2:-2]) * scale)
+            else:
+                raise ValueError(f"Unknown format policy token: {token}")
+        return cls(**kwargs)
+
+    def to_spec(self):
+        """Inverse of parse(), for storing in the job journal (min_abr has no token and is not kept)"""
+        tokens = [self.prefer]
+        if self.min_height:
+            tokens.append(f">={self.min_height}p")
+        if self.max_height:
+            tokens.append(f"<={self.max_height}p")
+        if self.max_fps:
+            tokens.append(f"fps<={self.max_fps}")
+        if self.max_filesize:
+            # Exact: a byte count over 2**20 has at most 20 decimal places, so parse() gets the same bytes back
+            megabytes = f"{self.max_filesize / 1024 ** 2:.20f}".rstrip('0').rstrip('.')
+            tokens.append(f"<={megabytes}MB")
+        if self.container:
+            tokens.append(self.container)
+        return ','.join(tokens)
+
+    @classmethod
+    def from_settings(cls, settings):
+        """The policy from the format_policy setting, or None if it is empty"""
+        text = settings.get('format_policy', '').strip()
+        return cls.parse(text) if text else None
+
+    def allows_video(self, fmt):
+        if self.min_height and (fmt.height or 0) < self.min_height:
+            return False
+        if self.max_height and (fmt.height or 0) > self.max_height:
+            return False
+        if self.max_fps and (fmt.fps or 0) > self.max_fps:
+            return False
+        return self.container is None or fmt.fits(self.container)
+
+    def allows_audio(self, fmt):
+        return self.container is None or fmt.fits(self.container)
+
+class FormatChoice(NamedTuple):
+    """The format(s) the selector settled on"""
+    video: Optional[Format]
+    audio: Optional[Format]  # None when video already carries audio
+    estimated_size: Optional[int]
+
+    @property
+    def format_spec(self):
+        """Exact yt-dlp format string, e.g. '137+140'"""
+        if self.video and self.audio:
+            return f"{self.video.format_id}+{self.audio.format_id}"
+        return (self.video or self.audio).format_id
+
+def _quality_key(fmt):
+    # Higher is better: resolution, frame rate, HDR, then bitrate adjusted for codec efficiency
+    efficiency = CODEC_EFFICIENCY.get(fmt.vcodec, 1.0)
+    return (fmt.height or 0, fmt.fps or 0, fmt.is_hdr, (fmt.tbr or 0) / efficiency)
+
+def _audio_key(fmt):
+    return (fmt.abr or fmt.tbr or 0, fmt.asr or 0)
+
+def _total_size(*formats):
+    sizes = [fmt.estimated_size() for fmt in formats if fmt is not None]
+    return None if None in sizes else sum(sizes)
+
+def pick_audio(formats, video=None, policy=None):
+    """Best (or, for a 'smallest' policy, smallest acceptable) audio-only format that can go with video"""
+    policy = policy or FormatPolicy()
+    candidates = [f for f in formats if f.has_audio and not f.has_video and policy.allows_audio(f)]
+    if video is not None and policy.container is None:
+        # Prefer audio that shares a container with the video so the merge is a stream copy
+        for container in CONTAINER_CODECS:
+            if video.fits(container):
+                matching = [f for f in candidates if f.fits(container)]
+                if matching:
+                    candidates = matching
+                break
+    if not candidates:
+        return None
+    if policy.prefer == 'smallest':
+        acceptable = [f for f in candidates if (f.abr or f.tbr or 0) >= policy.min_abr] or candidates
+        return min(acceptable, key=_audio_key)
+    return max(candidates, key=_audio_key)
+
+def select_formats(video_info, policy=None, download_type='v'):
+    """Score every format against a policy and return the winning FormatChoice (None if nothing fits)"""
+    policy = policy or FormatPolicy()
+    formats = parse_formats(video_info)
+
+    if download_type == 'a':
+        audio = pick_audio(formats, policy=policy)
+        return FormatChoice(None, audio, _total_size(audio)) if audio else None
+
+    choices = []
+    for fmt in formats:
+        if not fmt.has_video or not policy.allows_video(fmt):
+            continue
+        if fmt.has_audio:
+            choices.append(FormatChoice(fmt, None, _total_size(fmt)))
+        else:
+            audio = pick_audio(formats, fmt, policy)
+            if audio is not None:
+                choices.append(FormatChoice(fmt, audio, _total_size(fmt, audio)))
+
+    if policy.max_filesize:
+        choices = [c for c in choices if c.estimated_size is not None and c.estimated_size <= policy.max_filesize]
+    if not choices:
+        return None
+    if policy.prefer == 'smallest':
+        # Unknown sizes go last; among equal sizes prefer the higher quality
+        return min(choices, key=lambda c: (c.estimated_size is None, c.estimated_size or 0,
+                                           tuple(-x for x in _quality_key(c.video))))
+    return max(choices, key=lambda c: _quality_key(c.video) + _audio_key(c.audio or c.video))
+
+def estimate_size(video_info, download_type='v', format_spec=None, policy=None, sections=()):
+    """Bytes a download is expected to take, or None if unknown.
+
+    format_spec ("137+140") names the exact formats; without it the size is
+    that of what select_formats() would pick for policy. Clips (sections)
+    count only their share of the duration.
+    """
+    formats = parse_formats(video_info)
+    if format_spec:
+        by_id = {fmt.format_id: fmt for fmt in formats}
+        picked = [by_id.get(format_id) for format_id in format_spec.split('+')]
+        size = None if None in picked else _total_size(*picked)
+    else:
+        choice = select_formats(video_info, policy, download_type)
+        size = choice.estimated_size if choice else None
+    duration = video_info.get('duration')
+    if size and sections and duration:
+        covered = sum(min(duration, duration if section.end is None else section.end) - min(duration, section.start)
+                      for section in sections)
+        size = int(size * min(1.0, covered / duration))
+    return size
+
+def extract_metadata(video_info):
+    """Pick the fields shown in the info panel out of an info dict"""
+    return {
+        'title': video_info.get('title', 'Unknown'),
+        'duration': video_info.get('duration', 0),
+        'uploader': video_info.get('uploader', 'Unknown'),
+        'view_count': video_info.get('view_count', 0),
+        'upload_date': video_info.get('upload_date', 'Unknown'),
+        'description': (video_info.get('description') or '').split('\n')[0],  # First line only
+        'id': video_info.get('id'),
+        'extractor': video_info.get('extractor_key') or video_info.get('extractor'),
+    }
+
+def extract_formats(video_info, format_type='v') -> List[Tuple[str, str]]:
+    """Returns list of (label, format spec) tuples for the given format type.
+
+    Every video variant is kept (each resolution, frame rate, codec and HDR
+    version) and paired with the audio that merges into it without
+    re-encoding, so the spec can be passed to download_video as is.
+    """
+    formats = parse_formats(video_info)
+    entries = []
+    if format_type == 'v':
+        videos = sorted((f for f in formats if f.has_video), key=_quality_key, reverse=True)
+        for fmt in videos:
+            if fmt.has_audio:
+                entries.append((fmt.label(), fmt.format_id))
+            else:
+                audio = pick_audio(formats, fmt)
+                if audio is not None:
+                    entries.append((fmt.label(), f"{fmt.format_id}+{audio.format_id}"))
+    else:
+        audios = sorted((f for f in formats if f.has_audio and not f.has_video), key=_audio_key, reverse=True)
+        entries = [(fmt.label(), fmt.format_id) for fmt in audios]
+
+    # Labels are dropdown keys, so number any repeats
+    seen = {}
+    labeled = []
+    for label, spec in entries:
+        seen[label] = seen.get(label, 0) + 1
+        labeled.append((label if seen[label] == 1 else f"{label} #{seen[label]}", spec))
+    return labeled
+
+def format_selection(download_type, resolution_id=None):
+    """Returns (format, format_sort) for yt-dlp, or None for an unknown download type.
+
+    resolution_id may be a bare video format ID or an exact spec from
+    extract_formats/select_formats ('137+140', or '137,140' to download the
+    streams separately), which is used unchanged.
+    """
+    if resolution_id and ('+' in resolution_id or ',' in resolution_id):
+        return resolution_id, []
+    if download_type == 'v':
+        if resolution_id:
+            return f'{resolution_id}+ba/b[ext=mp4]', ['ext:webm:none']
+        return 'bv*[ext=mp4][height<=1080]+ba/b[ext=mp4]', ['ext:webm:none']
+    elif download_type == 'a':
+        if resolution_id:
+            return resolution_id, []
+        return 'ba[ext=m4a]/ba[ext=mp3]', ['ares']
+    return None
@@ -0,0 +1,142 @@
+"""Compact info dicts: only the fields this package reads from yt-dlp's metadata"""
+import json
+import re
+from json.decoder import scanstring
+
+# Top-level fields that are kept; the rest (captions, chapters, heatmaps, thumbnails...) is dropped
+INFO_FIELDS = frozenset((
+    'id', 'title', 'duration', 'uploader', 'channel_id', 'view_count', 'upload_date', 'description',
+    'extractor', 'extractor_key', 'webpage_url', 'thumbnail', 'live_status',
+))
+# Fields of each entry in 'formats' (Format reads these); URLs, headers and fragment lists are dropped
+FORMAT_FIELDS = frozenset((
+    'format_id', 'ext', 'vcodec', 'acodec', 'width', 'height', 'fps', 'tbr', 'abr', 'asr', 'filesize',
+    'filesize_approx', 'dynamic_range',
+))
+
+_scan_once = json.scanner.make_scanner(json.JSONDecoder())
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+def _nested(inner):
+    # Text made of `inner` runs and {...} / [...] groups whose content is `inner`
+    return rf'{inner}(?:(?:\{{{inner}\}}|\[{inner}\]){inner})*'
+
+# Text up to the next bracket outside a string, then the same with up to three levels of brackets
+# balanced inside it. Skipping a list of fragment objects takes one C-level match instead of one
+# Python step per bracket.
+_FLAT = r'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*'
+_BALANCED = re.compile(_nested(_nested(_nested(_FLAT))))
+
+def _first_line(text):
+    return text.split('\n', 1)[0] if isinstance(text, str) else text
+
+def project_info(info):
+    """Copy of an info dict with only INFO_FIELDS and the FORMAT_FIELDS of each format.
+
+    The description is cut to its first line, which is all the info panel
+    shows.
+    """
+    compact = {key: value for key, value in info.items() if key in INFO_FIELDS}
+    if 'description' in compact:
+        compact['description'] = _first_line(compact['description'])
+    formats = info.get('formats')
+    if formats is not None:
+        compact['formats'] = [{key: value for key, value in fmt.items() if key in FORMAT_FIELDS}
+                              for fmt in formats]
+    return compact
+
+def parse_info_json(text):
+    """Parse yt-dlp's -j output straight into the compact form of project_info().
+
+    Unwanted values are skipped by scanning for their closing bracket
+    instead of being decoded, so the per-fragment and per-caption objects
+    that make up most of a long video's JSON are never built. Raises
+    ValueError (json.JSONDecodeError) for malformed input.
+    """
+    if isinstance(text, bytes):
+        text = text.decode('utf-8')
+    i = _skip_whitespace(text, 0)
+    if text.startswith('{', i):
+        info, i = _parse_object(text, i, INFO_FIELDS, _INFO_PARSERS)
+    else:
+        info, i = _scan(text, i)  # Not an object, let the caller complain about its type
+    if _skip_whitespace(text, i) != len(text):
+        raise json.JSONDecodeError("Extra data", text, i)
+    return info
+
+def _skip_whitespace(text, i):
+    return _WHITESPACE.match(text, i).end()
+
+def _scan(text, i):
+    try:
+        return _scan_once(text, i)
+    except StopIteration:
+        raise json.JSONDecodeError("Expecting value", text, i) from None
+
+def _skip_value(text, i):
+    # Index just past the value starting at i, without decoding it
+    if not text.startswith(('{', '['), i):
+        return _scan(text, i)[1]  # Scalars are cheap to decode
+    depth = 1
+    i += 1
+    while True:
+        i = _BALANCED.match(text, i).end()  # Stops at a closing bracket, or an opening one nested deeper
+        if i >= len(text):
+            raise json.JSONDecodeError("Unterminated value", text, i)
+        depth += 1 if text[i] in '[{' else -1
+        i += 1
+        if depth == 0:
+            return i
+
+def _parse_object(text, i, fields, parsers):
+    # text[i] is '{'. Returns ({wanted key: value}, index after the '}')
+    result = {}
+    i = _skip_whitespace(text, i + 1)
+    if text.startswith('}', i):
+        return result, i + 1
+    while True:
+        if not text.startswith('"', i):
+            raise json.JSONDecodeError("Expecting property name enclosed in double quotes", text, i)
+        key, i = scanstring(text, i + 1)
+        i = _skip_whitespace(text, i)
+        if not text.startswith(':', i):
+            raise json.JSONDecodeError("Expecting ':' delimiter", text, i)
+        i = _skip_whitespace(text, i + 1)
+        if key in fields or key in parsers:
+            result[key], i = parsers.get(key, _scan)(text, i)
+        else:
+            i = _skip_value(text, i)
+        i = _skip_whitespace(text, i)
+        if text.startswith(',', i):
+            i = _skip_whitespace(text, i + 1)
+        elif text.startswith('}', i):
+            return result, i + 1
+        else:
+            raise json.JSONDecodeError("Expecting ',' delimiter", text, i)
+
+def _parse_formats(text, i):
+    if not text.startswith('[', i):
+        return _scan(text, i)  # null
+    formats = []
+    i = _skip_whitespace(text, i + 1)
+    if text.startswith(']', i):
+        return formats, i + 1
+    while True:
+        if text.startswith('{', i):
+            fmt, i = _parse_object(text, i, FORMAT_FIELDS, {})
+        else:
+            fmt, i = _scan(text, i)
+        formats.append(fmt)
+        i = _skip_whitespace(text, i)
+        if text.startswith(',', i):
+            i = _skip_whitespace(text, i + 1)
+        elif text.startswith(']', i):
+            return formats, i + 1
+        else:
+            raise json.JSONDecodeError("Expecting ',' delimiter", text, i)
+
+def _parse_description(text, i):
+    value, i = _scan(text, i)
+    return _first_line(value), i
+
+_INFO_PARSERS = {'formats': _parse_formats, 'description': _parse_description}
@@ -0,0 +1,109 @@
+"""Crash-safe record of queued and in-flight download jobs"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .backends import TransferOptions
+from .formats import FormatPolicy
+from .scheduler import DownloadJob
+from .sections import format_sections, parse_sections
+from .settings import get_app_data_dir
+
+# Statuses that mean the job still has work to do
+UNFINISHED_STATUSES = ('queued', 'running', 'processing', 'paused')
+_PLACEHOLDERS = ", ".join("?" * len(UNFINISHED_STATUSES))
+
+class JobJournal:
+    """SQLite journal of download jobs, written on every status change.
+
+    If the app exits or crashes mid-download, unfinished() returns what was
+    queued, running or paused so it can be restored on the next launch. The
+    database runs in WAL mode so every commit survives a crash without an
+    fsync-heavy rollback journal.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_app_data_dir(), "jobs.sqlite3")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, download_type TEXT NOT NULL, "
+            "resolution_id TEXT, download_path TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 0, "
+            "transfer TEXT, status TEXT NOT NULL, created REAL NOT NULL, updated REAL NOT NULL, "
+            "sections TEXT, precision TEXT, policy TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column in ('sections', 'precision', 'policy'):  # Journals from older versions lack these
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+        self._db.commit()
+
+    def add(self, job):
+        """Record a new job and remember its journal row on job.journal_id"""
+        now = time.time()
+        transfer = json.dumps(job.transfer.to_dict()) if job.transfer else None
+        policy = job.policy.to_spec() if job.policy else None
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (url, download_type, resolution_id, download_path, priority, transfer, status, "
+                "created, updated, sections, precision, policy) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.url, job.download_type, job.resolution_id, job.download_path, job.priority, transfer,
+                 job.status, now, now, format_sections(job.sections) or None, job.precision, policy)
+            )
+            self._db.commit()
+        job.journal_id = cursor.lastrowid
+
+    def update(self, job):
+        """Store the job's current status and priority"""
+        if job.journal_id is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, priority = ?, updated = ? WHERE id = ?",
+                (job.status, job.priority, time.time(), job.journal_id)
+            )
+            self._db.commit()
+
+    def unfinished(self):
+        """Rows (as dicts) of jobs that were queued, running, processing or paused, oldest first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, url, download_type, resolution_id, download_path, priority, transfer, status, sections, "
+                f"precision, policy FROM jobs WHERE status IN ({_PLACEHOLDERS}) ORDER BY id", UNFINISHED_STATUSES
+            ).fetchall()
+        keys = ('id', 'url', 'download_type', 'resolution_id', 'download_path', 'priority', 'transfer', 'status',
+                'sections', 'precision', 'policy')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def prune(self, max_age=7 * 24 * 3600):
+        """Delete finished jobs older than max_age seconds"""
+        with self._lock:
+            self._db.execute(
+                f"DELETE FROM jobs WHERE status NOT IN ({_PLACEHOLDERS}) AND updated < ?",
+                UNFINISHED_STATUSES + (time.time() - max_age,)
+            )
+            self._db.commit()
+
+def restore_jobs(journal):
+    """Build DownloadJobs for everything the journal says was unfinished.
+
+    Jobs that were running or post-processing come back as queued (yt-dlp
+    finds the finished streams and skips straight to processing them);
+    paused jobs stay paused.
+    """
+    jobs = []
+    for row in journal.unfinished():
+        transfer = TransferOptions.from_dict(json.loads(row['transfer'])) if row['transfer'] else None
+        policy = FormatPolicy.parse(row['policy']) if row['policy'] else None
+        job = DownloadJob(row['url'], row['download_type'], row['download_path'], row['resolution_id'],
+                          row['priority'], transfer, policy=policy, sections=parse_sections(row['sections']),
+                          precision=row['precision'] or 'keyframe')
+        job.journal_id = row['id']
+        job.status = 'paused' if row['status'] == 'paused' else 'queued'
+        jobs.append(job)
+    return jobs
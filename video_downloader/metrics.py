@@ -0,0 +1,319 @@
+"""Per-job phase timings and the aggregate counters and histograms built from them"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .settings import get_app_data_dir
+
+PHASES = ('queue_wait', 'probe', 'download', 'postprocess', 'move')
+
+# Histogram bucket upper bounds
+PHASE_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)  # seconds
+SPEED_BUCKETS = tuple(kib * 1024 for kib in (64, 256, 512, 1024, 2048, 5120, 10240, 25600, 51200, 102400))
+SIZE_BUCKETS = tuple(mib * 1024 * 1024 for mib in (1, 5, 10, 50, 100, 250, 500, 1024, 4096))
+
+class JobMetrics:
+    """Where one job's time went, plus its byte count, speeds and retries.
+
+    Time is attributed to the current phase until the next one starts:
+    queue_wait from submit to start, probe until the first progress event
+    (metadata lookup and yt-dlp's own extraction), download until a
+    post-processor runs, then postprocess (merging, ffmpeg fixups) and move.
+    """
+
+    def __init__(self):
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.bytes = 0
+        self.peak_speed = 0.0  # bytes per second
+        self.retries = 0
+        self.started = None  # time.time() of the first start
+        self.finished = None
+        self.phase = None
+        self._phase_started = None
+        self._stream_bytes = 0  # Bytes of the stream being downloaded right now
+        self._queued = time.monotonic()
+
+    def queued(self):
+        """The job entered the queue (again, after a pause or shutdown)"""
+        self.enter(None)
+        self._queued = time.monotonic()
+
+    def start(self):
+        """A worker picked the job up"""
+        if self._queued is not None:
+            self.phases['queue_wait'] += time.monotonic() - self._queued
+            self._queued = None
+        self.started = self.started or time.time()
+        self.enter('probe')
+
+    def enter(self, phase):
+        """Close the current phase and start timing another (None to stop)"""
+        now = time.monotonic()
+        if self.phase is not None:
+            self.phases[self.phase] += now - self._phase_started
+        self.phase = phase
+        self._phase_started = now
+
+    def finish(self):
+        self.enter(None)
+        self.finished = time.time()
+
+    def on_progress(self, event):
+        if event.status == 'downloading' and self.phase != 'download':
+            self.enter('download')
+        if event.speed:
+            self.peak_speed = max(self.peak_speed, event.speed)
+        if event.downloaded_bytes is not None:
+            if event.status == 'finished':
+                # Video and audio streams are downloaded one after the other
+                self.bytes += event.total_bytes or event.downloaded_bytes
+                self._stream_bytes = 0
+            else:
+                self._stream_bytes = event.downloaded_bytes
+
+    def on_postprocess(self, postprocessor, status):
+        if status == 'started':
+            self.enter('move' if postprocessor == 'MoveFiles' else 'postprocess')
+
+    def on_output(self, text):
+        # yt-dlp's own retries: "[download] Got error: ... Retrying (1/10)..."
+        self.retries += text.count("Retrying (")
+
+    @property
+    def total_bytes(self):
+        return self.bytes + self._stream_bytes
+
+    @property
+    def avg_speed(self):
+        """Bytes per second over the time spent in the download phase"""
+        elapsed = self.phases['download']
+        return self.total_bytes / elapsed if elapsed else 0.0
+
+    def to_dict(self):
+        return {
+            'phases': {name: round(seconds, 3) for name, seconds in self.phases.items()},
+            'bytes': self.total_bytes,
+            'avg_speed': round(self.avg_speed),
+            'peak_speed': round(self.peak_speed),
+            'retries': self.retries,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+    def summary(self):
+        """One line for the job log, e.g. '12.3 MB in 4.1s, avg 3.0 MB/s'"""
+        mb = self.total_bytes / 1024 / 1024
+        return f"{mb:.1f} MB in {self.phases['download']:.1f}s, avg {self.avg_speed / 1024 / 1024:.1f} MB/s"
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (None if empty or in +Inf)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return None
+
+    def to_dict(self):
+        return {'buckets': list(self.buckets), 'counts': list(self.counts), 'sum': self.sum, 'count': self.count}
+
+    @classmethod
+    def from_dict(cls, data, buckets):
+        histogram = cls(buckets)
+        if list(data.get('buckets', [])) == list(buckets):
+            histogram.counts = list(data['counts'])
+            histogram.sum = data['sum']
+            histogram.count = data['count']
+        return histogram
+
+class MetricsRegistry:
+    """Aggregates finished jobs into counters and histograms.
+
+    With a path, the totals are loaded from and saved to a JSON stats file
+    after every job, so they accumulate across runs. Prometheus text comes
+    from to_prometheus().
+    """
+
+    def __init__(self, path=None, recent=100):
+        self.path = path
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # Jobs finishing together must not interleave their writes
+        self.jobs = {}  # status -> count
+        self.bytes = 0
+        self.retries = 0
+        self.phases = {name: Histogram(PHASE_BUCKETS) for name in PHASES}
+        self.speed = Histogram(SPEED_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.recent = deque(maxlen=recent)  # Latest job records, newest last
+        self.since = time.time()
+        if path:
+            self._load()
+
+    def observe(self, job):
+        """Add a job that reached done, failed or cancelled"""
+        metrics = job.metrics
+        record = dict(metrics.to_dict(), id=job.id, url=job.url, status=job.status)
+        with self._lock:
+            self.jobs[job.status] = self.jobs.get(job.status, 0) + 1
+            self.bytes += metrics.total_bytes
+            self.retries += metrics.retries
+            for name, seconds in metrics.phases.items():
+                if seconds or name in ('queue_wait', 'probe'):
+                    self.phases[name].observe(seconds)
+            if job.status == 'done' and metrics.total_bytes:
+                self.size.observe(metrics.total_bytes)
+                if metrics.avg_speed:
+                    self.speed.observe(metrics.avg_speed)
+            self.recent.append(record)
+        if self.path:
+            with self._save_lock:
+                self._save(self.snapshot())
+
+    def snapshot(self):
+        """All totals as a JSON-serializable dict"""
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        return {
+            'since': self.since,
+            'updated': time.time(),
+            'jobs': dict(self.jobs),
+            'bytes': self.bytes,
+            'retries': self.retries,
+            'phases': {name: histogram.to_dict() for name, histogram in self.phases.items()},
+            'speed': self.speed.to_dict(),
+            'size': self.size.to_dict(),
+            'recent': list(self.recent),
+        }
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return  # First run or unreadable file, start from zero
+        self.since = data.get('since', self.since)
+        self.jobs = dict(data.get('jobs', {}))
+        self.bytes = data.get('bytes', 0)
+        self.retries = data.get('retries', 0)
+        for name in PHASES:
+            self.phases[name] = Histogram.from_dict(data.get('phases', {}).get(name, {}), PHASE_BUCKETS)
+        self.speed = Histogram.from_dict(data.get('speed', {}), SPEED_BUCKETS)
+        self.size = Histogram.from_dict(data.get('size', {}), SIZE_BUCKETS)
+        self.recent.extend(data.get('recent', []))
+
+    def _save(self, snapshot):
+        # Write to a temporary file first so a crash never leaves half a file
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass  # Stats are best effort
+
+    def to_prometheus(self, gauges=None):
+        """Prometheus text exposition format. gauges is an optional {name: value} of extra gauges."""
+        prefix = "video_downloader"
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        def histogram(name, value, labels=""):
+            cumulative = 0
+            for bound, count in zip(value.buckets, value.counts):
+                cumulative += count
+                lines.append(f'{prefix}_{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_{name}_bucket{{{labels}le="+Inf"}} {value.count}')
+            label_set = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{prefix}_{name}_sum{label_set} {value.sum}")
+            lines.append(f"{prefix}_{name}_count{label_set} {value.count}")
+
+        with self._lock:
+            metric("jobs_total", "counter", "Finished jobs by final status")
+            for status, count in sorted(self.jobs.items()):
+                lines.append(f'{prefix}_jobs_total{{status="{status}"}} {count}')
+            metric("downloaded_bytes_total", "counter", "Bytes downloaded")
+            lines.append(f"{prefix}_downloaded_bytes_total {self.bytes}")
+            metric("retries_total", "counter", "Download retries")
+            lines.append(f"{prefix}_retries_total {self.retries}")
+            metric("phase_seconds", "histogram", "Time jobs spent in each phase")
+            for name in PHASES:
+                histogram("phase_seconds", self.phases[name], f'phase="{name}",')
+            metric("download_speed_bytes", "histogram", "Average download speed of finished jobs")
+            histogram("download_speed_bytes", self.speed)
+            metric("download_size_bytes", "histogram", "Size of finished downloads")
+            histogram("download_size_bytes", self.size)
+        for name, value in sorted((gauges or {}).items()):
+            metric(name, "gauge", name.replace('_', ' ').capitalize())
+            lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+def serve_metrics(registry, port, host="127.0.0.1", gauges=None):
+    """Serve registry.to_prometheus() at http://host:port/metrics on a daemon thread.
+
+    gauges is an optional callable returning {name: value}, evaluated on
+    every scrape. Returns the server (call shutdown() to stop it).
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = registry.to_prometheus(gauges() if gauges else None).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes would drown out the download output
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+_metrics_registry = None
+_metrics_registry_lock = threading.Lock()
+
+def get_metrics_registry():
+    """Get the shared registry backed by stats.json, creating it on first use"""
+    global _metrics_registry
+    with _metrics_registry_lock:
+        if _metrics_registry is None:
+            _metrics_registry = MetricsRegistry(os.path.join(get_app_data_dir(), "stats.json"))
+        return _metrics_registry
@@ -0,0 +1,385 @@
+"""ffmpeg post-processing (merge, audio conversion, thumbnails, loudness) on a process pool"""
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import urllib.request
+from typing import NamedTuple, Optional, Tuple
+
+from .formats import CONTAINER_CODECS, parse_formats
+from .sections import cut_path
+from .tools import discover_tools
+
+def split_template(template="%(title)s.%(ext)s"):
+    """Output template for streams that are merged afterwards, in yt-dlp's own naming ("Title.f137.mp4")"""
+    root = template[:-len(".%(ext)s")] if template.endswith(".%(ext)s") else template
+    return root + ".f%(format_id)s.%(ext)s"
+
+SPLIT_TEMPLATE = split_template()
+_SPLIT_SUFFIX = re.compile(r'\.f[\w-]+\.\w+$')
+_PLAIN_SPEC = re.compile(r'^[\w-]+\+[\w-]+$')
+
+# Audio encoder per output extension, used only when a stream has to be re-encoded
+AUDIO_ENCODERS = {
+    'mp4': ['-c:a', 'aac', '-b:a', '192k'], 'm4a': ['-c:a', 'aac', '-b:a', '192k'],
+    'mkv': ['-c:a', 'aac', '-b:a', '192k'], 'webm': ['-c:a', 'libopus', '-b:a', '160k'],
+    'opus': ['-c:a', 'libopus', '-b:a', '160k'], 'mp3': ['-c:a', 'libmp3lame', '-q:a', '2'],
+}
+# Audio codec family each extension can hold without re-encoding
+AUDIO_COPY = {'m4a': {'aac'}, 'mp3': {'mp3'}, 'opus': {'opus'}}
+LOUDNORM_FILTER = "loudnorm=I=-16:TP=-1.5:LRA=11"
+
+class PostProcessTask(NamedTuple):
+    """One ffmpeg run; plain data so it can be sent to a worker process"""
+    ffmpeg: str
+    inputs: Tuple[str, ...]  # Video stream first when merging
+    output: str
+    has_video: bool
+    copy_audio: bool = True  # False re-encodes the audio for the output extension
+    thumbnail_url: Optional[str] = None
+    loudnorm: bool = False
+
+class CutTask(NamedTuple):
+    """Smart cut of the clips a section download wrote (see smart_cut)"""
+    ffmpeg: str
+    inputs: Tuple[str, ...]  # Clips saved with their original timestamps, in range order
+    starts: Tuple[float, ...]  # Requested start of each clip, in seconds into the video
+    outputs: Tuple[str, ...]
+
+    @property
+    def output(self):
+        return self.outputs[-1]  # The last clip, reported as the job's file
+
+# Video encoder per codec family for the re-encoded head of a smart cut. Others are left keyframe-cut:
+# HEVC would need its parameter sets repeated in-band before the copied part could follow a new encode.
+CUT_ENCODERS = {
+    'h264': ['-c:v', 'libx264', '-preset', 'fast', '-crf', '16'],
+    'vp9': ['-c:v', 'libvpx-vp9', '-crf', '20', '-b:v', '0', '-row-mt', '1'],
+    'vp8': ['-c:v', 'libvpx', '-crf', '8', '-b:v', '8M'],
+    'av1': ['-c:v', 'libaom-av1', '-crf', '24', '-cpu-used', '6', '-row-mt', '1'],
+}
+_VIDEO_CODEC = re.compile(r'Stream #0:\d+[^:]*: Video: (\w+)')
+_AUDIO_STREAM = re.compile(r'Stream #0:\d+[^:]*: Audio:')
+_TIME_BASE = re.compile(r'config in time_base: (\d+)/(\d+)')
+_FRAME = re.compile(r'\bpts:\s*(-?\d+)\b.*?duration:\s*(\d+).*?iskey:(\d)')
+
+def split_format_spec(spec):
+    """The two format IDs of an exact 'video+audio' spec such as '137+140', or None"""
+    if spec and _PLAIN_SPEC.match(spec):
+        return tuple(spec.split('+'))
+    return None
+
+def merge_container(video_info, format_ids):
+    """First container both streams can be copied into ('mp4', 'webm'), else 'mkv'"""
+    formats = {fmt.format_id: fmt for fmt in parse_formats(video_info)}
+    chosen = [formats[format_id] for format_id in format_ids if format_id in formats]
+    for container in CONTAINER_CODECS:
+        if len(chosen) == len(format_ids) and all(fmt.fits(container) for fmt in chosen):
+            return container
+    return 'mkv'
+
+def build_command(task, thumbnail_path=None):
+    """ffmpeg arguments for a task, writing to a temporary file next to the output"""
+    command = [task.ffmpeg, '-hide_banner', '-loglevel', 'error', '-y']
+    for path in task.inputs:
+        command += ['-i', path]
+    if thumbnail_path:
+        command += ['-i', thumbnail_path]
+
+    ext = os.path.splitext(task.output)[1].lstrip('.').lower()
+    if len(task.inputs) > 1:
+        command += ['-map', '0:v:0', '-map', '1:a:0']
+    elif task.has_video:
+        command += ['-map', '0']
+    else:
+        command += ['-map', '0:a']
+    command += ['-dn', '-c', 'copy']
+    if thumbnail_path:
+        # The cover goes after the existing video stream, if any (same as yt-dlp's EmbedThumbnail)
+        cover = 1 if task.has_video else 0
+        command += ['-map', str(len(task.inputs)), f'-c:v:{cover}', 'mjpeg',
+                    f'-disposition:v:{cover}', 'attached_pic']
+    if task.loudnorm:
+        command += ['-af', LOUDNORM_FILTER]
+    if task.loudnorm or not task.copy_audio:
+        command += AUDIO_ENCODERS.get(ext, AUDIO_ENCODERS['mkv'])
+    if ext in ('mp4', 'm4a'):
+        command += ['-f', 'mp4', '-movflags', '+faststart']
+    elif ext == 'mp3':
+        command += ['-id3v2_version', '3']
+    return command + [temp_output_path(task.output)]
+
+def temp_output_path(output):
+    root, ext = os.path.splitext(output)
+    return f"{root}.pp{ext}"
+
+def _startupinfo():
+    startupinfo = None
+    if os.name == 'nt':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        startupinfo.wShowWindow = subprocess.SW_HIDE
+    return startupinfo
+
+def _ffmpeg(ffmpeg, cwd, *args):
+    # Returns ffmpeg's log; raises ValueError with its last line if it fails
+    result = subprocess.run([ffmpeg, '-hide_banner', '-nostdin', '-y', *args], capture_output=True, text=True,
+                            cwd=cwd, startupinfo=_startupinfo())
+    if result.returncode != 0:
+        raise ValueError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "ffmpeg failed")
+    return result.stderr
+
+def smart_cut(ffmpeg, source, start, output):
+    """Cut a clip so it starts exactly at `start`, writing output and removing source.
+
+    The source is a stream-copied clip that yt-dlp saved with the video's
+    own timestamps (ffmpeg -copyts), so it begins at the keyframe before
+    `start` and says where that lies. The frames from `start` up to the next
+    keyframe are re-encoded, the rest of the video and the audio are copied
+    untouched, so only a fraction of one GOP is encoded. If that fails the
+    clip is remuxed as it is and keeps its keyframe cut. Returns a message,
+    '' if the cut went to plan. Raises OSError if ffmpeg cannot be run.
+    """
+    source = os.path.abspath(source)
+    ext = os.path.splitext(output)[1]
+    # Parts get fixed names in a folder of their own: ffmpeg reads % in a file name as a pattern
+    work = tempfile.mkdtemp(prefix=".vd-cut-", dir=os.path.dirname(os.path.abspath(output)))
+    message = ""
+    try:
+        try:
+            _cut_parts(ffmpeg, source, start, work, ext)
+        except ValueError as e:
+            message = f"Kept the keyframe cut of {os.path.basename(output)}: {e}\n"
+            try:  # Without -copyts the timestamps start at 0 again
+                _ffmpeg(ffmpeg, work, '-loglevel', 'error', '-i', source, '-map', '0', '-c', 'copy', 'cut' + ext)
+            except ValueError:
+                os.replace(source, output)
+                return message
+        os.replace(os.path.join(work, 'cut' + ext), output)
+        _remove(source)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return message
+
+def _cut_parts(ffmpeg, source, start, work, ext):
+    # Writes work/cut<ext>; raises ValueError if the clip cannot be cut
+    # The first frame at or after the start, and the first keyframe from there on where copying can begin.
+    # (select rather than -skip_frame nokey, which some decoders ignore)
+    info = _ffmpeg(ffmpeg, work, '-loglevel', 'info', '-copyts', '-i', source, '-map', '0:v:0', '-vf',
+                   f"select='gte(t\\,{start - 0.0005:.6f})*(eq(selected_n\\,0)+eq(key\\,1))',showinfo",
+                   '-frames:v', '2', '-f', 'null', '-')
+    codec, time_base = _VIDEO_CODEC.search(info), _TIME_BASE.search(info)
+    frames = [tuple(map(int, frame.groups())) for frame in _FRAME.finditer(info)]
+    if not codec or not time_base or not frames:
+        raise ValueError("no video after the range start")
+    tb = int(time_base.group(1)) / int(time_base.group(2))
+    first_pts, duration, first_is_key = frames[0]
+    first = first_pts * tb
+    half = duration * tb / 2  # Cut points sit half a frame early so rounding never moves them past a frame
+    keyframe = first if first_is_key else frames[1][0] * tb if len(frames) > 1 else None
+
+    parts = []
+    if keyframe != first:
+        if codec.group(1) not in CUT_ENCODERS:
+            raise ValueError(f"{codec.group(1)} is not re-encoded")
+        trim = f"trim=start={first - half:.6f}" + (f":end={keyframe - half:.6f}" if keyframe is not None else "")
+        _ffmpeg(ffmpeg, work, '-loglevel', 'error', '-copyts', '-i', source, '-map', '0:v:0',
+                '-vf', trim + ",setpts=PTS-STARTPTS", *CUT_ENCODERS[codec.group(1)], 'head.mkv')
+        parts.append("file 'head.mkv'")
+        if keyframe is not None:
+            # The head's container duration leaves out its last frame, which would collide with the next one
+            parts.append(f"duration {keyframe - first:.6f}")
+    if keyframe is not None:
+        _ffmpeg(ffmpeg, work, '-loglevel', 'error', '-copyts', '-i', source, '-map', '0:v:0', '-c', 'copy',
+                '-bsf:v', f"noise=drop='lt(pts*tb\\,{keyframe - half:.6f})'", 'rest.mkv')
+        parts.append("file 'rest.mkv'")
+    with open(os.path.join(work, 'parts.txt'), "w", encoding="utf-8") as f:
+        f.write("\n".join(parts) + "\n")
+
+    command = ['-loglevel', 'error', '-f', 'concat', '-i', 'parts.txt']
+    if _AUDIO_STREAM.search(info):
+        _ffmpeg(ffmpeg, work, '-loglevel', 'error', '-copyts', '-i', source, '-map', '0:a:0', '-c', 'copy',
+                '-bsf:a', f"noise=drop='lt(pts*tb\\,{first - half:.6f})'", 'audio.mka')
+        command += ['-i', 'audio.mka', '-map', '0:v:0', '-map', '1:a:0']
+    # The concat demuxer repeats each part's parameter sets in-band, so the new head can precede copied frames
+    command += ['-c', 'copy']
+    if ext.lower() in ('.mp4', '.m4v', '.mov'):
+        command += ['-movflags', '+faststart']
+    _ffmpeg(ffmpeg, work, *command, 'cut' + ext)
+
+def run_cut(task):
+    """Smart-cut every clip of a CutTask. Returns (ok, output path, message) like run_task.
+
+    A clip that cannot be cut keeps its keyframe cut, so this only fails
+    if ffmpeg cannot be started at all.
+    """
+    messages = []
+    for source, start, output in zip(task.inputs, task.starts, task.outputs):
+        try:
+            messages.append(smart_cut(task.ffmpeg, source, start, output))
+        except OSError as e:
+            return False, None, f"Could not run ffmpeg: {e}\n"
+    return True, task.output, "".join(messages)
+
+def plan_cut(ffmpeg, files, sections):
+    """CutTask for the clips of a smart-mode section download (one per section, in order)"""
+    if len(files) != len(sections):
+        starts = (0.0,) * len(files)  # Cannot tell which clip is which; from 0 the cut only remuxes
+    else:
+        starts = tuple(section.start for section in sections)
+    return CutTask(ffmpeg, tuple(files), starts, tuple(cut_path(path) for path in files))
+
+def run_task(task):
+    """Run one task with ffmpeg. Executed in a worker process.
+
+    Returns (ok, output path, message). The inputs are deleted once the
+    output is in place.
+    """
+    if isinstance(task, CutTask):
+        return run_cut(task)
+    thumbnail_path = None
+    message = ""
+    if task.thumbnail_url:
+        thumbnail_path = os.path.splitext(task.output)[0] + ".thumb"
+        try:
+            with urllib.request.urlopen(task.thumbnail_url, timeout=30) as response, open(thumbnail_path, "wb") as f:
+                f.write(response.read())
+        except (OSError, ValueError) as e:
+            message = f"Could not download the thumbnail: {e}\n"
+            thumbnail_path = None
+
+    temp_path = temp_output_path(task.output)
+    try:
+        result = subprocess.run(build_command(task, thumbnail_path), capture_output=True, text=True,
+                                startupinfo=_startupinfo())
+    except OSError as e:
+        return False, None, message + f"Could not run ffmpeg: {e}\n"
+    finally:
+        if thumbnail_path:
+            _remove(thumbnail_path)
+
+    if result.returncode != 0 or not os.path.exists(temp_path):
+        _remove(temp_path)
+        return False, None, message + (result.stderr or "ffmpeg failed\n")
+    os.replace(temp_path, task.output)
+    for path in task.inputs:
+        if os.path.abspath(path) != os.path.abspath(task.output):
+            _remove(path)
+    return True, task.output, message
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class PostProcessor:
+    """Plans ffmpeg work for finished downloads and runs it on a bounded process pool.
+
+    Downloads of an exact 'video+audio' pair fetch the two streams
+    separately, so the download slot is free again as soon as the bytes are
+    in and the merge runs here instead of inside yt-dlp. Streams are copied
+    unless audio conversion or loudness normalization needs a re-encode.
+    """
+
+    def __init__(self, max_workers=None, audio_format='', embed_thumbnail=False, normalize_loudness=False,
+                 ffmpeg=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.audio_format = audio_format  # '' keeps what was downloaded, else 'mp3', 'm4a' or 'opus'
+        self.embed_thumbnail = embed_thumbnail
+        self.normalize_loudness = normalize_loudness
+        self._ffmpeg = ffmpeg
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """A PostProcessor as configured, or None if post-processing should stay inside yt-dlp"""
+        if not settings['postprocess_in_pool']:
+            return None
+        return cls(settings['postprocess_workers'] or None, settings['audio_format'],
+                   settings['embed_thumbnail'], settings['normalize_loudness'])
+
+    @property
+    def ffmpeg(self):
+        # Looked up on first use so creating the scheduler stays cheap at startup
+        if self._ffmpeg is None:
+            self._ffmpeg = discover_tools()['ffmpeg'] or ''
+        return self._ffmpeg
+
+    def split_download(self, download_type, format_spec, template=None):
+        """(format spec, output template) for downloading the streams of a pair separately, or None"""
+        if download_type != 'v' or not self.ffmpeg:
+            return None
+        format_ids = split_format_spec(format_spec)
+        if not format_ids:
+            return None
+        return ",".join(format_ids), split_template(template) if template else SPLIT_TEMPLATE
+
+    def plan(self, video_info, download_type, files, format_spec=None):
+        """The PostProcessTask for the downloaded files, or None if they are already final"""
+        if not self.ffmpeg or not files:
+            return None
+        thumbnail_url = video_info.get('thumbnail') if self.embed_thumbnail else None
+        format_ids = split_format_spec(format_spec) if len(files) > 1 else None
+
+        if format_ids:
+            base = _SPLIT_SUFFIX.sub('', files[0])
+            ext = merge_container(video_info, format_ids)
+            # Pair up by the format ID in the file name, video first
+            ordered = sorted(files, key=lambda path: f".f{format_ids[1]}." in os.path.basename(path))
+            return PostProcessTask(self.ffmpeg, tuple(ordered), f"{base}.{ext}", True,
+                                   thumbnail_url=thumbnail_url if ext == 'mp4' else None,
+                                   loudnorm=self.normalize_loudness)
+
+        source = files[-1]
+        root, source_ext = os.path.splitext(source)
+        source_ext = source_ext.lstrip('.').lower()
+        if download_type == 'a':
+            ext = self.audio_format or source_ext
+            copy_audio = ext == source_ext or self._audio_codec(video_info, source) in AUDIO_COPY.get(ext, ())
+            if ext not in ('m4a', 'mp3'):
+                thumbnail_url = None  # ffmpeg only writes covers into MP4 and MP3 here
+            if ext == source_ext and copy_audio and not thumbnail_url and not self.normalize_loudness:
+                return None
+            return PostProcessTask(self.ffmpeg, (source,), f"{root}.{ext}", False, copy_audio,
+                                   thumbnail_url, self.normalize_loudness)
+
+        if source_ext != 'mp4':
+            thumbnail_url = None
+        if not thumbnail_url and not self.normalize_loudness:
+            return None
+        return PostProcessTask(self.ffmpeg, (source,), source, True, thumbnail_url=thumbnail_url,
+                               loudnorm=self.normalize_loudness)
+
+    def plan_cut(self, files, sections):
+        """The CutTask that smart-cuts the clips of a section download, or None without ffmpeg"""
+        if not self.ffmpeg or not files:
+            return None
+        return plan_cut(self.ffmpeg, files, sections)
+
+    def submit(self, task):
+        """Queue a task (PostProcessTask or CutTask) on the pool; returns a Future of run_task's result"""
+        with self._lock:
+            if self._pool is None:
+                from concurrent.futures import ProcessPoolExecutor  # Pulls in multiprocessing, so not at startup
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool.submit(run_task, task)
+
+    def shutdown(self):
+        """Drop tasks that have not started; running ffmpeg processes finish on their own"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    @staticmethod
+    def _audio_codec(video_info, path):
+        # Codec family of the downloaded audio format, from the "requested" format in the info dict
+        ext = os.path.splitext(path)[1].lstrip('.')
+        for fmt in parse_formats(video_info):
+            if fmt.has_audio and not fmt.has_video and fmt.ext == ext:
+                return fmt.acodec
+        return None
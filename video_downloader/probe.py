@@ -0,0 +1,166 @@
+"""Fetching video information"""
+import json
+import re
+import subprocess
+import threading
+from queue import Queue
+from typing import List, Tuple
+
+from .backends import get_backend
+from .cache import get_metadata_cache
+from .formats import extract_formats, extract_metadata
+from .urls import classify_url
+
+def is_collection_url(url):
+    """True for playlist and channel URLs (a watch URL with &list= is still a single video)"""
+    try:
+        return classify_url(url).kind != 'video'
+    except ValueError:
+        return False
+
+# Cache key -> Event set when the probe running for it finishes
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def fetch_video_info(video_url, cache=None, process_callback=None):
+    """Returns the yt-dlp info dict for a URL, using the metadata cache when possible.
+
+    Equivalent links (youtu.be, shorts, &t=) share one cache entry. A URL
+    that is already being probed (e.g. by the Prefetcher) is not probed
+    twice: the call waits for that probe and reads its result from the
+    cache. process_callback is passed on to the backend's probe().
+    Raises ValueError with a user-facing message if the URL is malformed or
+    yt-dlp fails.
+    """
+    cache = cache or get_metadata_cache()
+    key = classify_url(video_url).key  # Rejects malformed URLs before anything is started
+    video_info = cache.get(key)
+    if video_info is not None:
+        return video_info
+
+    with _inflight_lock:
+        pending = _inflight.get(key)
+        if pending is None:
+            _inflight[key] = done = threading.Event()
+    if pending is not None:
+        pending.wait()
+        video_info = cache.get(key)
+        if video_info is not None:
+            return video_info
+        return fetch_video_info(video_url, cache, process_callback)  # That probe failed or was cancelled
+
+    try:
+        video_info = get_backend().probe(video_url, process_callback)
+        cache.put(key, video_info)
+        return video_info
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        done.set()
+
+def url_error(video_url):
+    """Why a URL cannot be probed as a single video, or None if it looks fine. Never starts yt-dlp."""
+    try:
+        url_info = classify_url(video_url)
+    except ValueError as e:
+        return str(e)
+    if url_info.kind != 'video':
+        return "This is a playlist or channel URL. Use Batch to download it"
+    return None
+
+class Prefetcher:
+    """Probes the URL being typed in the background so Check and Download find it in the cache.
+
+    Only the latest URL is probed: requesting another one terminates the
+    yt-dlp process still probing the previous URL. Every probe runs on one
+    long-lived worker thread, so the library backend's per-thread YoutubeDL
+    stays warm from one URL to the next.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._url = None  # URL of the current probe
+        self._next = None  # URL the worker has not picked up yet
+        self._process = None
+        self._worker = None  # Started by the first request
+
+    def request(self, video_url):
+        """Start probing video_url, cancelling any other probe. Returns False if nothing was started."""
+        video_url = video_url.strip()
+        with self._lock:
+            if video_url == self._url:
+                return False  # Already probing (or probed) this one
+            self._cancel()
+            if not re.match(r'(https?://)?[\w-]+(\.[\w-]+)+(:\d+)?/\S', video_url) or url_error(video_url):
+                return False  # Half-typed or invalid, Check reports why
+            self._url = self._next = video_url
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, name="prefetch", daemon=True)
+                self._worker.start()
+            self._wake.notify()
+        return True
+
+    def cancel(self):
+        """Stop the current probe, if any"""
+        with self._lock:
+            self._cancel()
+
+    def _cancel(self):
+        if self._process is not None:
+            try:
+                self._process.terminate()
+            except OSError:
+                pass  # Already exited
+        self._url = self._next = None
+        self._process = None
+
+    def _work(self):
+        while True:
+            with self._lock:
+                while self._next is None:
+                    self._wake.wait()
+                video_url, self._next = self._next, None
+            self._run(video_url)  # URLs requested meanwhile are skipped, only the latest is kept
+
+    def _run(self, video_url):
+        def on_process(process):
+            with self._lock:
+                if self._url == video_url:
+                    self._process = process
+                    return
+            process.terminate()  # Superseded while yt-dlp was starting
+
+        try:
+            fetch_video_info(video_url, self.cache, on_process)
+        except Exception:
+            pass  # Check probes again and shows the error
+        finally:
+            with self._lock:
+                if self._url == video_url:
+                    self._process = None
+
+def get_available_formats(video_url, result_queue: Queue, format_type='v', cache=None) -> List[Tuple[str, str]]:
+    """Gets available formats and returns list of (quality, format_id) tuples"""
+    try:
+        # Basic YouTube URL validation
+        error = url_error(video_url)
+        if error:
+            result_queue.put(('error', error))
+            return
+        
+        video_info = fetch_video_info(video_url, cache)
+        formats = extract_formats(video_info, format_type)
+        metadata = extract_metadata(video_info)
+        result_queue.put(('success', (formats, metadata)))  # Now sending both formats and metadata
+    
+    except json.JSONDecodeError:
+        result_queue.put(('error', "Failed to parse video information"))
+    except ValueError as e:
+        result_queue.put(('error', str(e)))
+    except subprocess.CalledProcessError as e:
+        error_msg = e.stderr if e.stderr else "Failed to fetch video information"
+        result_queue.put(('error', error_msg))
+    except Exception as e:
+        result_queue.put(('error', f"An unexpected error occurred: {str(e)}"))
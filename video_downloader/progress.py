@@ -0,0 +1,56 @@
+"""Structured progress events shared by every backend"""
+import time
+from typing import NamedTuple, Optional
+
+# Makes the yt-dlp executable print one JSON progress record per line
+PROGRESS_PREFIX = "[progress] "
+PROGRESS_TEMPLATE = (
+    "download:" + PROGRESS_PREFIX +
+    "%(progress.{status,downloaded_bytes,total_bytes,total_bytes_estimate,speed,eta,fragment_index,fragment_count})j"
+)
+# Same for post-processors (merging, fixups, moving the file into place)
+POSTPROCESS_PREFIX = "[postprocess] "
+POSTPROCESS_TEMPLATE = "postprocess:" + POSTPROCESS_PREFIX + "%(progress.{status,postprocessor})j"
+
+class ProgressEvent(NamedTuple):
+    """Structured download progress reported by a backend"""
+    status: str  # 'downloading' or 'finished'
+    percent: float
+    downloaded_bytes: Optional[int] = None
+    total_bytes: Optional[int] = None
+    speed: Optional[float] = None  # bytes per second
+    eta: Optional[int] = None  # seconds
+    fragment_index: Optional[int] = None
+    fragment_count: Optional[int] = None
+
+def progress_event_from_dict(d):
+    """Build a ProgressEvent from a yt-dlp progress dict (hook argument or template JSON)"""
+    status = d.get('status') or 'downloading'
+    downloaded = d.get('downloaded_bytes')
+    total = d.get('total_bytes') or d.get('total_bytes_estimate')
+    if status == 'finished':
+        percent = 100.0
+    else:
+        percent = min(downloaded / total * 100, 100.0) if downloaded and total else 0.0
+    return ProgressEvent(
+        status, percent, downloaded, total, d.get('speed'), d.get('eta'),
+        d.get('fragment_index'), d.get('fragment_count')
+    )
+
+class ProgressThrottle:
+    """Coalesces progress events so at most `rate` per second get through.
+
+    'finished' events always pass so the final state is never dropped.
+    """
+
+    def __init__(self, rate=10):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self._last = 0.0
+
+    def ready(self, event):
+        """True if this event should be delivered"""
+        now = time.monotonic()
+        if event.status == 'finished' or now - self._last >= self.interval:
+            self._last = now
+            return True
+        return False
@@ -0,0 +1,112 @@
+"""Retrying failed jobs with backoff, and holding back sites that throttle"""
+import random
+import threading
+import time
+from collections import deque
+
+class RetryPolicy:
+    """How often a retryable failure (network, HTTP 429) is tried again, and how long to wait first"""
+
+    def __init__(self, max_retries=3, base_delay=5.0, max_delay=300.0):
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = base_delay  # seconds
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_settings(cls, settings):
+        """A RetryPolicy as configured, or None if retries are turned off"""
+        if settings['retry_attempts'] <= 0:
+            return None
+        return cls(settings['retry_attempts'], settings['retry_base_delay'], settings['retry_max_delay'])
+
+    def should_retry(self, error, retries):
+        """True if a job that already had `retries` retries should be tried again after `error`"""
+        return getattr(error, 'retryable', False) and retries < self.max_retries
+
+    def delay(self, retry):
+        """Seconds to wait before retry number `retry` (1-based)"""
+        # Exponential, with half of it random so the jobs of a throttled batch do not all come back at once
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (retry - 1))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+class CircuitBreaker:
+    """Holds a site's jobs after repeated HTTP 429s.
+
+    `threshold` throttled failures within `window` seconds open the breaker
+    for `cooldown` seconds. After that a single job goes through as a trial:
+    if it is not throttled the breaker closes, otherwise it reopens for
+    twice as long (up to `max_cooldown`).
+    """
+
+    def __init__(self, threshold=3, window=60.0, cooldown=120.0, max_cooldown=1800.0, clock=time.monotonic):
+        self.threshold = max(1, int(threshold))
+        self.window = window
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = {}  # site -> deque of failure times
+        self._open = {}  # site -> (held until, cooldown that was applied)
+        self._trials = set()  # Sites with a trial job running
+
+    @classmethod
+    def from_settings(cls, settings):
+        """A CircuitBreaker as configured, or None if it is turned off"""
+        if settings['throttle_threshold'] <= 0:
+            return None
+        return cls(settings['throttle_threshold'], cooldown=settings['throttle_cooldown'])
+
+    def allow(self, site):
+        """True if a job for site may start now. Once the cooldown is over, the first caller runs the trial."""
+        with self._lock:
+            state = self._open.get(site)
+            if state is None:
+                return True
+            if self.clock() < state[0] or site in self._trials:
+                return False
+            self._trials.add(site)
+            return True
+
+    def is_open(self, site):
+        with self._lock:
+            return site in self._open
+
+    def next_change(self):
+        """Seconds until the next held site may run its trial, or None if none is waiting"""
+        now = self.clock()
+        with self._lock:
+            waits = [until - now for site, (until, _) in self._open.items()
+                     if until > now and site not in self._trials]
+        return min(waits) if waits else None
+
+    def record(self, site, throttled):
+        """Report how a job for site ended. Returns the cooldown in seconds if this opened the breaker."""
+        with self._lock:
+            now = self.clock()
+            trial = site in self._trials
+            self._trials.discard(site)
+            if not throttled:
+                if trial:
+                    self._open.pop(site, None)
+                    self._failures.pop(site, None)
+                return None
+            if site in self._open:
+                if not trial:
+                    return None  # Started before the breaker opened
+                cooldown = min(self._open[site][1] * 2, self.max_cooldown)
+                self._open[site] = (now + cooldown, cooldown)
+                return cooldown
+            failures = self._failures.setdefault(site, deque())
+            failures.append(now)
+            while failures and failures[0] < now - self.window:
+                failures.popleft()
+            if len(failures) < self.threshold:
+                return None
+            failures.clear()
+            self._open[site] = (now + self.cooldown, self.cooldown)
+            return self.cooldown
+
+    def release(self, site):
+        """A trial job was cancelled or paused before it could tell anything"""
+        with self._lock:
+            self._trials.discard(site)
@@ -0,0 +1,183 @@
+"""When queued jobs may start and in what order: off-peak windows, a bandwidth budget that follows them, SJF"""
+import re
+import time
+from typing import NamedTuple
+
+# priority: higher priority first, then first come first served (the default)
+# sjf: higher priority first, then the smallest estimated download (unknown sizes after known ones)
+# fifo: first come first served, priorities ignored
+QUEUE_ORDERS = ('priority', 'sjf', 'fifo')
+
+DAY = 24 * 3600
+_CLOCK_TIME = re.compile(r'^(\d{1,2}):(\d{2})$')
+
+class TimeWindow(NamedTuple):
+    """A daily stretch of local time, in seconds after midnight; it wraps past midnight if end < start"""
+    start: int
+    end: int
+
+    def contains(self, second):
+        if self.start < self.end:
+            return self.start <= second < self.end
+        return second >= self.start or second < self.end  # start == end is the whole day
+
+    def __str__(self):
+        return f"{_format_clock(self.start)}-{_format_clock(self.end)}"
+
+def _parse_clock(text):
+    match = _CLOCK_TIME.match(text.strip())
+    if not match or int(match.group(1)) > 24 or int(match.group(2)) > 59:
+        raise ValueError(f"Not a time of day: {text!r} (use hh:mm, e.g. 22:00)")
+    return (int(match.group(1)) * 3600 + int(match.group(2)) * 60) % DAY
+
+def _format_clock(second):
+    return f"{second // 3600:02d}:{second % 3600 // 60:02d}"
+
+def parse_windows(text):
+    """TimeWindows from "22:00-07:00,12:00-13:30". Returns a tuple (empty for blank text); raises ValueError."""
+    windows = []
+    for part in (text or '').replace(' ', '').split(','):
+        if not part:
+            continue
+        start, sep, end = part.partition('-')
+        if not sep:
+            raise ValueError(f"Not a time window: {part!r} (use start-end, e.g. 22:00-07:00)")
+        windows.append(TimeWindow(_parse_clock(start), _parse_clock(end)))
+    return tuple(windows)
+
+class SimulatedClock:
+    """Stands in for time.time: time only moves when advance() is called.
+
+    start is seconds since the epoch or "hh:mm" (today, local time).
+    """
+
+    def __init__(self, start=0.0):
+        if isinstance(start, str):
+            midnight = time.mktime(time.localtime()[:3] + (0, 0, 0, 0, 0, -1))
+            start = midnight + _parse_clock(start)
+        self.now = float(start)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += max(0.0, seconds)
+
+class SchedulePolicy:
+    """When queued jobs may start, in what order, and the global bandwidth budget.
+
+    Jobs estimated at more than large_job_bytes only start inside one of
+    the off_peak windows, so daytime bulk pulls leave the line to everything
+    else; smaller jobs and jobs of unknown size start any time (the
+    scheduler checks again once the probe has sized them). Inside the
+    windows the global budget is off_peak_rate (bytes per second, None =
+    unlimited) instead of the scheduler's global_rate_limit; like that
+    limit, it applies to downloads as they start. order is one of
+    QUEUE_ORDERS. clock returns the current time like time.time()
+    (a SimulatedClock for tests and simulate()).
+    """
+
+    def __init__(self, off_peak=(), large_job_bytes=None, off_peak_rate=None, order='priority', clock=time.time):
+        if order not in QUEUE_ORDERS:
+            raise ValueError(f"Unknown queue order: {order} (use {', '.join(QUEUE_ORDERS)})")
+        self.off_peak = tuple(off_peak)
+        self.large_job_bytes = large_job_bytes or None
+        self.off_peak_rate = off_peak_rate or None
+        self.order = order
+        self.clock = clock
+
+    @classmethod
+    def from_settings(cls, settings, clock=time.time):
+        """The policy as configured, or None if it would change nothing (no off-peak hours, priority order).
+
+        Raises ValueError for malformed off_peak_hours or an unknown queue_order.
+        """
+        windows = parse_windows(settings['off_peak_hours'])
+        if not windows and settings['queue_order'] == 'priority':
+            return None
+        return cls(windows, int(settings['off_peak_min_size_mb'] * 1024 * 1024),
+                   int(settings['off_peak_rate_limit_kbps'] * 1024), settings['queue_order'], clock)
+
+    def is_off_peak(self):
+        second = _second_of_day(self.clock())
+        return any(window.contains(second) for window in self.off_peak)
+
+    def allows(self, job):
+        """True if job may start now (False only for a large job outside the off-peak windows)"""
+        if not self.off_peak or not self.large_job_bytes:
+            return True
+        size = job.estimated_size
+        return size is None or size <= self.large_job_bytes or self.is_off_peak()
+
+    def rate_limit(self, peak_rate):
+        """Global bytes-per-second budget right now; peak_rate (None = unlimited) outside the windows"""
+        if self.off_peak and self.is_off_peak():
+            return self.off_peak_rate
+        return peak_rate
+
+    def order_key(self, job):
+        """Heap key of a queued job: lower starts first (ties keep their queue order)"""
+        if self.order == 'fifo':
+            return ()
+        if self.order == 'sjf':
+            size = job.estimated_size
+            return (-job.priority, size is None, size or 0)
+        return (-job.priority,)
+
+    def next_change(self):
+        """Seconds until the next window opens or closes, or None without windows"""
+        if not self.off_peak:
+            return None
+        second = _second_of_day(self.clock())
+        return min((edge - second) % DAY or DAY for window in self.off_peak for edge in window)
+
+def _second_of_day(now):
+    local = time.localtime(now)
+    return local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec + now % 1
+
+class _SimulatedJob(NamedTuple):
+    estimated_size: int
+    priority: int
+
+def simulate(jobs, policy, bandwidth, workers=3, global_rate_limit=None):
+    """Replay a queue on the policy's clock (a SimulatedClock) without downloading anything.
+
+    jobs are (size in bytes, priority) pairs, all queued at the start, in
+    submission order. Running jobs share the link's bandwidth (bytes per
+    second), or the budget if that is lower, evenly; the budget is
+    global_rate_limit, or off_peak_rate inside the windows. Returns each
+    job's completion time in seconds after the start, in the order given
+    (inf for a job that can never start).
+    """
+    entries = [_SimulatedJob(size, priority) for size, priority in jobs]
+    clock = policy.clock
+    started = clock()
+    pending = sorted(range(len(entries)), key=lambda i: (policy.order_key(entries[i]), i))
+    running = {}  # Index -> bytes left
+    finished = [float('inf')] * len(entries)
+    while pending or running:
+        for i in list(pending):
+            if len(running) >= workers:
+                break
+            if policy.allows(entries[i]):
+                pending.remove(i)
+                running[i] = entries[i].estimated_size
+        change = policy.next_change()
+        if not running:
+            if change is None:
+                break  # The rest is too large and there is no window to wait for
+            clock.advance(change)
+            continue
+        share = min(bandwidth, policy.rate_limit(global_rate_limit) or bandwidth) / len(running)
+        step = min(left for left in running.values()) / share
+        if change is not None:
+            step = min(step, change)
+        clock.advance(step)
+        for i, left in list(running.items()):
+            left -= share * step
+            if left <= 1e-6 * entries[i].estimated_size:
+                finished[i] = clock() - started
+                del running[i]
+            else:
+                running[i] = left
+    return finished
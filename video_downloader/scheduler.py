@@ -0,0 +1,658 @@
+"""Download job queue drained by a bounded pool of worker threads"""
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+from concurrent.futures import CancelledError
+from queue import Queue
+
+from .archive import format_key, reuse_existing_download
+from .backends import TransferOptions
+from .cache import get_metadata_cache
+from .download import download_video
+from .errors import PostProcessError, ThrottledError
+from .formats import estimate_size, parse_formats, select_formats
+from .metrics import JobMetrics
+from .postprocess import CutTask
+from .probe import fetch_video_info
+from .progress import ProgressThrottle
+from .urls import classify_url
+
+_OFF_PEAK = 'off-peak'  # _held key of jobs waiting for the schedule (sites are extractors or dotted hosts)
+
+class DownloadJob:
+    """A single queued download and its current state"""
+    _ids = itertools.count(1)
+
+    def __init__(self, url, download_type, download_path, resolution_id=None, priority=0, transfer=None,
+                 policy=None, sections=(), precision='keyframe'):
+        self.id = next(DownloadJob._ids)
+        self.url = url
+        try:
+            url_info = classify_url(url)
+        except ValueError:
+            url_info = None  # Fails with the reason once it runs
+        self.key = url_info.key if url_info else url.strip()  # Same for every form of the same video's URL
+        self.site = url_info.site if url_info else None  # Extractor (or host) the circuit breaker tracks
+        self.download_type = download_type
+        self.download_path = download_path
+        self.resolution_id = resolution_id
+        self.policy = policy  # FormatPolicy used when no resolution_id is given
+        self.estimated_size = None  # Bytes, from the metadata cache or the probe (None = unknown)
+        self.transfer = transfer  # TransferOptions or None
+        self.sections = tuple(sections)  # Time ranges to fetch (Section tuples), () = the whole video
+        self.precision = precision  # How clips are cut, one of CLIP_PRECISIONS
+        self.priority = priority  # Higher runs first
+        self.status = 'queued'  # queued, running, processing, paused, done, failed, cancelled
+        self.progress = 0.0
+        self.last_progress = None  # Latest ProgressEvent
+        self.process = None
+        self.postprocess = None  # Future of the post-processing stage
+        self.filepath = None  # Final file, once done
+        self.journal_id = None  # Row in the JobJournal, if journaled
+        self.metrics = JobMetrics()
+        self.error = None  # DownloadError of the last failed attempt
+        self.retries = 0
+        self.retry_timer = None  # Pending backoff before the next attempt
+        self._stop_reason = None  # 'cancel', 'pause' or 'shutdown' while running
+
+class DownloadScheduler:
+    """Runs download jobs from a priority queue on a bounded pool of worker threads.
+
+    Workers never touch Tk. Every state change is pushed onto `events` as a
+    (kind, job, payload) tuple where kind is 'status', 'progress' or 'output';
+    the GUI drains it from a root.after() poll. With a JobJournal, every
+    status change is also written to disk before it is announced. With a
+    MetricsRegistry, every job that ends is added to its totals.
+
+    With a PostProcessor, ffmpeg work runs after the worker has let go of
+    the job ('processing'), so the download slot goes to the next job while
+    the merge or conversion runs on the process pool.
+
+    With a RetryPolicy, jobs that fail for a transient reason (network,
+    HTTP 429) go back to 'queued' after a backoff. With a CircuitBreaker,
+    a site that keeps answering 429 has its jobs held until it recovers
+    while other sites' jobs keep running.
+
+    With a ContentStore, yt-dlp writes into a staging folder per job and the
+    finished file is moved into the store and linked into the job's folder.
+
+    Jobs with sections download only those time ranges, one file per range;
+    with a PostProcessor their smart cuts run on its pool.
+
+    With a SchedulePolicy, the queue is ordered by it (e.g. smallest
+    estimated download first), jobs too large for the current hour wait for
+    its off-peak windows, and the global budget follows the windows. Sizes
+    come from the metadata cache when the job is queued, or from the probe
+    once it starts; a job the probe finds too large goes back to the queue.
+    """
+
+    def __init__(self, max_workers=3, events=None, progress_rate=10, global_rate_limit=None, index=None,
+                 journal=None, metrics=None, postprocessor=None, retry=None, breaker=None, store=None,
+                 schedule=None):
+        self.max_workers = max(1, int(max_workers))
+        self.events = events if events is not None else Queue()
+        self.progress_rate = progress_rate  # Max progress events per second per job
+        self.global_rate_limit = global_rate_limit or None  # bytes per second across all jobs
+        self.index = index  # DownloadIndex used to skip finished media, or None
+        self.journal = journal  # JobJournal for crash recovery, or None
+        self.metrics = metrics  # MetricsRegistry, or None
+        self.postprocessor = postprocessor  # PostProcessor, or None to let yt-dlp post-process
+        self.retry = retry  # RetryPolicy, or None to fail on the first error
+        self.breaker = breaker  # CircuitBreaker, or None
+        self.store = store  # ContentStore, or None to save straight into the download folder
+        self.schedule = schedule  # SchedulePolicy, or None for priority order at any hour
+        self.jobs = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._held = {}  # _OFF_PEAK or a site -> heap entries that could not start, out of the heap until released
+        self._recheck = {}  # 'schedule' / 'breaker' -> time, on that policy's clock, when its held jobs may start
+        self._cond = threading.Condition()
+        self._running = 0
+        self._threads = []
+        self._shutdown = False
+
+    def submit(self, job):
+        """Queue a job and make sure enough workers are alive to run it.
+
+        A job submitted as 'paused' (e.g. restored from the journal) waits
+        for resume(). If the same video is already queued or running with
+        the same options, that job is returned instead.
+        """
+        if job.journal_id is None:
+            duplicate = self._find_duplicate(job)
+            if duplicate is not None:
+                self._emit('log', None, f"[{duplicate.id}] Already queued: {job.url}\n")
+                return duplicate
+        if self.journal and job.journal_id is None:
+            self.journal.add(job)
+        if self.schedule and job.estimated_size is None:
+            job.estimated_size = self._cached_estimate(job)
+        with self._cond:
+            self.jobs[job.id] = job
+            if job.status != 'paused':
+                job.status = 'queued'
+                self._push(job)
+                self._ensure_workers()
+                self._cond.notify()
+        self._emit('status', job, job.status)
+        if self.schedule and job.status == 'queued' and not self.schedule.allows(job):
+            self._announce_wait(job)
+        return job
+
+    def set_max_workers(self, count):
+        """Change how many jobs may run at once (takes effect as slots free up)"""
+        with self._cond:
+            self.max_workers = max(1, int(count))
+            self._ensure_workers()
+            self._cond.notify_all()
+
+    def cancel(self, job_id):
+        """Cancel a queued, paused or running job"""
+        self._stop(job_id, 'cancel')
+
+    def pause(self, job_id):
+        """Hold a queued job, or stop a running one so it can be resumed later"""
+        self._stop(job_id, 'pause')
+
+    def resume(self, job_id):
+        """Put a paused job back in the queue"""
+        with self._cond:
+            job = self.jobs.get(job_id)
+            if not job or job.status != 'paused':
+                return
+            job.status = 'queued'
+            self._push(job)
+            self._cond.notify()
+        self._emit('status', job, job.status)
+
+    def reprioritize(self, job_id, priority):
+        """Change the priority of a job that has not started yet"""
+        with self._cond:
+            job = self.jobs.get(job_id)
+            if not job:
+                return
+            job.priority = priority
+            if job.status == 'queued' and job.retry_timer is None:
+                self._remove(job)
+                self._push(job)
+        if self.journal:
+            self.journal.update(job)
+
+    def active_jobs(self):
+        """Jobs that are queued, running, processing or paused"""
+        with self._cond:
+            return [j for j in self.jobs.values() if j.status in ('queued', 'running', 'processing', 'paused')]
+
+    def has_running_jobs(self):
+        """True while a job is downloading or post-processing"""
+        with self._cond:
+            return any(j.status in ('running', 'processing') for j in self.jobs.values())
+
+    def _find_duplicate(self, job):
+        with self._cond:
+            for other in self.jobs.values():
+                if (other.key == job.key and other.status in ('queued', 'running', 'processing', 'paused')
+                        and (other.download_type, other.download_path, other.resolution_id, other.sections)
+                        == (job.download_type, job.download_path, job.resolution_id, job.sections)):
+                    return other
+        return None
+
+    def shutdown(self):
+        """Stop dispatching and terminate anything still running.
+
+        Running jobs go back to 'queued' (partial files are kept), so a
+        journal restores them on the next launch. So do jobs whose
+        post-processing had not started yet.
+        """
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+            running = [j for j in self.jobs.values() if j.status == 'running']
+            for job in self.jobs.values():
+                self._cancel_retry(job)
+        for job in running:
+            self._stop(job.id, 'shutdown')
+        if self.postprocessor:
+            self.postprocessor.shutdown()
+
+    def _push(self, job):
+        key = self.schedule.order_key(job) if self.schedule else (-job.priority,)
+        heapq.heappush(self._heap, (key, next(self._seq), job))
+
+    def _remove(self, job):
+        self._heap = [entry for entry in self._heap if entry[2] is not job]
+        heapq.heapify(self._heap)
+        for reason, entries in list(self._held.items()):
+            entries = [entry for entry in entries if entry[2] is not job]
+            if entries:
+                self._held[reason] = entries
+            else:
+                del self._held[reason]
+
+    def _stop(self, job_id, reason):
+        with self._cond:
+            job = self.jobs.get(job_id)
+            if not job or job.status in ('done', 'failed', 'cancelled'):
+                return
+            if job.status == 'processing':
+                # Only a merge that has not started can be dropped; a running one finishes
+                if reason == 'cancel':
+                    job._stop_reason = reason
+                    job.postprocess.cancel()
+                return
+            if job.status == 'running':
+                job._stop_reason = reason
+                process = job.process
+            else:
+                if job.status == 'queued':
+                    self._remove(job)
+                    self._cancel_retry(job)
+                if reason == 'pause' and job.status == 'paused':
+                    return
+                job.status = 'cancelled' if reason == 'cancel' else 'paused'
+                process = None
+        if process:
+            try:
+                process.terminate()
+            except OSError:
+                pass  # Already exited
+        else:
+            self._emit('status', job, job.status)
+
+    def _ensure_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _cancel_retry(self, job):
+        if job.retry_timer is not None:
+            job.retry_timer.cancel()
+            job.retry_timer = None
+
+    def _next_job(self):
+        # First job in queue order that the schedule lets start now and whose site the circuit breaker is not
+        # holding. Held jobs are set aside in _held until their window opens, their site's cooldown ends or a job
+        # of their site finishes, so dispatch only ever pops the heap.
+        if self._running >= self.max_workers:
+            return None
+        self._release_due()
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            reason = self._hold_reason(entry[2])
+            if reason is None:
+                return entry[2]
+            self._hold(reason, entry)
+        return None
+
+    def _hold_reason(self, job):
+        # The schedule first: allow() starts a trial for a held site
+        if self.schedule and not self.schedule.allows(job):
+            return _OFF_PEAK
+        if self.breaker is not None and not self.breaker.allow(job.site):
+            return job.site
+        return None
+
+    def _hold(self, reason, entry):
+        self._held.setdefault(reason, []).append(entry)
+        kind, policy = ('schedule', self.schedule) if reason == _OFF_PEAK else ('breaker', self.breaker)
+        wait = policy.next_change()
+        if wait is not None:
+            until = policy.clock() + wait
+            self._recheck[kind] = min(until, self._recheck.get(kind, until))
+
+    def _release_held(self, reason):
+        for entry in self._held.pop(reason, ()):
+            heapq.heappush(self._heap, entry)
+
+    def _release_due(self):
+        # Back into the heap once a window may have opened or a cooldown may have ended
+        for kind, policy in (('schedule', self.schedule), ('breaker', self.breaker)):
+            until = self._recheck.get(kind)
+            if until is None or policy.clock() < until:
+                continue
+            del self._recheck[kind]
+            for reason in [r for r in self._held if (r == _OFF_PEAK) == (kind == 'schedule')]:
+                self._release_held(reason)
+
+    def _next_wakeup(self):
+        # Seconds until held jobs are looked at again (None: only when a job finishes)
+        waits = [max(0.0, self._recheck[kind] - policy.clock())
+                 for kind, policy in (('schedule', self.schedule), ('breaker', self.breaker))
+                 if kind in self._recheck]
+        return min(waits) if waits else None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = None
+                while not self._shutdown:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    # Held jobs need a wake-up when their site's cooldown ends or their window opens
+                    self._cond.wait(self._next_wakeup())
+                if self._shutdown:
+                    if job is not None:
+                        self._push(job)
+                    return
+                job.status = 'running'
+                job._stop_reason = None
+                self._running += 1
+            self._emit('status', job, job.status)
+            try:
+                self._run(job)
+            finally:
+                self._report_site(job)
+                with self._cond:
+                    self._running -= 1
+                    job.process = None
+                    self._release_held(job.site)  # Its trial is over, or its cooldown has just begun
+                    self._cond.notify_all()
+
+    def _report_site(self, job):
+        # Feed the outcome to the circuit breaker (notify_all() afterwards wakes held workers)
+        if not self.breaker or not job.site:
+            return
+        if job.status in ('paused', 'cancelled') or (job.status == 'queued' and job.retry_timer is None):
+            self.breaker.release(job.site)  # Stopped, says nothing about the site
+            return
+        cooldown = self.breaker.record(job.site, isinstance(job.error, ThrottledError))
+        if cooldown:
+            self._emit('log', None, f"{job.site} is limiting requests (HTTP 429); holding its downloads for "
+                                    f"{cooldown:.0f}s\n")
+
+    def _run(self, job):
+        def attach(process):
+            with self._cond:
+                job.process = process
+                stop_requested = job._stop_reason is not None
+            if stop_requested:
+                process.terminate()
+
+        throttle = ProgressThrottle(self.progress_rate)
+
+        def progress(event):
+            job.progress = event.percent
+            job.last_progress = event
+            job.metrics.on_progress(event)
+            if throttle.ready(event):
+                self._emit('progress', job, event)
+
+        def output(text):
+            job.metrics.on_output(text)
+            self._emit('output', job, text)
+
+        fmt = format_key(job.download_type, job.resolution_id, job.sections)
+        existing = self._find_existing(job, fmt)
+        if existing:
+            self._emit('output', job, f"Already downloaded: {existing}\n")
+            job.filepath = existing
+            job.progress = 100.0
+            with self._cond:
+                job.status = 'done'
+            self._emit('status', job, job.status)
+            return
+
+        job.error = None
+        try:
+            resolution_id = self._select_format(job)
+        except ValueError as e:
+            self._emit('output', job, f"Error: {e}\n")
+            if job._stop_reason is None and self._retry_later(job, e):
+                return
+            with self._cond:
+                job.status = 'cancelled' if job._stop_reason == 'cancel' else 'failed'
+            self._emit('status', job, job.status)
+            return
+        if self.schedule and job._stop_reason is None and not self.schedule.allows(job):
+            self._defer(job)
+            return
+
+        download_path, output_template = job.download_path, None
+        if self.store:
+            download_path, output_template = self.store.staging_dir(self._staging_key(job, fmt)), self.store.template
+            try:
+                os.makedirs(download_path, exist_ok=True)
+            except OSError:
+                pass  # yt-dlp reports it
+        # Fetch a video+audio pair as two files and merge them off the download slot. Clips are cut
+        # by ffmpeg while downloading, which merges the pair in the same pass.
+        download_spec = resolution_id
+        split = (self.postprocessor.split_download(job.download_type, resolution_id, output_template)
+                 if self.postprocessor and not job.sections else None)
+        if split:
+            download_spec, output_template = split
+        # Smart cuts are finished on the process pool below, if there is one
+        finish_cuts = not (self.postprocessor and self.postprocessor.ffmpeg)
+
+        result = download_video(job.url, job.download_type, output, download_path, progress, download_spec,
+                                process_callback=attach, transfer=self._transfer_for(job),
+                                postprocess_callback=job.metrics.on_postprocess, output_template=output_template,
+                                sections=job.sections, precision=job.precision, finish_cuts=finish_cuts)
+        ok = result.ok
+        if not ok and job._stop_reason is None and self._retry_later(job, result.error):
+            return
+        if ok and self.postprocessor and job._stop_reason is None:
+            task = self._plan_postprocess(job, result, resolution_id)
+            if task is not None:
+                if isinstance(task, CutTask):
+                    result = result._replace(filepath=task.output, files=task.outputs)  # Where the cut clips go
+                self._start_postprocess(job, fmt, result, task)
+                return
+        if ok:
+            self._record(job, fmt, result, result.filepath)
+        with self._cond:
+            if job._stop_reason == 'pause':
+                job.status = 'paused'
+            elif job._stop_reason == 'shutdown':
+                job.status = 'queued'
+            elif job._stop_reason == 'cancel':
+                job.status = 'cancelled'
+            else:
+                job.status = 'done' if ok else 'failed'
+        self._emit('status', job, job.status)
+
+    def _retry_later(self, job, error):
+        # Send a job that failed for a transient reason back to the queue after a backoff
+        job.error = error
+        if not self.retry or not self.retry.should_retry(error, job.retries):
+            return False
+        job.retries += 1
+        job.metrics.retries += 1
+        delay = self.retry.delay(job.retries)
+        timer = threading.Timer(delay, lambda: self._requeue(job, timer))
+        timer.daemon = True
+        with self._cond:
+            job.status = 'queued'
+            if not self._shutdown:  # Otherwise the journal restores it on the next launch
+                job.retry_timer = timer
+                timer.start()
+        self._emit('output', job, f"{error} ({error.kind}); trying again in {delay:.0f}s "
+                                  f"(retry {job.retries} of {self.retry.max_retries})\n")
+        self._emit('status', job, job.status)
+        return True
+
+    def _requeue(self, job, timer):
+        with self._cond:
+            if job.retry_timer is not timer or job.status != 'queued' or self._shutdown:
+                return  # Cancelled, paused or resumed by hand in the meantime
+            job.retry_timer = None
+            self._push(job)
+            self._ensure_workers()
+            self._cond.notify()
+
+    def _defer(self, job):
+        # The probe sized the job as too large for this hour: back to the queue until an off-peak window opens
+        with self._cond:
+            job.status = 'queued'
+            if not self._shutdown:  # Otherwise the journal restores it on the next launch
+                self._push(job)
+        self._announce_wait(job)
+        self._emit('status', job, job.status)
+
+    def _announce_wait(self, job):
+        windows = ", ".join(str(window) for window in self.schedule.off_peak)
+        self._emit('output', job, f"~{job.estimated_size / 1024 / 1024:.0f} MB, waiting for the off-peak hours "
+                                  f"({windows})\n")
+
+    def _cached_estimate(self, job):
+        # From the metadata cache (Check and batch mode probe ahead); never probes
+        try:
+            info = get_metadata_cache().get(job.key)
+        except Exception:
+            return None
+        if info is None:
+            return None
+        return estimate_size(info, job.download_type, job.resolution_id, job.policy, job.sections)
+
+    def _plan_postprocess(self, job, result, format_spec):
+        files = result.files or ((result.filepath,) if result.filepath else ())
+        if job.sections:
+            # Clips are kept as cut; only smart cuts have work left
+            if job.precision == 'smart' and job.download_type == 'v':
+                return self.postprocessor.plan_cut(files, job.sections)
+            return None
+        try:
+            info = fetch_video_info(job.url)
+        except Exception:
+            info = {}  # Merging still works without it, only as mkv
+        return self.postprocessor.plan(info, job.download_type, files, format_spec)
+
+    def _start_postprocess(self, job, fmt, result, task):
+        with self._cond:
+            job.status = 'processing'
+        self._emit('status', job, job.status)
+        self._emit('output', job, f"Processing {os.path.basename(task.output)}\n")
+        job.postprocess = self.postprocessor.submit(task)
+        job.postprocess.add_done_callback(lambda future: self._postprocessed(job, fmt, result, future))
+
+    def _postprocessed(self, job, fmt, result, future):
+        # Runs on the process pool's result thread
+        try:
+            ok, path, message = future.result()
+        except CancelledError:
+            ok, path, message = False, None, ""
+        except Exception as e:
+            ok, path, message = False, None, f"Post-processing failed: {e}\n"
+        if message:
+            self._emit('output', job, message)
+        if ok:
+            self._record(job, fmt, result, path)
+        elif not future.cancelled():
+            job.error = PostProcessError(message.strip() or "Post-processing failed")
+        with self._cond:
+            if future.cancelled():
+                # Shutdown leaves the streams on disk for the restored job to pick up
+                job.status = 'queued' if self._shutdown else 'cancelled'
+            else:
+                job.status = 'done' if ok else 'failed'
+        self._emit('status', job, job.status)
+
+    def _record(self, job, fmt, result, path):
+        # A clip job leaves one file per section, each stored and indexed; job.filepath is the last
+        paths = list(result.files) if job.sections and result.files else [path]
+        if self.store and path:
+            job.metrics.enter('move')
+        stored = True
+        for path in paths:
+            path, stored_ok = self._record_file(job, fmt, result, path)
+            stored = stored and stored_ok
+        if self.store and path and stored:
+            self.store.discard_staging(self._staging_key(job, fmt))
+        job.filepath = path
+
+    def _record_file(self, job, fmt, result, path):
+        # Returns (final path, False if it could not be moved into the content store)
+        sha256 = None
+        stored = True
+        if self.store and path:
+            staging = self.store.staging_dir(self._staging_key(job, fmt))
+            relative = os.path.relpath(path, staging)
+            if relative.startswith(os.pardir):
+                relative = os.path.basename(path)  # yt-dlp was told to write elsewhere
+            target = os.path.join(job.download_path, relative)
+            try:
+                path, sha256 = self.store.ingest(path, target, result.extractor, result.video_id, fmt)
+            except (OSError, sqlite3.Error) as e:
+                stored = False
+                self._emit('output', job, f"Could not add to the content store, the file is still at {path}: {e}\n")
+        if self.index and path and result.video_id and result.extractor:
+            try:
+                self.index.record(result.extractor, result.video_id, fmt, path, sha256)
+            except OSError as e:
+                self._emit('output', job, f"Could not add to the download index: {e}\n")
+        return path, stored
+
+    @staticmethod
+    def _staging_key(job, fmt):
+        # Per video and format, so a restored or retried job resumes its partial files
+        return f"{job.key} {fmt}"
+
+    def _find_existing(self, job, fmt):
+        # Usually a metadata cache hit, since Check and batch mode probe first
+        if not self.index:
+            return None
+        try:
+            return reuse_existing_download(self.index, fetch_video_info(job.url), fmt, job.download_path)
+        except Exception:
+            return None  # Let the download itself report the problem
+
+    def _select_format(self, job):
+        # Explicit choices win; otherwise rank every variant against the job's policy.
+        # Raises ValueError if the video cannot be probed or nothing meets the policy.
+        if job.resolution_id or job.policy is None:
+            if self.schedule and job.estimated_size is None:
+                try:
+                    job.estimated_size = estimate_size(fetch_video_info(job.url), job.download_type,
+                                                       job.resolution_id, sections=job.sections)
+                except ValueError:
+                    pass  # The download reports it
+            return job.resolution_id
+        info = fetch_video_info(job.url)
+        if not parse_formats(info):
+            return None  # No codec details to rank (some non-YouTube sites), let yt-dlp choose
+        choice = select_formats(info, job.policy, job.download_type)
+        if choice is None:
+            raise ValueError("No format meets the format policy")
+        job.estimated_size = estimate_size(info, job.download_type, choice.format_spec, sections=job.sections)
+        size = f" (~{choice.estimated_size / 1024 / 1024:.0f} MB)" if choice.estimated_size else ""
+        self._emit('output', job, f"Selected format {choice.format_spec}{size}\n")
+        return choice.format_spec
+
+    def _transfer_for(self, job):
+        # Each yt-dlp run enforces its own limit, so the global budget (the schedule's,
+        # if it has one for this hour) is split evenly between the jobs running when this one starts
+        transfer = job.transfer
+        budget = self.schedule.rate_limit(self.global_rate_limit) if self.schedule else self.global_rate_limit
+        if not budget:
+            return transfer
+        with self._cond:
+            share = budget // max(1, self._running)
+        transfer = transfer or TransferOptions()
+        return transfer.with_rate_limit(min(transfer.rate_limit or share, share))
+
+    def _emit(self, kind, job, payload):
+        if kind == 'status':
+            self._track(job, payload)
+            if self.journal:
+                self.journal.update(job)
+        self.events.put((kind, job, payload))
+
+    def _track(self, job, status):
+        # Phase timing follows the status changes
+        if status == 'queued':
+            job.metrics.queued()
+        elif status == 'running':
+            job.metrics.start()
+        elif status == 'processing':
+            job.metrics.enter('postprocess')
+        elif status == 'paused':
+            job.metrics.enter(None)
+        elif status in ('done', 'failed', 'cancelled'):
+            job.metrics.finish()
+            if self.metrics:
+                self.metrics.observe(job)
@@ -0,0 +1,93 @@
+"""Clip downloads: time ranges such as "1:00-1:30,2:00-2:10" and how they are passed to yt-dlp"""
+import math
+import os
+import re
+from typing import NamedTuple, Optional
+
+# keyframe: cut at the keyframes around each range (stream copy, fastest)
+# exact: yt-dlp re-encodes the whole clip so it starts and ends on the requested frames
+# smart: stream copy, then only the part before the first keyframe is re-encoded (see postprocess.smart_cut)
+CLIP_PRECISIONS = ('keyframe', 'exact', 'smart')
+
+# ffmpeg input options for smart-mode clips: keep the video's own timestamps, so smart_cut can tell
+# where the requested start lies in the keyframe-cut clip
+SMART_CUT_INPUT_ARGS = ('-copyts',)
+UNCUT_SUFFIX = ".uncut"  # Marks smart-mode clips that still have to be cut (see postprocess.smart_cut)
+
+_TIME = re.compile(r'^(?:(?:(\d+):)?(\d+):)?(\d+(?:\.\d*)?)$')
+
+class Section(NamedTuple):
+    """A time range of a video, in seconds"""
+    start: float
+    end: Optional[float] = None  # None = to the end of the video
+
+    def to_arg(self):
+        """The range as a yt-dlp --download-sections value"""
+        end = 'inf' if self.end is None else _number(self.end)
+        return f"*{_number(self.start)}-{end}"
+
+def _number(value):
+    return f"{value:.3f}".rstrip('0').rstrip('.')
+
+def parse_time(text):
+    """Seconds from "90", "1:30" or "1:02:03.5". Raises ValueError for anything else."""
+    match = _TIME.match(text.strip())
+    if not match:
+        raise ValueError(f"Not a time: {text!r} (use seconds, m:ss or h:mm:ss)")
+    hours, minutes, seconds = match.groups()
+    return int(hours or 0) * 3600 + int(minutes or 0) * 60 + float(seconds)
+
+def format_time(seconds):
+    """Inverse of parse_time: "1:30", "1:02:03.5" """
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    text = f"{seconds:06.3f}".rstrip('0').rstrip('.')
+    return f"{hours}:{minutes:02d}:{text}" if hours else f"{minutes}:{text}"
+
+def parse_sections(text):
+    """Sections from "1:00-1:30,2:00-2:10". An empty start means 0, an empty end the end of the video.
+
+    Returns a tuple (empty for blank text). Raises ValueError for malformed
+    or backwards ranges.
+    """
+    sections = []
+    for part in (text or '').replace(' ', '').split(','):
+        if not part:
+            continue
+        start, sep, end = part.partition('-')
+        if not sep:
+            raise ValueError(f"Not a time range: {part!r} (use start-end, e.g. 1:00-1:30)")
+        section = Section(parse_time(start) if start else 0.0, parse_time(end) if end else None)
+        if section.end is not None and section.end <= section.start:
+            raise ValueError(f"The range {part} ends before it starts")
+        sections.append(section)
+    return tuple(sections)
+
+def format_sections(sections):
+    """Inverse of parse_sections ('' for no sections)"""
+    return ",".join(f"{format_time(section.start)}-{'' if section.end is None else format_time(section.end)}"
+                    for section in sections)
+
+def split_sections(line):
+    """(URL, sections) from a batch line such as "URL 1:00-1:30,2:00-2:10". Raises ValueError for bad ranges."""
+    url, _, ranges = line.strip().partition(' ')
+    return url, parse_sections(ranges)
+
+def clip_template(template=None, uncut=False):
+    """Output template naming each clip after its range ("Title [60-90].mp4"), so clips of one video never collide.
+
+    uncut=True adds UNCUT_SUFFIX ("Title [60-90].uncut.mp4") for clips that
+    smart_cut() finishes under the plain name.
+    """
+    template = template or "%(title)s.%(ext)s"
+    root = template[:-len(".%(ext)s")] if template.endswith(".%(ext)s") else template
+    return root + " [%(section_start)d-%(section_end)d]" + (UNCUT_SUFFIX if uncut else "") + ".%(ext)s"
+
+def cut_path(path):
+    """Final name of a clip written under clip_template(uncut=True)"""
+    root, ext = os.path.splitext(path)
+    return (root[:-len(UNCUT_SUFFIX)] if root.endswith(UNCUT_SUFFIX) else root) + ext
+
+def download_ranges(sections):
+    """(start, end) pairs for yt-dlp's download_range_func, with an open end as infinity"""
+    return [(section.start, math.inf if section.end is None else section.end) for section in sections]
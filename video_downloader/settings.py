@@ -0,0 +1,80 @@
+"""User settings and per-user folders"""
+import json
+import os
+
+DEFAULT_SETTINGS = {
+    'max_concurrent_downloads': 3,
+    'metadata_cache_ttl': 6 * 3600,  # seconds
+    'metadata_cache_max_mb': 64,
+    'batch_probe_workers': 4,
+    'prefetch_delay_ms': 400,  # Probe the URL this long after typing stops, 0 = only on Check
+    'backend': 'auto',  # 'library' (in-process yt_dlp), 'subprocess' or 'auto'
+    'ytdlp_path': '',  # yt-dlp executable for the subprocess backend, '' = look it up on PATH
+    'progress_updates_per_second': 10,  # Per job
+    'log_max_lines': 500,
+    'job_table_rows': 8,  # Height of the job list in the main window
+    # Turbo mode: parallel fragments and/or an external multi-connection downloader
+    'turbo_mode': False,
+    'turbo_concurrent_fragments': 8,
+    'turbo_external_downloader': '',  # e.g. 'aria2c'
+    'turbo_external_downloader_args': '-x 8 -s 8 -k 1M',
+    'turbo_http_chunk_size_mb': 10,
+    'rate_limit_kbps': 0,  # Per job, 0 = unlimited
+    'global_rate_limit_kbps': 0,  # Shared by all running jobs, 0 = unlimited
+    # Network errors and HTTP 429 are retried after 5s, 10s, 20s... (with jitter, at most retry_max_delay)
+    'retry_attempts': 3,  # 0 = fail on the first error
+    'retry_base_delay': 5,  # seconds
+    'retry_max_delay': 300,
+    'throttle_threshold': 3,  # HTTP 429s within a minute that hold a site's downloads, 0 = never
+    'throttle_cooldown': 120,  # seconds, doubled each time the site is still throttling
+    # Scheduling: the queue order, and off-peak hours for big downloads (see README)
+    'queue_order': 'priority',  # 'priority', 'sjf' (smallest estimated download first) or 'fifo'
+    'off_peak_hours': '',  # Local time, e.g. '22:00-07:00' or '22:00-07:00,12:00-13:00', '' = none
+    'off_peak_min_size_mb': 1024,  # Downloads estimated above this wait for the off-peak hours, 0 = none wait
+    'off_peak_rate_limit_kbps': 0,  # Replaces global_rate_limit_kbps during the off-peak hours, 0 = unlimited
+    'skip_downloaded': True,  # Skip (or relink) videos already in the download index
+    # Store each file once by SHA-256 under this folder and hardlink it into the download folder, '' = off
+    'content_store': '',
+    'content_store_link': 'auto',  # 'hardlink', 'reflink', 'copy', or 'auto' to try them in that order
+    'content_store_template': '%(title)s.%(ext)s',  # yt-dlp output template, relative to the download folder
+    # ffmpeg work (merging, conversion) on a process pool instead of inside the download slot
+    'postprocess_in_pool': True,
+    'postprocess_workers': 0,  # 0 = one per CPU core
+    'audio_format': '',  # Audio downloads: '' keeps the original, or 'mp3', 'm4a', 'opus'
+    'embed_thumbnail': False,
+    'normalize_loudness': False,  # EBU R128 loudnorm, re-encodes the audio
+    'clip_precision': 'keyframe',  # Clip cuts: 'keyframe' (copy), 'exact' (re-encode) or 'smart' (see README)
+    'format_policy': 'best,<=1080p,mp4',  # What "Auto" picks, see FormatPolicy.parse. '' = yt-dlp's own choice
+}
+
+def get_downloads_folder():
+    """Get the default downloads folder path"""
+    return os.path.join(os.path.expanduser("~"), "Downloads")
+
+def get_app_data_dir():
+    """Get (and create) the per-user folder used for settings and caches"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser("~")
+    else:
+        base = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser("~"), ".local", "share")
+    path = os.path.join(base, "Video Downloader")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def load_settings():
+    """Load user settings, falling back to defaults for missing keys"""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(os.path.join(get_app_data_dir(), "settings.json"), encoding="utf-8") as f:
+            settings.update(json.load(f))
+    except (OSError, ValueError):
+        pass  # Missing or corrupt settings file, use defaults
+    return settings
+
+def save_settings(settings):
+    """Persist user settings to disk"""
+    try:
+        with open(os.path.join(get_app_data_dir(), "settings.json"), "w", encoding="utf-8") as f:
+            json.dump(settings, f, indent=2)
+    except OSError:
+        pass  # Settings are a convenience, never fail because of them
@@ -0,0 +1,273 @@
+"""Content-addressed storage for finished downloads, with hardlinked copies in the user's folders"""
+import hashlib
+import itertools
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from .archive import file_sha256
+
+LINK_MODES = ('auto', 'hardlink', 'reflink', 'copy')
+DEFAULT_TEMPLATE = "%(title)s.%(ext)s"
+_FICLONE = 0x40049409  # Linux ioctl that shares a file's extents (Btrfs, XFS, bcachefs)
+
+def _hardlink(source, target):
+    os.link(source, target)
+
+def _reflink(source, target):
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("Reflinks are not supported on this platform")
+    with open(source, "rb") as src, open(target, "xb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(target)
+            raise
+
+def _copy(source, target):
+    with open(source, "rb") as src, open(target, "xb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+_LINKERS = {'hardlink': _hardlink, 'reflink': _reflink, 'copy': _copy}
+
+def _same_file(a, b):
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class ContentStore:
+    """Finished downloads stored once per SHA-256, linked into the folders users see.
+
+    Objects live in `objects/ab/cd/<sha256>` under the root. The file a user
+    asked for (download folder + `template`, rendered by yt-dlp) is a
+    hardlink or reflink to its object, so the same media saved under two
+    names, or re-uploaded under another ID, takes the space once. A name
+    already taken by different content gets a " (2)" suffix instead of
+    being overwritten. `manifest.sqlite3` maps each video ID to its hash
+    and every path linked to it.
+
+    Downloads are written to a staging folder per job inside the root, so
+    they can be moved into the store without copying; files from elsewhere
+    are copied in and hashed in the same pass. Each file is read once and
+    its checksum is handed on to the download index.
+    """
+
+    def __init__(self, root, link_mode='auto', template=DEFAULT_TEMPLATE):
+        if link_mode not in LINK_MODES:
+            raise ValueError(f"Unknown link mode: {link_mode}")
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.link_mode = link_mode
+        self.template = template or DEFAULT_TEMPLATE  # yt-dlp output template for the user-facing path
+        self.objects_dir = os.path.join(self.root, "objects")
+        for folder in ("objects", "incoming", "tmp"):
+            os.makedirs(os.path.join(self.root, folder), exist_ok=True)
+        self._lock = threading.Lock()
+        # The store may sit on a NAS shared by several machines, so no WAL (see SQLiteJobQueue)
+        self._db = sqlite3.connect(os.path.join(self.root, "manifest.sqlite3"), timeout=30,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        self._db.execute("CREATE TABLE IF NOT EXISTS objects ("
+                         "sha256 TEXT PRIMARY KEY, size INTEGER NOT NULL, added REAL NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS files ("
+                         "path TEXT PRIMARY KEY, sha256 TEXT NOT NULL, extractor TEXT, video_id TEXT, format TEXT, "
+                         "added REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS files_video ON files (extractor, video_id)")
+        self._db.commit()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """A ContentStore as configured, or None if downloads are saved directly"""
+        if not settings['content_store']:
+            return None
+        return cls(settings['content_store'], settings['content_store_link'], settings['content_store_template'])
+
+    def object_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256[:2], sha256[2:4], sha256)
+
+    def staging_dir(self, key):
+        """Folder a job downloads into before ingest(), the same for every attempt so .part files resume"""
+        return os.path.join(self.root, "incoming", hashlib.sha1(key.encode("utf-8")).hexdigest()[:16])
+
+    def discard_staging(self, key):
+        """Delete a job's staging folder and anything left in it"""
+        shutil.rmtree(self.staging_dir(key), ignore_errors=True)
+
+    def ingest(self, source, target=None, extractor=None, video_id=None, fmt=None):
+        """Store a file and link it at target (default: replace source by the link).
+
+        Returns (path, sha256). The path differs from target when that name
+        holds other content. The source is removed once it is linked
+        elsewhere.
+        """
+        source = os.path.abspath(source)
+        size = os.path.getsize(source)
+        temp = None
+        if os.stat(source).st_dev == os.stat(self.objects_dir).st_dev:
+            sha256 = file_sha256(source)  # Hashed once after the download; yt-dlp writes the file itself
+        else:
+            temp, sha256 = self._copy_hashing(source)
+        obj = self.object_path(sha256)
+        try:
+            if not os.path.exists(obj):
+                os.makedirs(os.path.dirname(obj), exist_ok=True)
+                try:
+                    if temp:
+                        os.replace(temp, obj)
+                        temp = None
+                    else:
+                        os.link(source, obj)
+                except FileExistsError:
+                    pass  # Another worker stored the same bytes just now
+                except OSError:
+                    shutil.copyfile(source, obj)  # No hardlinks on this file system
+        finally:
+            if temp:
+                _remove(temp)
+
+        if target is None:
+            path = source
+            self._relink(obj, source)
+        else:
+            path = self._place(obj, sha256, os.path.abspath(target))
+            if os.path.normcase(path) != os.path.normcase(source):
+                _remove(source)
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO objects (sha256, size, added) VALUES (?, ?, ?)",
+                             (sha256, size, now))
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, sha256, extractor, video_id, format, added) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (path, sha256, extractor.lower() if extractor else None, video_id, fmt, now)
+            )
+            self._db.commit()
+        return path, sha256
+
+    def lookup(self, extractor, video_id):
+        """{sha256: [paths]} stored for a video"""
+        with self._lock:
+            rows = self._db.execute("SELECT sha256, path FROM files WHERE extractor = ? AND video_id = ? "
+                                    "ORDER BY added", (extractor.lower(), video_id)).fetchall()
+        found = {}
+        for sha256, path in rows:
+            found.setdefault(sha256, []).append(path)
+        return found
+
+    def paths(self, sha256):
+        """Every path linked to an object"""
+        with self._lock:
+            rows = self._db.execute("SELECT path FROM files WHERE sha256 = ? ORDER BY added", (sha256,)).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self):
+        """Object and file counts, bytes stored, and bytes the links save"""
+        with self._lock:
+            objects, stored = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects").fetchone()
+            files, linked = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(objects.size), 0) FROM files JOIN objects USING (sha256)"
+            ).fetchone()
+        return {'objects': objects, 'files': files, 'stored_bytes': stored, 'saved_bytes': max(0, linked - stored)}
+
+    def prune(self):
+        """Forget paths that were deleted or replaced, and delete objects nothing links to. Returns bytes freed."""
+        with self._lock:
+            rows = self._db.execute("SELECT path, sha256 FROM files").fetchall()
+        gone = [(path,) for path, sha256 in rows
+                if not _same_file(path, self.object_path(sha256)) and not self._matches(path, sha256)]
+        freed = 0
+        with self._lock:
+            self._db.executemany("DELETE FROM files WHERE path = ?", gone)
+            orphans = self._db.execute("SELECT sha256, size FROM objects WHERE sha256 NOT IN "
+                                       "(SELECT sha256 FROM files)").fetchall()
+            for sha256, size in orphans:
+                obj = self.object_path(sha256)
+                try:
+                    if os.stat(obj).st_nlink > 1:
+                        continue  # Still linked somewhere the manifest does not know about
+                    os.remove(obj)
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    continue
+                self._db.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+                freed += size
+            self._db.commit()
+        return freed
+
+    def _copy_hashing(self, source):
+        # Copy into the store's tmp folder, hashing the bytes on the way
+        digest = hashlib.sha256()
+        temp = os.path.join(self.root, "tmp", f"{os.getpid()}-{threading.get_ident()}-{time.monotonic_ns()}")
+        try:
+            with open(source, "rb") as src, open(temp, "wb") as dst:
+                for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                    digest.update(chunk)
+                    dst.write(chunk)
+        except BaseException:
+            _remove(temp)
+            raise
+        return temp, digest.hexdigest()
+
+    def _link(self, obj, target, allow_copy=True):
+        modes = ('hardlink', 'reflink', 'copy') if self.link_mode == 'auto' else (self.link_mode,)
+        if not allow_copy:
+            modes = tuple(mode for mode in modes if mode != 'copy')
+        for i, mode in enumerate(modes):
+            try:
+                _LINKERS[mode](obj, target)
+                return
+            except FileExistsError:
+                raise
+            except OSError:
+                if i == len(modes) - 1:
+                    raise
+
+    def _relink(self, obj, path):
+        # Swap a file for a link to its object; a plain copy would save nothing, so keep the file then
+        if _same_file(obj, path) or self.link_mode == 'copy':
+            return
+        temp = f"{path}.vd-link"
+        _remove(temp)
+        try:
+            self._link(obj, temp, allow_copy=False)
+        except OSError:
+            return  # Another drive, or links are not supported there
+        os.replace(temp, path)
+
+    def _place(self, obj, sha256, target):
+        root, ext = os.path.splitext(target)
+        for n in itertools.count(1):
+            candidate = target if n == 1 else f"{root} ({n}){ext}"
+            if os.path.lexists(candidate):
+                if _same_file(candidate, obj) or self._matches(candidate, sha256):
+                    return candidate  # Already there from an earlier download
+                continue
+            os.makedirs(os.path.dirname(candidate), exist_ok=True)
+            try:
+                self._link(obj, candidate)
+            except FileExistsError:
+                continue  # Taken in the meantime
+            return candidate
+
+    def _matches(self, path, sha256):
+        # A copy recorded for this object, still the same size (copies cannot be told apart by inode)
+        with self._lock:
+            row = self._db.execute("SELECT objects.size FROM files JOIN objects USING (sha256) "
+                                   "WHERE path = ? AND sha256 = ?", (path, sha256)).fetchone()
+        try:
+            return row is not None and os.path.getsize(path) == row[0]
+        except OSError:
+            return False
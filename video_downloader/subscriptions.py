@@ -0,0 +1,199 @@
+"""Subscriptions: channels and playlists that are checked again and again for new uploads"""
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from .backends import get_backend
+from .cache import video_cache_key
+from .probe import is_collection_url
+from .settings import get_app_data_dir
+from .urls import classify_url
+
+# Entries of each listing marked as seen when a newest-first subscription is synced for the first time
+# (one YouTube page), so later syncs have something to stop at even if the newest upload is deleted
+BASELINE_ENTRIES = 30
+# Live and upcoming streams are not finished videos yet; they are not marked seen and come up again
+_NOT_YET = ('is_upcoming', 'is_live', 'post_live')
+
+class Subscription(NamedTuple):
+    """A channel or playlist that is synced for new videos"""
+    id: int
+    url: str
+    download_type: str
+    resolution_id: Optional[str]
+    download_path: Optional[str]  # None = the folder given to the sync
+    newest_first: bool  # Listed newest first (channels, feeds), so a sync can stop at the first seen video
+    last_sync: Optional[float]  # None until the first sync
+    last_video_id: Optional[str]  # Newest video seen: the high-water mark
+
+class NewVideo(NamedTuple):
+    """A video a sync found that is not marked seen yet"""
+    subscription: Subscription
+    key: str  # video_cache_key of the URL, what the seen list stores
+    url: str
+    title: Optional[str]
+
+class SubscriptionStore:
+    """SQLite list of subscriptions and of the videos already seen in each.
+
+    A sync (find_new_videos) lists a newest-first channel lazily and stops
+    paging at the first video it has seen, so finding two new uploads on a
+    channel of thousands takes one page instead of the whole listing.
+    Playlists grow at the end and are listed in full, still flat.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_app_data_dir(), "subscriptions.sqlite3")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS subscriptions ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL UNIQUE, download_type TEXT NOT NULL, "
+            "resolution_id TEXT, download_path TEXT, newest_first INTEGER NOT NULL, added REAL NOT NULL, "
+            "last_sync REAL, last_video_id TEXT)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS seen ("
+                         "subscription_id INTEGER NOT NULL, key TEXT NOT NULL, seen REAL NOT NULL, "
+                         "PRIMARY KEY (subscription_id, key)) WITHOUT ROWID")
+        self._db.commit()
+
+    def add(self, url, download_type='v', resolution_id=None, download_path=None):
+        """Subscribe to a channel or playlist (or update its options). Returns the Subscription.
+
+        Raises ValueError for a URL that is not a channel, playlist or feed.
+        """
+        info = classify_url(url)
+        if info.kind == 'video' and info.extractor != 'Generic':
+            raise ValueError(f"Not a channel or playlist: {url}")
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO subscriptions (url, download_type, resolution_id, download_path, newest_first, added) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (url) DO UPDATE SET download_type = excluded.download_type, "
+                "resolution_id = excluded.resolution_id, download_path = excluded.download_path",
+                (info.url, download_type, resolution_id, download_path, info.kind != 'playlist', time.time())
+            )
+            self._db.commit()
+        return self.get(info.url)
+
+    def remove(self, key):
+        """Unsubscribe by ID or URL; returns False if there was no such subscription"""
+        subscription = self.get(key)
+        if subscription is None:
+            return False
+        with self._lock:
+            self._db.execute("DELETE FROM seen WHERE subscription_id = ?", (subscription.id,))
+            self._db.execute("DELETE FROM subscriptions WHERE id = ?", (subscription.id,))
+            self._db.commit()
+        return True
+
+    def get(self, key):
+        """The Subscription with this ID or URL, or None"""
+        if isinstance(key, int) or str(key).isdigit():
+            where, value = "id = ?", int(key)
+        else:
+            try:
+                value = classify_url(key).url
+            except ValueError:
+                value = key
+            where = "url = ?"
+        rows = self._select(f"WHERE {where}", (value,))
+        return rows[0] if rows else None
+
+    def subscriptions(self):
+        """Every Subscription, oldest first"""
+        return self._select("ORDER BY id", ())
+
+    def seen_keys(self, subscription):
+        """Set of the video keys seen in a subscription"""
+        with self._lock:
+            rows = self._db.execute("SELECT key FROM seen WHERE subscription_id = ?", (subscription.id,)).fetchall()
+        return {row[0] for row in rows}
+
+    def mark_seen(self, subscription, keys, newest=None):
+        """Record videos as seen and the sync as done; newest (a key) becomes the high-water mark"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany("INSERT OR IGNORE INTO seen (subscription_id, key, seen) VALUES (?, ?, ?)",
+                                 [(subscription.id, key, now) for key in keys])
+            self._db.execute("UPDATE subscriptions SET last_sync = ?, last_video_id = COALESCE(?, last_video_id) "
+                             "WHERE id = ?", (now, newest, subscription.id))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _select(self, clause, params):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, url, download_type, resolution_id, download_path, newest_first, last_sync, last_video_id "
+                f"FROM subscriptions {clause}", params
+            ).fetchall()
+        return [Subscription(*row[:5], bool(row[5]), *row[6:]) for row in rows]
+
+def find_new_videos(store, subscription, backfill=0):
+    """The videos of a subscription that are not marked seen yet, oldest first.
+
+    They are not marked seen here: call store.mark_seen() once they are
+    queued, so a crash in between lists them again. On the first sync only
+    `backfill` videos per listing count as new (the newest, or the last of
+    a playlist); the rest of the first page (or the whole playlist) is
+    marked seen as the starting point. Raises DownloadError if yt-dlp
+    cannot list the subscription.
+    """
+    seen = store.seen_keys(subscription)
+    first_sync = subscription.last_sync is None
+    limit = max(BASELINE_ENTRIES, backfill) if first_sync and subscription.newest_first else None
+    new, baseline = [], []
+    for listing in _listings(subscription.url, seen, subscription.newest_first, limit):
+        if not first_sync:
+            new += listing
+        elif subscription.newest_first:
+            new += listing[:backfill]
+            baseline += listing[backfill:]
+        else:
+            split = max(0, len(listing) - backfill)
+            new += listing[split:]
+            baseline += listing[:split]
+    if first_sync:
+        newest = (new or baseline)[0].key if subscription.newest_first and (new or baseline) else None
+        store.mark_seen(subscription, [entry.key for entry in baseline], newest)
+        subscription = store.get(subscription.id)
+    videos = [NewVideo(subscription, *entry) for entry in new]
+    return videos[::-1] if subscription.newest_first else videos
+
+class _Entry(NamedTuple):
+    key: str
+    url: str
+    title: Optional[str]
+
+def _listings(url, seen, newest_first, limit, depth=2):
+    # Lists of unseen _Entry per listing: the collection itself, then each channel tab in it
+    listing = []
+    entries = get_backend().iter_collection(url)
+    try:
+        for entry in entries:
+            entry_url = entry.get('url') or entry.get('webpage_url')
+            if not entry_url:
+                continue
+            if entry.get('_type') == 'playlist' or is_collection_url(entry_url):
+                # Channel tabs (Videos, Shorts, ...) are newest first on their own
+                if depth > 0:
+                    yield from _listings(entry_url, seen, newest_first, limit, depth - 1)
+                continue
+            if entry.get('live_status') in _NOT_YET:
+                continue
+            key = video_cache_key(entry_url)
+            if key in seen:
+                if newest_first:
+                    break  # Everything after it was listed before
+                continue
+            listing.append(_Entry(key, entry_url, entry.get('title')))
+            if limit and len(listing) >= limit:
+                break
+    finally:
+        entries.close()  # Stops yt-dlp before it pages any further
+    yield listing
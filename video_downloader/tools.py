@@ -0,0 +1,47 @@
+"""Discovery of the external tools the downloader relies on"""
+import importlib.util
+import json
+import os
+import shutil
+
+from .settings import get_app_data_dir
+
+def discover_tools(use_cache=True):
+    """Locate ffmpeg, the yt-dlp executable and the yt_dlp package.
+
+    Results are cached in tools.json and reused while PATH is unchanged and
+    the cached executables still exist. Tools that were missing last time
+    are looked up again, so installing one is noticed on the next launch.
+    """
+    cache_path = os.path.join(get_app_data_dir(), "tools.json")
+    path_env = os.environ.get('PATH', '')
+
+    cached = {}
+    if use_cache:
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get('path_env') == path_env:
+                cached = data.get('tools', {})
+        except (OSError, ValueError):
+            pass  # No usable cache, look everything up
+
+    tools = {}
+    for name in ('ffmpeg', 'yt-dlp'):
+        found = cached.get(name)
+        if not found or not os.path.exists(found):
+            found = shutil.which(name)
+        tools[name] = found
+    tools['yt_dlp_module'] = cached.get('yt_dlp_module') or importlib.util.find_spec('yt_dlp') is not None
+
+    if tools != cached:
+        try:
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump({'path_env': path_env, 'tools': tools}, f, indent=2)
+        except OSError:
+            pass  # Caching is only an optimization
+    return tools
+
+def check_ffmpeg():
+    """Check if FFmpeg is available in the system PATH"""
+    return discover_tools()['ffmpeg'] is not None
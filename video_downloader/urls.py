@@ -0,0 +1,168 @@
+"""Classifying and canonicalizing URLs locally, without starting yt-dlp"""
+import re
+import threading
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qs, urlsplit
+
+_YOUTUBE_HOSTS = {'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com', 'youtu.be',
+                  'youtube-nocookie.com', 'www.youtube-nocookie.com'}
+_VIDEO_ID = re.compile(r'[0-9A-Za-z_-]{11}')
+_VIDEO_PATH = re.compile(r'/(?:shorts|embed|live|v|e)/([0-9A-Za-z_-]{11})(?:[/?#]|$)')
+_PLAYLIST_ID = re.compile(r'[0-9A-Za-z_-]{10,}')
+# Second-level names under a country code (bbc.co.uk, abc.net.au): the site's own name is the label before them
+_SECOND_LEVEL = frozenset(('ac', 'co', 'com', 'edu', 'go', 'gob', 'gov', 'mil', 'ne', 'net', 'or', 'org'))
+_HOST_PREFIXES = ('www', 'm')  # Same site, and in nearly every pattern, so useless as a key
+_CHANNEL_PATH = re.compile(r'/(?:(@[^/?#]+)|channel/(UC[0-9A-Za-z_-]{22})|(?:c|user)/([^/?#]+))(?:[/?#]|$)')
+
+class UrlInfo(NamedTuple):
+    """What a URL points at, as far as can be told without fetching it"""
+    extractor: str  # yt-dlp extractor key, e.g. 'Youtube', 'YoutubeTab' or 'Generic'
+    id: Optional[str]  # Canonical ID, or None if only yt-dlp can tell
+    kind: str  # 'video', 'playlist' or 'channel'
+    url: str  # Canonical URL
+
+    @property
+    def key(self):
+        """Stable key for caching and de-duplication, e.g. 'youtube:dQw4w9WgXcQ'"""
+        if self.id is None:
+            return self.url
+        return f"{self.extractor.lower()}:{self.id}"
+
+    @property
+    def site(self):
+        """Who serves the URL: the extractor key, or the host name for the generic extractor"""
+        if self.extractor == 'Generic':
+            return urlsplit(self.url).hostname
+        return self.extractor
+
+def classify_url(url):
+    """Returns the UrlInfo for a URL. Raises ValueError for input no extractor can handle.
+
+    YouTube links are recognized by hand; anything else is matched against
+    the _VALID_URL patterns of yt-dlp's extractors for the same host, with
+    yt-dlp's generic extractor as the fallback.
+    """
+    url = url.strip()
+    if not re.match(r'https?://', url, re.IGNORECASE):
+        url = "https://" + url  # yt-dlp accepts scheme-less links too
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+    except ValueError:
+        raise ValueError("Invalid URL")
+    if not re.fullmatch(r'[a-z0-9-]+(\.[a-z0-9-]+)*', host) or ('.' not in host and host != 'localhost'):
+        raise ValueError("Invalid URL")
+    if host in _YOUTUBE_HOSTS:
+        return _classify_youtube(parts, host)
+    return _extractor_index.classify(url, host)
+
+def warm_extractor_index():
+    """Load yt-dlp's extractor list ahead of the first classify_url() of a non-YouTube link (100-200 ms)"""
+    _extractor_index.warm()
+
+def _classify_youtube(parts, host):
+    query = parse_qs(parts.query)
+    if host == 'youtu.be':
+        video_id = parts.path.strip('/').split('/')[0]
+    elif parts.path in ('/watch', '/watch/'):
+        video_id = query.get('v', [''])[0]
+    else:
+        match = _VIDEO_PATH.match(parts.path)
+        video_id = match.group(1) if match else None
+    if video_id is not None:
+        if not _VIDEO_ID.fullmatch(video_id):
+            raise ValueError("Invalid YouTube URL format")
+        return UrlInfo('Youtube', video_id, 'video', f"https://www.youtube.com/watch?v={video_id}")
+
+    if parts.path in ('/playlist', '/playlist/'):
+        playlist_id = query.get('list', [''])[0]
+        if not _PLAYLIST_ID.fullmatch(playlist_id):
+            raise ValueError("Invalid YouTube URL format")
+        return UrlInfo('YoutubeTab', playlist_id, 'playlist',
+                       f"https://www.youtube.com/playlist?list={playlist_id}")
+
+    match = _CHANNEL_PATH.match(parts.path)
+    if match:
+        handle, channel_id, name = match.groups()
+        base = "https://www.youtube.com" + match.group(0).rstrip('/?#')
+        tab = parts.path[len(match.group(0).rstrip('/?#')):].strip('/')
+        # Tabs (/videos, /shorts, /streams) are listed separately, so they are part of the identity
+        return UrlInfo('YoutubeTab', '/'.join(filter(None, [handle or channel_id or name, tab])), 'channel',
+                       f"{base}/{tab}" if tab else base)
+    raise ValueError("Invalid YouTube URL format")
+
+class _ExtractorIndex:
+    """yt-dlp's extractor classes bucketed by the host names in their URL patterns.
+
+    Loaded on the first non-YouTube URL. Each host label ('vimeo' for
+    player.vimeo.com) is looked up once; after that a URL is only tested
+    against the few extractors that mention its host.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._extractors = None  # [(extractor class, lowercased pattern source)], Generic excluded
+        self._by_label = {}
+
+    def classify(self, url, host):
+        if re.fullmatch(r'[\d.]+', host):
+            return UrlInfo('Generic', None, 'video', url)  # No site extractor is keyed on an IP address
+        for extractor in self._candidates(host):
+            try:
+                if not extractor.suitable(url):
+                    continue
+                video_id = extractor.get_temp_id(url)
+            except Exception:
+                continue  # An extractor with an unusual pattern, let the next one try
+            ie_key = extractor.ie_key()
+            return UrlInfo(ie_key, video_id, _kind(ie_key), url)
+        return UrlInfo('Generic', None, 'video', url)
+
+    def warm(self):
+        with self._lock:
+            self._load()
+
+    def _candidates(self, host):
+        labels = host.split('.')
+        while len(labels) > 2 and labels[0] in _HOST_PREFIXES:
+            labels.pop(0)
+        # Registrable name, or the one before it for hosts like example.co.uk
+        label = labels[-2] if len(labels) > 1 else labels[0]
+        if len(labels) > 2 and len(labels[-1]) == 2 and label in _SECOND_LEVEL:
+            label = labels[-3]
+        with self._lock:
+            candidates = self._by_label.get(label)
+            if candidates is None:
+                # At the start of a name, so 'ted' does not match every pattern that says 'posted'
+                # (no check after it: suffixes like tiktokv? and bongacamsd* follow the name)
+                word = re.compile(rf'(?<![a-z0-9]){re.escape(label)}')
+                candidates = [extractor for extractor, source in self._load() if word.search(source)]
+                self._by_label[label] = candidates
+            return candidates
+
+    def _load(self):
+        if self._extractors is None:
+            try:
+                from yt_dlp.extractor import gen_extractor_classes  # Uses yt-dlp's lazy extractors when built
+                classes = list(gen_extractor_classes())
+            except ImportError:
+                classes = []  # Only the yt-dlp executable is installed, it decides for itself
+            self._extractors = []
+            for extractor in classes:
+                pattern = getattr(extractor, '_VALID_URL', None)
+                if not pattern or extractor.ie_key() == 'Generic':
+                    continue
+                if not isinstance(pattern, str):
+                    pattern = ' '.join(pattern)
+                self._extractors.append((extractor, pattern.lower().replace('\\', '')))
+        return self._extractors
+
+def _kind(ie_key):
+    # yt-dlp has no type field on extractors, so go by the naming conventions
+    if re.search(r'Channel|User|Profile', ie_key):
+        return 'channel'
+    if re.search(r'Playlist|Album|Tab|Series|Season|Collection|Set$', ie_key):
+        return 'playlist'
+    return 'video'
+
+_extractor_index = _ExtractorIndex()
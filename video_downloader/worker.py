@@ -0,0 +1,115 @@
+"""Headless worker that runs jobs from a shared queue on a local DownloadScheduler"""
+import os
+import socket
+import time
+from queue import Empty
+
+from .formats import FormatPolicy
+from .scheduler import DownloadJob
+from .sections import parse_sections
+
+class QueueWorker:
+    """Claims jobs from a shared queue, downloads them locally and writes the outcome back.
+
+    It holds at most as many leases as the scheduler has download slots
+    (jobs being post-processed do not count), renews them every
+    `heartbeat` seconds and stops a local job whose lease it lost, because
+    the job was cancelled in the queue or given to another worker after a
+    missed heartbeat. Finished jobs report their file path, error and
+    metrics to the queue.
+    """
+
+    def __init__(self, queue, scheduler, download_path, worker_id=None, heartbeat=20.0, poll=2.0,
+                 transfer=None, policy=None):
+        self.queue = queue  # SQLiteJobQueue or a broker proxy
+        self.scheduler = scheduler
+        self.download_path = download_path  # For jobs enqueued without a folder
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.heartbeat = heartbeat
+        self.poll = poll  # Longest wait between claims
+        self.transfer = transfer
+        self.policy = policy  # Default FormatPolicy
+        self.completed = {}  # queue ID -> final status
+        self._leases = {}  # queue ID -> local DownloadJob
+        self._stopping = False
+
+    def run(self, until_empty=False, on_event=None):
+        """Work until stop() is called, or until the queue is drained if until_empty.
+
+        on_event (optional) receives every scheduler event, e.g. for printing.
+        """
+        last_heartbeat = time.monotonic()
+        while not self._stopping:
+            # Afterwards either every slot is taken or the queue is empty, so wait for an event
+            if self._claim() and until_empty and not self._leases and not self.queue.counts().get('leased'):
+                break  # Jobs leased elsewhere may still come back if their worker dies
+            deadline = time.monotonic() + self.poll
+            while time.monotonic() < deadline and not self._stopping:
+                try:
+                    kind, job, payload = self.scheduler.events.get(timeout=max(0.0, deadline - time.monotonic()))
+                except Empty:
+                    break
+                if on_event:
+                    on_event(kind, job, payload)
+                if kind == 'status' and payload in ('done', 'failed', 'cancelled'):
+                    self._finished(job)
+                    break  # A slot may have opened up
+            if time.monotonic() - last_heartbeat >= self.heartbeat:
+                self._renew()
+                last_heartbeat = time.monotonic()
+
+    def stop(self):
+        """Stop claiming, stop local downloads and hand unfinished jobs back to the queue"""
+        self._stopping = True
+        self.scheduler.shutdown()
+        for queue_id in list(self._leases):
+            self.queue.release(queue_id, self.worker_id)
+        self._leases.clear()
+
+    def _full(self):
+        busy = sum(1 for job in self._leases.values() if job.status in ('queued', 'running', 'paused'))
+        return busy >= self.scheduler.max_workers
+
+    def _claim(self):
+        # Fill the free download slots. Returns True if the queue had nothing left to hand out.
+        while not self._full():
+            queued = self.queue.claim(self.worker_id)
+            if queued is None:
+                return True
+            try:
+                policy = FormatPolicy.parse(queued.policy) if queued.policy else self.policy
+            except ValueError as e:
+                self.queue.complete(queued.id, self.worker_id, 'failed', error=f"policy: {e}")
+                self.completed[queued.id] = 'failed'
+                continue
+            try:
+                sections = parse_sections(queued.sections)
+            except ValueError as e:
+                self.queue.complete(queued.id, self.worker_id, 'failed', error=f"sections: {e}")
+                self.completed[queued.id] = 'failed'
+                continue
+            job = self.scheduler.submit(DownloadJob(
+                queued.url, queued.download_type, queued.download_path or self.download_path, queued.resolution_id,
+                queued.priority, self.transfer, policy, sections, queued.precision or 'keyframe'
+            ))
+            self._leases[queued.id] = job  # A duplicate URL maps onto the job already running it
+        return False
+
+    def _renew(self):
+        if not self._leases:
+            return
+        for queue_id in self.queue.heartbeat(list(self._leases), self.worker_id):
+            job = self._leases.pop(queue_id)
+            if not any(other is job for other in self._leases.values()):
+                self.scheduler.cancel(job.id)
+
+    def _finished(self, job):
+        for queue_id, leased in list(self._leases.items()):
+            if leased is not job:
+                continue
+            error = None
+            if job.status == 'failed':
+                error = f"{getattr(job.error, 'kind', 'error')}: {job.error}" if job.error else "failed"
+            self.queue.complete(queue_id, self.worker_id, job.status, job.filepath, error, job.metrics.to_dict())
+            self.completed[queue_id] = job.status
+            del self._leases[queue_id]
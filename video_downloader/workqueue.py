@@ -0,0 +1,236 @@
+"""Job queue shared by several headless workers: a SQLite file, or a broker process that owns one"""
+import ipaddress
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+
+# queued -> leased -> done / failed / cancelled (a lease that runs out goes back to queued)
+QUEUE_STATUSES = ('queued', 'leased', 'done', 'failed', 'cancelled')
+DEFAULT_BROKER_PORT = 50055
+
+class QueuedJob(NamedTuple):
+    """A job as handed to a worker by claim()"""
+    id: int
+    url: str
+    download_type: str
+    resolution_id: Optional[str]
+    download_path: Optional[str]  # None = the worker's own output folder
+    priority: int
+    policy: Optional[str]  # FormatPolicy spec, None = the worker's setting
+    sections: Optional[str]  # Time ranges to clip ("1:00-1:30,2:00-2:10"), None = the whole video
+    precision: Optional[str]  # How clips are cut (CLIP_PRECISIONS), None = 'keyframe'
+    attempts: int  # Claims so far, including this one
+
+_COLUMNS = "id, url, download_type, resolution_id, download_path, priority, policy, sections, precision, attempts"
+
+class SQLiteJobQueue:
+    """Download jobs in a SQLite file that any number of workers claim from.
+
+    A worker claims a job by taking a lease on it and renews the lease with
+    heartbeats while the job runs. When a lease runs out (the worker died or
+    lost its connection) the job is up for grabs again; after max_attempts
+    claims it fails instead. The file can live on shared storage, so it
+    uses SQLite's rollback journal: WAL needs shared memory that network
+    file systems do not provide.
+    """
+
+    def __init__(self, path, lease=60.0, max_attempts=3):
+        self.path = path
+        self.lease = lease  # seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # Autocommit; claims open their own BEGIN IMMEDIATE so two workers never take the same row
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        with self._transaction() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS queue ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, download_type TEXT NOT NULL, "
+                "resolution_id TEXT, download_path TEXT, priority INTEGER NOT NULL DEFAULT 0, policy TEXT, "
+                "status TEXT NOT NULL, worker TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "filepath TEXT, error TEXT, metrics TEXT, created REAL NOT NULL, updated REAL NOT NULL, "
+                "sections TEXT, precision TEXT)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS queue_status ON queue (status, priority, id)")
+            columns = {row[1] for row in db.execute("PRAGMA table_info(queue)")}
+            for column in ('sections', 'precision'):  # Queues created before clip downloads lack them
+                if column not in columns:
+                    db.execute(f"ALTER TABLE queue ADD COLUMN {column} TEXT")
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def enqueue(self, url, download_type='v', resolution_id=None, download_path=None, priority=0, policy=None,
+                sections=None, precision=None):
+        """Add a job and return its queue ID"""
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute(
+                "INSERT INTO queue (url, download_type, resolution_id, download_path, priority, policy, sections, "
+                "precision, status, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?)",
+                (url, download_type, resolution_id, download_path, priority, policy, sections or None, precision,
+                 now, now)
+            )
+        return cursor.lastrowid
+
+    def claim(self, worker):
+        """Lease the next job to worker. Returns a QueuedJob, or None if nothing is waiting."""
+        now = time.time()
+        with self._transaction() as db:
+            # Jobs whose workers keep dying are probably what kills them
+            db.execute(
+                "UPDATE queue SET status = 'failed', error = 'Lease expired too many times', worker = NULL, "
+                "lease_expires = NULL, updated = ? WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            row = db.execute(
+                f"SELECT {_COLUMNS} FROM queue WHERE status = 'queued' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY priority DESC, id LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE queue SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated = ? WHERE id = ?", (worker, now + self.lease, now, row[0])
+            )
+        return QueuedJob(*row[:-1], row[-1] + 1)
+
+    def heartbeat(self, job_ids, worker):
+        """Renew worker's leases on job_ids. Returns the IDs it no longer holds (reassigned or cancelled)."""
+        now = time.time()
+        lost = []
+        with self._transaction() as db:
+            for job_id in job_ids:
+                cursor = db.execute(
+                    "UPDATE queue SET lease_expires = ?, updated = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                    (now + self.lease, now, job_id, worker)
+                )
+                if cursor.rowcount == 0:
+                    lost.append(job_id)
+        return lost
+
+    def complete(self, job_id, worker, status, filepath=None, error=None, metrics=None):
+        """Write a job's outcome ('done', 'failed' or 'cancelled'). Returns False if worker had lost the lease."""
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE queue SET status = ?, filepath = ?, error = ?, metrics = ?, lease_expires = NULL, "
+                "updated = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (status, filepath, error, json.dumps(metrics) if metrics else None, time.time(), job_id, worker)
+            )
+        return cursor.rowcount == 1
+
+    def release(self, job_id, worker):
+        """Hand a leased job back without counting the attempt (the worker is shutting down)"""
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE queue SET status = 'queued', worker = NULL, lease_expires = NULL, "
+                "attempts = MAX(attempts - 1, 0), updated = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time(), job_id, worker)
+            )
+
+    def cancel(self, job_id):
+        """Cancel a queued or leased job (its worker stops it on the next heartbeat)"""
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE queue SET status = 'cancelled', lease_expires = NULL, updated = ? "
+                "WHERE id = ? AND status IN ('queued', 'leased')", (time.time(), job_id)
+            )
+
+    def counts(self):
+        """{status: number of jobs}"""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM queue GROUP BY status").fetchall()
+        return dict(rows)
+
+    def jobs(self, status=None, limit=100):
+        """Latest jobs (optionally with one status) as dicts, newest first"""
+        query = ("SELECT id, url, status, worker, attempts, filepath, error, metrics, updated FROM queue"
+                 + (" WHERE status = ?" if status else "") + " ORDER BY id DESC LIMIT ?")
+        with self._lock:
+            rows = self._db.execute(query, ((status,) if status else ()) + (limit,)).fetchall()
+        keys = ('id', 'url', 'status', 'worker', 'attempts', 'filepath', 'error', 'metrics', 'updated')
+        jobs = [dict(zip(keys, row)) for row in rows]
+        for job in jobs:
+            job['metrics'] = json.loads(job['metrics']) if job['metrics'] else None
+        return jobs
+
+def broker_authkey(authkey=None):
+    """The broker password as bytes: the argument or the VIDEO_DOWNLOADER_BROKER_KEY variable.
+
+    Raises ValueError if there is neither. The broker unpickles whatever its
+    clients send, so the key is all that keeps anyone who can reach the port
+    from running code on it; there is no default.
+    """
+    key = authkey or os.environ.get('VIDEO_DOWNLOADER_BROKER_KEY')
+    if not key:
+        raise ValueError("The broker needs a key: pass --authkey or set VIDEO_DOWNLOADER_BROKER_KEY")
+    return key.encode() if isinstance(key, str) else key
+
+def new_broker_key():
+    """A random broker password"""
+    return secrets.token_urlsafe(24)
+
+def is_loopback(host):
+    """True if host only accepts connections from this machine"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # A host name: could resolve to anything
+
+def _manager_class():
+    # multiprocessing is only imported once a broker is actually used
+    from multiprocessing.managers import BaseManager
+
+    class QueueManager(BaseManager):
+        pass
+    return QueueManager
+
+def serve_broker(path, host='127.0.0.1', port=DEFAULT_BROKER_PORT, authkey=None, lease=60.0, max_attempts=3):
+    """Serve the SQLite queue at path to workers over the network. Blocks until interrupted.
+
+    The broker is the only process that opens the file, so it can stay on
+    a local disk and workers only need the address and the key. Raises
+    ValueError without a key (see broker_authkey).
+    """
+    authkey = broker_authkey(authkey)
+    queue = SQLiteJobQueue(path, lease, max_attempts)
+    manager_class = _manager_class()
+    manager_class.register('queue', callable=lambda: queue)
+    manager = manager_class(address=(host, port), authkey=authkey)
+    manager.get_server().serve_forever()
+
+def connect_broker(host, port=DEFAULT_BROKER_PORT, authkey=None):
+    """A proxy with the SQLiteJobQueue methods, talking to a broker"""
+    manager_class = _manager_class()
+    manager_class.register('queue')
+    manager = manager_class(address=(host, port), authkey=broker_authkey(authkey))
+    from multiprocessing import AuthenticationError
+    try:
+        manager.connect()
+    except AuthenticationError:
+        raise ValueError(f"The broker at {host}:{port} rejected the key")
+    return manager.queue()
+
+def open_queue(spec, authkey=None, lease=60.0):
+    """Open a queue from a spec: a SQLite file path, or broker://host[:port] (whose lease is set by the broker)"""
+    if spec.startswith('broker://'):
+        host, _, port = spec[len('broker://'):].rstrip('/').partition(':')
+        return connect_broker(host or '127.0.0.1', int(port or DEFAULT_BROKER_PORT), authkey)
+    if spec.startswith('sqlite:'):
+        spec = spec[len('sqlite:'):]
+    return SQLiteJobQueue(os.path.expanduser(spec), lease)